@@ -5,7 +5,7 @@ a = Analysis(
     ['main.py'],
     pathex=[],
     binaries=[],
-    datas=[],
+    datas=[('regras_perfis.json', '.'), ('secoes_padrao.json', '.')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
@@ -16,19 +16,19 @@ a = Analysis(
 )
 pyz = PYZ(a.pure)
 
+# Build em pasta (onedir): o onefile extraía tudo para uma pasta temporária a
+# cada execução antes de abrir a janela. UPX desligado pelo mesmo motivo: as
+# DLLs comprimidas precisam ser descomprimidas a cada carga.
 exe = EXE(
     pyz,
     a.scripts,
-    a.binaries,
-    a.datas,
     [],
+    exclude_binaries=True,
     name='MeuAplicativo',
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
+    upx=False,
     console=False,
     disable_windowed_traceback=False,
     argv_emulation=False,
@@ -37,3 +37,12 @@ exe = EXE(
     entitlements_file=None,
     icon=['6750096.ico'],
 )
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    upx_exclude=[],
+    name='MeuAplicativo',
+)
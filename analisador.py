@@ -0,0 +1,598 @@
+import io
+import os
+import zipfile
+import xml.etree.ElementTree as ET
+from collections import deque
+
+import leitor_docx
+import leitor_rtf
+import leitor_tabelas
+import planilha_xml
+import dimensoes
+import cache_listas
+import formulas
+import corte_barras
+import roteamento
+import catalogo
+import secoes
+import medicao
+import registro_preenchimento
+from itens import ItemMaterial
+from modelo_planilha import ModeloPlanilha
+from registro_preenchimento import RegistroPreenchimento
+from classificador import classificador_padrao
+
+# Planilha modelo procurada ao lado da lista quando nenhuma outra é indicada.
+NOME_MODELO_PADRAO = "TABELA-DE-AÇO R8.xlsx"
+
+# 'openpyxl' carrega/salva o workbook inteiro; 'xml' remenda só a planilha alterada.
+MODOS_ESCRITA = ('openpyxl', 'xml')
+
+# Colunas da aba "dobrados" usadas na conferência de pesos.
+COLUNA_KG_M, COLUNA_PESO_CALCULADO, COLUNA_PESO_MCALC = 12, 14, 17   # L, N (=J*L), Q
+
+# Diferença relativa entre o peso da planilha e o do mCalc acima da qual a linha é apontada.
+TOLERANCIA_PESO = 0.10
+
+# Colunas preenchidas pela otimização de corte: O (quantidade de barras) e S (sobras, m).
+COLUNA_BARRAS, COLUNA_SOBRAS = 15, 19
+
+def preaquecer_dependencias():
+    """
+    Importa as bibliotecas pesadas (openpyxl, python-docx) que o módulo só carrega
+    quando precisa. A interface chama isto numa thread depois que a janela aparece,
+    para que o primeiro processamento não pague o custo da importação.
+    """
+    try:
+        import openpyxl  # noqa: F401
+        import docx  # noqa: F401
+    except ImportError:
+        pass  # o erro aparece (com mensagem) quando a biblioteca for de fato usada
+
+
+class AutomacaoCancelada(Exception):
+    """Levantada entre etapas quando o usuário pede o cancelamento do processamento."""
+
+
+class AnalisadorListaMaterial:
+    """Motor de leitura da lista de material e preenchimento da planilha, sem interface."""
+
+    def __init__(self, usar_cache=True):
+        self.motor_extracao = None  # 'stream', 'python-docx', 'rtf' ou 'cache', definido a cada extração
+        self.classificador = classificador_padrao()
+        self.modo_escrita = 'openpyxl'
+        self.cache = cache_listas.CacheListas() if usar_cache else None
+        self.classificacoes = {}    # {perfil: (codigo, classe)} da última lista extraída
+        self.secoes_por_linha = {}  # {linha: codigo_secao} do último planejar_celulas
+        self.otimizar_cortes = False
+        self.tempo_limite_cortes = None  # None: só o FFD; segundos: liga o resolver melhorado
+        self.destinos = roteamento.destinos_padrao()  # {codigo: Destino} das outras abas
+        self.celulas_outras_planilhas = {}  # {aba: {(linha, coluna): valor}} do último preenchimento
+        self.usar_catalogo = True  # resolve perfis W/L do catálogo para a linha exata do modelo
+        self.modo_secoes = None  # None, 'marcar' ou 'ajustar' (seção padrão mais próxima, ver secoes.py)
+        self.tolerancia_secoes = secoes.TOLERANCIA_PADRAO_MM
+        self.secoes_fora_padrao = []  # [(linha, perfil, medidas, padrão mais próximo, distância, ajustada)]
+        self.arquivo_extraido = None  # lista da última extração (origem no registro de preenchimento)
+        self.hash_extraido = None     # SHA-256 do conteúdo da última extração (o que foi de fato lido)
+        self.registrar_preenchimento = True  # registro ao lado da planilha e preenchimento incremental
+        self.linhas_dos_itens = {}  # {id(item): linha} do último planejar_celulas
+        self.ultimo_incremental = None  # {'iguais', 'alteradas', 'adicionadas', 'removidas', 'celulas'}
+
+    # MÓDULO DE INTELIGÊNCIA DE ENGENHARIA
+    #______________________________________________________________________
+    def convert_to_mm(self, dim_str):
+        """Converte dimensões em polegadas (ex: "1.1/2"") para mm."""
+        return dimensoes.converter_para_mm(dim_str)
+
+    # ==============================================================================
+    # Função para identificar o tipo de perfil e retornar o código correto
+    # ==============================================================================
+    def classificar_e_mapear_perfil(self, desc):
+        """
+        Identifica o TIPO de perfil e retorna o código e uma chave de classificação.
+        As regras vêm de regras_perfis.json (ver classificador.py).
+        """
+        return self.classificador.classificar(desc)
+
+
+    # ==============================================================================
+    # Extrai as 4 medidas principais de uma descrição de perfil
+    # ==============================================================================
+    @medicao.etapa('parse_dimensoes_inteligente')
+    def parse_dimensoes_inteligente(self, desc, tipo_perfil):
+        """Aplica regras de extração de dimensões e retorna as 4 medidas principais."""
+        return dimensoes.parse_dimensoes(desc, tipo_perfil)
+
+    def parse_dimensoes_lote(self, descricoes, tipos=None, como_array=False):
+        """Versão em lote: (a, b, c, esp, classe) de cada descrição (ver dimensoes.parse_dimensoes_lote)."""
+        return dimensoes.parse_dimensoes_lote(descricoes, tipos, self.classificador, como_array)
+
+    # ==============================================================================
+    # MÓDULO PRINCIPAL DO SCRIPT (Leitura e Preenchimento Não-Destrutivo)
+    # ==============================================================================
+
+    @medicao.etapa('extrair_dados_word')
+    def extrair_dados_word(self, caminho_arquivo_word, motor='auto'):
+        """
+        Extrai as linhas da lista, passando antes pelo cache em disco (ver cache_listas.py).
+        Num acerto, self.motor_extracao fica 'cache' e a lista não é interpretada.
+
+        O arquivo é lido uma única vez: o SHA-256 desses bytes (self.hash_extraido) é a
+        chave do cache e o hash do registro de preenchimento, do histórico e do vigia, e a
+        interpretação usa os mesmos bytes -- o hash é sempre o do conteúdo extraído.
+        """
+        self.classificacoes = {}
+        self.arquivo_extraido = caminho_arquivo_word
+        with open(caminho_arquivo_word, 'rb') as arquivo:
+            conteudo = arquivo.read()
+        self.hash_extraido = cache_listas.hash_conteudo(conteudo)
+        chave = None
+        if self.cache is not None:
+            chave = self.cache.chave(caminho_arquivo_word, self.classificador.assinatura, self.hash_extraido)
+            encontrado = self.cache.obter(chave)
+            if encontrado is not None:
+                medicao.contar('cache_acertos')
+                self.motor_extracao = 'cache'
+                dados, self.classificacoes = encontrado
+                medicao.contar('linhas_extraidas', len(dados))
+                self._completar_itens(dados)
+                return dados
+            medicao.contar('cache_falhas')
+
+        dados = self._extrair_dados_arquivo(caminho_arquivo_word, motor, conteudo)
+        if dados:
+            medicao.contar('linhas_extraidas', len(dados))
+            with medicao.etapa('classificação', itens=len(dados)):
+                self.classificacoes = {item[0]: self.classificar_e_mapear_perfil(item[0]) for item in dados}
+            self._completar_itens(dados)
+            if chave is not None:
+                self.cache.gravar(chave, dados, self.classificacoes)
+        return dados
+
+    def _completar_itens(self, dados):
+        """Grava em cada ItemMaterial a classificação e as medidas (cada descrição é interpretada uma vez)."""
+        medidas = {}
+        medicao.contar('classificacoes_reaproveitadas', len(dados) - len(self.classificacoes))
+        for item in dados:
+            codigo, classe = self.classificacoes[item.perfil]
+            if item.perfil not in medidas:
+                medidas[item.perfil] = self.parse_dimensoes_inteligente(item.perfil, classe)
+            item.classificar(codigo, classe, medidas[item.perfil])
+
+    def _extrair_dados_arquivo(self, caminho_arquivo_word, motor='auto', conteudo=None):
+        """
+        Função robusta para extrair dados do Word.
+
+        motor: 'auto' (fluxo com fallback para python-docx), 'stream' ou 'python-docx'.
+        Arquivos .rtf (exportação do mCalc) vão sempre para o leitor de RTF.
+        O motor efetivamente usado fica em self.motor_extracao.
+
+        Todas as tabelas com o cabeçalho da lista entram, na ordem do documento
+        (ver leitor_tabelas.py); devolve None se nenhuma linha for aproveitada.
+        conteudo: os bytes do arquivo, se já lidos (o caminho serve então só para o formato).
+        """
+        def origem():
+            return io.BytesIO(conteudo) if conteudo is not None else caminho_arquivo_word
+
+        if caminho_arquivo_word.lower().endswith('.rtf'):
+            self.motor_extracao = 'rtf'
+            return list(self.iterar_itens(leitor_rtf.ler_linhas_tabelas(origem()))) or None
+
+        if motor in ('auto', 'stream'):
+            try:
+                dados = list(self.iterar_itens(leitor_docx.ler_linhas_tabelas(origem())))
+                self.motor_extracao = 'stream'
+                return dados or None
+            except (zipfile.BadZipFile, leitor_docx.DocumentoAusente, ET.ParseError):
+                raise  # o arquivo não é um docx legível: o python-docx também não o abriria
+            except (KeyError, ValueError) as e:
+                if motor == 'stream': raise
+                print(f"  AVISO: Leitura em fluxo falhou ({e}). Usando python-docx.")
+
+        self.motor_extracao = 'python-docx'
+        import docx  # só carregado quando o fallback é necessário (ver preaquecer_dependencias)
+        documento = docx.Document(origem())
+        linhas = ((indice, [celula.text for celula in linha.cells])
+                  for indice, tabela in enumerate(documento.tables) for linha in tabela.rows)
+        return list(self.iterar_itens(linhas)) or None
+
+    def iterar_itens(self, linhas_tabelas):
+        """
+        Gera os ItemMaterial de todos os blocos da lista, um bloco de cada vez.
+        linhas_tabelas: (indice_tabela, [texto das células]) de leitor_tabelas.ler_linhas_tabelas.
+        """
+        for numero, celulas in enumerate(leitor_tabelas.blocos_lista(linhas_tabelas), start=1):
+            itens = self.montar_dados_materiais(*celulas)
+            if itens is None:
+                print(f"  AVISO: Linha {numero} da lista ignorada (colunas com números de itens diferentes).")
+                continue
+            yield from itens
+
+    def montar_dados_materiais(self, perfils_str, acos_str, ltotais_str, pesos_str):
+        """Converte o texto das 4 colunas da lista em linhas ItemMaterial(perfil, aco, l_total_m, peso)."""
+        lista_perfis = list(filter(None, perfils_str.strip().split('\n')))
+        lista_acos = list(filter(None, acos_str.strip().split('\n')))
+        lista_ltotais = list(filter(None, ltotais_str.strip().split('\n')))
+        lista_pesos = list(filter(None, pesos_str.strip().split('\n')))
+        num_perfis = len(lista_perfis)
+        if not (num_perfis == len(lista_ltotais) == len(lista_pesos)): return None
+        if num_perfis == 0 or not lista_acos: return None
+        
+        dados_finais = []
+        for i in range(num_perfis):
+            perfil, aco = lista_perfis[i].strip(), lista_acos[i].strip() if i < len(lista_acos) else lista_acos[0].strip()
+            l_total_str, peso_str = lista_ltotais[i].strip().replace(',', '.'), lista_pesos[i].strip().replace(',', '.')
+            try:
+                l_total_m = float(l_total_str) / 100 if l_total_str else 0.0
+                peso_final = float(peso_str) if peso_str else 0.0
+                dados_finais.append(ItemMaterial(perfil, aco, l_total_m, peso_final))
+            except ValueError: continue
+        return dados_finais
+
+    @medicao.etapa('encontrar_proxima_linha_vazia')
+    def encontrar_proxima_linha_vazia(self, sheet, codigo_secao, linha_inicio_busca):
+        """
+        Encontra a primeira linha vazia para uma seção, aceitando placeholders como 'X' ou 0.
+        """
+        for row in range(linha_inicio_busca, sheet.max_row + 2):
+            celula_codigo = sheet.cell(row=row, column=1)
+            celula_dado_ref = sheet.cell(row=row, column=2)
+            if celula_codigo.value == codigo_secao and celula_dado_ref.value in [None, 0, 'X', '']:
+                medicao.contar('linhas_varridas', row - linha_inicio_busca + 1)
+                return row
+        medicao.contar('linhas_varridas', sheet.max_row + 2 - linha_inicio_busca)
+        return None
+
+    def indexar_linhas_livres(self, sheet, linha_inicio_busca=4):
+        """
+        Varre a planilha uma única vez e devolve {codigo_secao: deque(linhas livres)},
+        com as mesmas regras de encontrar_proxima_linha_vazia (coluna B vazia, 0 ou 'X').
+        """
+        return self._indexar_linhas(enumerate(
+            sheet.iter_rows(min_row=linha_inicio_busca, max_col=2, values_only=True),
+            start=linha_inicio_busca))
+
+    def indexar_linhas_livres_xml(self, caminho_planilha, parte, linha_inicio_busca=4):
+        """Mesmo índice de indexar_linhas_livres, lido direto do xml da planilha (modo 'xml')."""
+        return self._indexar_linhas(planilha_xml.ler_colunas(caminho_planilha, parte, 2, linha_inicio_busca))
+
+    def _indexar_linhas(self, linhas):
+        indice = {}
+        varridas = 0
+        for varridas, (linha, (codigo, dado_ref)) in enumerate(linhas, start=1):
+            if codigo is None or dado_ref not in [None, 0, 'X', '']: continue
+            if codigo not in indice: indice[codigo] = deque()
+            indice[codigo].append(linha)
+        medicao.contar('linhas_varridas', varridas)
+        return indice
+
+    def _verificar_cancelamento(self, cancelamento):
+        """Interrompe o processamento se o evento de cancelamento (threading.Event) estiver ativo."""
+        if cancelamento is not None and cancelamento.is_set():
+            raise AutomacaoCancelada()
+
+    @medicao.etapa('agrupar_por_secao')
+    def agrupar_por_secao(self, dados_materiais, catalogo_perfis=None):
+        """
+        Classifica cada item uma vez e agrupa: {codigo_secao: [(item, tipo_perfil), ...]}.
+        Com catalogo_perfis (catalogo.py), os perfis de catálogo ficam com o rótulo da
+        própria linha do modelo (ex: 'W200X26,6') como código.
+        """
+        dados_agrupados = {}
+        for item in dados_materiais:
+            perfil = catalogo_perfis.resolver(item[0]) if catalogo_perfis is not None else None
+            if perfil is not None:
+                codigo_excel, tipo_perfil = perfil.rotulo, catalogo.CLASSE_CATALOGO
+            elif getattr(item, 'codigo', None) is not None:
+                # A extração já deixa a classificação pronta no item (e o cache a traz do disco).
+                codigo_excel, tipo_perfil = item.codigo, item.classe
+            else:
+                classificacao = self.classificacoes.get(item[0])
+                codigo_excel, tipo_perfil = classificacao or self.classificar_e_mapear_perfil(item[0])
+            if codigo_excel not in dados_agrupados: dados_agrupados[codigo_excel] = []
+            dados_agrupados[codigo_excel].append((item, tipo_perfil))
+        return dados_agrupados
+
+    @medicao.etapa('planejar_celulas')
+    def planejar_celulas(self, dados_agrupados, linhas_livres, cancelamento=None):
+        """
+        Decide onde cada item entra e devolve as células a gravar: {(linha, coluna): valor}.
+        Consome as linhas livres de linhas_livres.
+        """
+        celulas = {}
+        self.secoes_por_linha = {}
+        self.linhas_dos_itens = {}
+        self.secoes_fora_padrao = []
+        if self.modo_secoes not in (None,) + secoes.MODOS_SECOES:
+            raise ValueError(f"Modo de seções desconhecido: {self.modo_secoes!r} (use {', '.join(secoes.MODOS_SECOES)}).")
+        indice_secoes = secoes.indice_padrao() if self.modo_secoes else None
+        for codigo_secao, itens_da_secao in dados_agrupados.items():
+            fila_secao = linhas_livres.get(codigo_secao)
+            for item, tipo_perfil in itens_da_secao:
+                self._verificar_cancelamento(cancelamento)
+                if not fila_secao:
+                    print(f"  AVISO: Não há mais espaço na planilha para a seção '{codigo_secao}'. Item '{item[0]}' não inserido.")
+                    continue
+                linha_alvo = fila_secao.popleft()
+                self.secoes_por_linha[linha_alvo] = codigo_secao
+                self.linhas_dos_itens[id(item)] = linha_alvo
+
+                perfil_desc, aco_tipo, l_total_m, peso_total = item
+                if getattr(item, 'classe', None) == tipo_perfil:
+                    dim_a, dim_b, dim_c, dim_esp = item.medidas  # já interpretadas na extração
+                else:
+                    dim_a, dim_b, dim_c, dim_esp = self.parse_dimensoes_inteligente(perfil_desc, tipo_perfil)
+                if indice_secoes is not None and (dim_a or dim_b or dim_esp):
+                    dim_a, dim_b, dim_c, dim_esp = self._conferir_secao(
+                        indice_secoes, linha_alvo, perfil_desc, tipo_perfil, (dim_a, dim_b, dim_c, dim_esp))
+
+                if tipo_perfil in ['PERFIL_U', 'TERCA']:
+                    celulas[(linha_alvo, 2)] = dim_a
+                    celulas[(linha_alvo, 4)] = dim_b
+                    celulas[(linha_alvo, 6)] = dim_c
+                elif tipo_perfil == 'CANTONEIRA':
+                    celulas[(linha_alvo, 4)] = dim_a
+                    celulas[(linha_alvo, 6)] = dim_b
+
+                if tipo_perfil != catalogo.CLASSE_CATALOGO:  # laminados: o modelo já traz o kg/m
+                    celulas[(linha_alvo, 8)] = dim_esp
+                celulas[(linha_alvo, 9)] = aco_tipo
+                celulas[(linha_alvo, 10)] = l_total_m
+                celulas[(linha_alvo, 17)] = peso_total
+        medicao.contar('linhas_preenchidas', len(self.secoes_por_linha))
+        return celulas
+
+    def _conferir_secao(self, indice_secoes, linha, perfil_desc, tipo_perfil, medidas):
+        """
+        Registra em secoes_fora_padrao as medidas que não são de uma seção padrão. No modo
+        'ajustar', devolve as medidas da seção padrão mais próxima se ela estiver dentro de
+        tolerancia_secoes; senão devolve as medidas como vieram.
+        """
+        proxima = indice_secoes.mais_proxima(tipo_perfil, *medidas)
+        if proxima is None or proxima.distancia == 0:
+            return medidas
+        ajustar = self.modo_secoes == 'ajustar' and proxima.distancia <= self.tolerancia_secoes
+        self.secoes_fora_padrao.append((linha, perfil_desc, medidas, proxima.medidas, proxima.distancia, ajustar))
+        return proxima.medidas if ajustar else medidas
+
+    @medicao.etapa('planejar_cortes')
+    def planejar_cortes(self, celulas, tempo_limite=None):
+        """
+        Otimiza o corte das barras (corte_barras.py) para as linhas planejadas e devolve as
+        células de quantidade de barras (O) e sobras em metros (S). Linhas com a mesma seção,
+        dimensões e espessura dividem as barras; cada barra conta na linha da sua maior peça,
+        e uma linha sem nenhuma barra própria fica com as fórmulas do modelo em O e S.
+        """
+        linhas = []
+        for linha, codigo_secao in self.secoes_por_linha.items():
+            chave = (codigo_secao,) + tuple(celulas.get((linha, coluna)) for coluna in (2, 4, 6, 8))
+            linhas.append((linha, chave, celulas.get((linha, 10)) or 0.0, corte_barras.comprimento_barra(codigo_secao)))
+        celulas_corte = {}
+        for linha, (barras, sobra_m) in corte_barras.otimizar_linhas(linhas, tempo_limite=tempo_limite).items():
+            if not barras:
+                continue  # as peças desta linha saem das barras de outra: gravar 0 apagaria o ROUNDUP do modelo
+            celulas_corte[(linha, COLUNA_BARRAS)] = barras
+            celulas_corte[(linha, COLUNA_SOBRAS)] = round(sobra_m, 3)
+        return celulas_corte
+
+    def conferir_pesos(self, caminho_planilha, celulas, tolerancia=TOLERANCIA_PESO):
+        """
+        Calcula, com as fórmulas do modelo (formulas.py), o kg/m e o peso de cada linha
+        preenchida e compara com o Peso(kgf) do mCalc (coluna Q). Devolve:
+        {'linhas': [...], 'secoes': {codigo: {...}}, 'peso_calculado', 'peso_mcalc', 'divergentes': [...]}
+        """
+        modelo = formulas.ModeloFormulas.carregar(caminho_planilha)
+        avaliacao = modelo.avaliar(celulas)
+        conferencia = {'linhas': [], 'secoes': {}, 'peso_calculado': 0.0, 'peso_mcalc': 0.0, 'divergentes': []}
+
+        for linha in sorted({linha for linha, _ in celulas}):
+            codigo_secao = modelo.valores.get((linha, 1))
+            registro = {'linha': linha, 'secao': codigo_secao, 'kg_m': None, 'peso_calculado': None,
+                        'peso_mcalc': avaliacao.numero(linha, COLUNA_PESO_MCALC), 'diferenca': None, 'erro': None}
+            try:
+                registro['kg_m'] = avaliacao.numero(linha, COLUNA_KG_M)
+                registro['peso_calculado'] = avaliacao.numero(linha, COLUNA_PESO_CALCULADO)
+            except formulas.ErroFormula as e:
+                registro['erro'] = str(e)
+            conferencia['linhas'].append(registro)
+
+            secao = conferencia['secoes'].setdefault(codigo_secao, {'itens': 0, 'peso_calculado': 0.0, 'peso_mcalc': 0.0})
+            secao['itens'] += 1
+            secao['peso_mcalc'] += registro['peso_mcalc']
+            conferencia['peso_mcalc'] += registro['peso_mcalc']
+            if registro['erro'] is not None:
+                conferencia['divergentes'].append(registro)
+                continue
+            secao['peso_calculado'] += registro['peso_calculado']
+            conferencia['peso_calculado'] += registro['peso_calculado']
+            if registro['peso_mcalc']:
+                registro['diferenca'] = registro['peso_calculado'] / registro['peso_mcalc'] - 1
+                if abs(registro['diferenca']) > tolerancia:
+                    conferencia['divergentes'].append(registro)
+        return conferencia
+
+    @medicao.etapa('preencher_planilha_excel')
+    def preencher_planilha_excel(self, caminho_planilha, dados_materiais, caminho_saida=None,
+                                 progresso=None, cancelamento=None, modo_escrita=None, otimizar_cortes=None,
+                                 fonte=None):
+        """
+        Preenche a planilha de forma não-destrutiva, seguindo a estrutura de colunas exata.
+        Se caminho_saida for informado, o modelo fica intacto e o resultado é salvo lá.
+
+        progresso: função chamada com o nome de cada etapa ('classificação',
+        'preenchimento', 'gravação') quando ela começa.
+        cancelamento: threading.Event; se ativado antes da gravação, levanta
+        AutomacaoCancelada e nada é gravado.
+        modo_escrita: 'openpyxl' (salva o workbook inteiro) ou 'xml' (remenda só o xml
+        das abas alteradas; ver planilha_xml.py). Padrão: self.modo_escrita. Nos dois, o
+        modelo é lido uma vez por processo (ver modelo_planilha.py).
+        otimizar_cortes: preenche também as barras (O) e sobras (S) pela otimização de
+        corte (ver planejar_cortes). Padrão: self.otimizar_cortes.
+        fonte: identificação da lista no registro de preenchimento (padrão: o caminho absoluto
+        do arquivo da última extração). Se a planilha já foi preenchida com essa lista, os itens
+        voltam às mesmas linhas e só as células que mudaram são gravadas (ver registro_preenchimento.py).
+        O registro é o do arquivo gravado; numa cópia (caminho_saida), a cópia anterior feita do
+        mesmo modelo é a planilha de partida.
+
+        Devolve as células gravadas na aba ativa, {(linha, coluna): valor} (ver conferir_pesos);
+        as das outras abas (telhas, vergalhões, guarda-corpo) ficam em self.celulas_outras_planilhas.
+        """
+        avisar = progresso or (lambda etapa: None)
+        modo_escrita = modo_escrita or self.modo_escrita
+        otimizar_cortes = self.otimizar_cortes if otimizar_cortes is None else otimizar_cortes
+        if modo_escrita not in MODOS_ESCRITA:
+            raise ValueError(f"Modo de escrita desconhecido: {modo_escrita!r} (use {', '.join(MODOS_ESCRITA)}).")
+
+        avisar('classificação')
+        catalogo_perfis = catalogo.CatalogoPerfis.carregar(caminho_planilha) if self.usar_catalogo else None
+        dados_agrupados = self.agrupar_por_secao(dados_materiais, catalogo_perfis)
+
+        self._verificar_cancelamento(cancelamento)
+        avisar('preenchimento')
+        # Telhas, vergalhões e guarda-corpo vão para as suas abas (ver roteamento.py).
+        roteados = {codigo: itens for codigo, itens in dados_agrupados.items() if codigo in self.destinos}
+        dados_agrupados = {codigo: itens for codigo, itens in dados_agrupados.items() if codigo not in self.destinos}
+        # A mesma lista já gravada nesta planilha: preenchimento incremental.
+        self.ultimo_incremental = None
+        destino = caminho_saida or caminho_planilha
+        fonte = fonte or (registro_preenchimento.chave_fonte(self.arquivo_extraido) if self.arquivo_extraido else None)
+        registro, partida = None, caminho_planilha
+        if self.registrar_preenchimento:
+            registro, partida = self._registro_destino(caminho_planilha, destino)
+        # O modelo é lido uma vez por processo e reaproveitado (ver modelo_planilha.py).
+        modelo = ModeloPlanilha.carregar(partida)
+        linhas_livres = modelo.linhas_livres(self._indexar_linhas)
+        anterior = self._entrada_anterior(registro, fonte, modelo) if registro is not None and fonte else None
+        chaves = registro_preenchimento.chaves_itens({**dados_agrupados, **roteados})
+        if anterior is not None:
+            dados_agrupados = self._reaproveitar_linhas(dados_agrupados, linhas_livres, anterior, chaves)
+
+        celulas = self.planejar_celulas(dados_agrupados, linhas_livres, cancelamento)
+        if otimizar_cortes:
+            celulas.update(self.planejar_cortes(celulas, self.tempo_limite_cortes))
+        self.celulas_outras_planilhas = roteamento.planejar_destinos(
+            roteados, self.destinos,
+            modelo.ler_colunas if anterior is None else self._leitor_sem_fonte(modelo, anterior), cancelamento)
+
+        self._verificar_cancelamento(cancelamento)
+        avisar('gravação')
+        celulas_por_aba = {modelo.nome_ativa: celulas}
+        for nome, celulas_aba in self.celulas_outras_planilhas.items():
+            celulas_por_aba.setdefault(nome, {}).update(celulas_aba)
+        alteracoes = celulas_por_aba
+        if registro is not None and fonte:
+            alteracoes = self._registrar_fonte(registro, fonte, anterior, modelo, chaves,
+                                               {**dados_agrupados, **roteados}, celulas_por_aba)
+        if alteracoes or os.path.abspath(destino) != modelo.caminho:
+            if modo_escrita == 'xml':
+                modelo.gravar_xml(destino, alteracoes)
+            else:
+                modelo.gravar_openpyxl(destino, alteracoes)
+        if registro is not None:
+            registro.gravar(destino)
+        return celulas
+
+    # ------------------------------------------------------------------------------
+    # Preenchimento incremental (ver registro_preenchimento.py)
+    # ------------------------------------------------------------------------------
+    @staticmethod
+    def _registro_destino(caminho_planilha, destino):
+        """
+        (registro, planilha de partida). O registro é sempre o do arquivo gravado. Numa cópia,
+        a cópia anterior é a partida se veio deste mesmo modelo (o lote rodado de novo); senão
+        a cópia é refeita do modelo, com um registro novo.
+        """
+        registro = RegistroPreenchimento.carregar(destino)
+        if os.path.abspath(destino) == os.path.abspath(caminho_planilha):
+            return registro, caminho_planilha
+        assinatura = ModeloPlanilha.carregar(caminho_planilha).assinatura
+        if registro.modelo == assinatura and os.path.exists(destino):
+            return registro, destino
+        return RegistroPreenchimento(modelo=assinatura), caminho_planilha
+
+    def _entrada_anterior(self, registro, fonte, modelo):
+        """Entrada da lista no registro, se as células gravadas na aba ativa ainda estão na planilha."""
+        anterior = registro.entrada(fonte)
+        if anterior is None:
+            return None
+        gravadas = anterior.celulas.get(modelo.nome_ativa, {})
+        atuais = modelo.valores(modelo.nome_ativa, list(gravadas))
+        if all(registro_preenchimento.valores_iguais(atuais[celula], valor) for celula, valor in gravadas.items()):
+            return anterior
+        print(f"  AVISO: A planilha mudou desde o último preenchimento de '{os.path.basename(fonte)}'; "
+              f"a lista será preenchida do zero.")
+        registro.descartar(fonte)
+        return None
+
+    def _reaproveitar_linhas(self, dados_agrupados, linhas_livres, anterior, chaves):
+        """
+        Põe na frente de cada seção os itens já registrados, com as linhas que ocupavam
+        no início da fila de linhas livres; as linhas dos itens que saíram voltam para a fila.
+        """
+        chaves_atuais = set(chaves.values())
+        for chave, (codigo, linha, _hash) in anterior.itens.items():
+            if linha is not None and chave not in chaves_atuais:
+                linhas_livres[codigo] = deque(sorted({*linhas_livres.get(codigo, ()), linha}))
+        reorganizados = {}
+        for codigo, itens in dados_agrupados.items():
+            reaproveitados, linhas, novos = [], [], []
+            for item, tipo_perfil in itens:
+                registrado = anterior.itens.get(chaves[id(item)])
+                if registrado is not None and registrado[1] is not None:
+                    reaproveitados.append((item, tipo_perfil))
+                    linhas.append(registrado[1])
+                else:
+                    novos.append((item, tipo_perfil))
+            reorganizados[codigo] = reaproveitados + novos
+            linhas_livres[codigo] = deque(linhas + list(linhas_livres.get(codigo, ())))
+        return reorganizados
+
+    @staticmethod
+    def _leitor_sem_fonte(modelo, anterior):
+        """ler_linhas das outras abas com as células desta lista de volta aos valores do modelo."""
+        def ler_linhas(nome, max_col):
+            linhas = modelo.ler_colunas(nome, max_col)
+            originais = {}
+            for (linha, coluna), valor in anterior.originais.get(nome, {}).items():
+                if coluna <= max_col:
+                    originais.setdefault(linha, {})[coluna] = valor
+            if linhas is None or not originais:
+                return linhas
+            return [(linha, tuple(originais[linha].get(coluna, valor) for coluna, valor in enumerate(valores, start=1))
+                     if linha in originais else valores) for linha, valores in linhas]
+        return ler_linhas
+
+    def _registrar_fonte(self, registro, fonte, anterior, modelo, chaves, itens_por_codigo, celulas_por_aba):
+        """Atualiza a entrada da lista no registro e devolve só as células a gravar."""
+        itens = {}
+        for codigo, itens_da_secao in itens_por_codigo.items():
+            for item, _tipo in itens_da_secao:
+                itens[chaves[id(item)]] = (codigo, self.linhas_dos_itens.get(id(item)),
+                                           registro_preenchimento.hash_item(item))
+        anteriores = anterior.celulas if anterior is not None else {}
+        originais_antes = anterior.originais if anterior is not None else {}
+        originais = {}
+        for aba, celulas_aba in celulas_por_aba.items():
+            conhecidos = originais_antes.get(aba, {})
+            originais[aba] = {celula: conhecidos[celula] for celula in celulas_aba if celula in conhecidos}
+            originais[aba].update(modelo.valores(aba, [celula for celula in celulas_aba if celula not in conhecidos]))
+        alteracoes = registro_preenchimento.diferencas(anteriores, celulas_por_aba, originais_antes)
+
+        hash_lista = None
+        if self.arquivo_extraido and registro_preenchimento.chave_fonte(self.arquivo_extraido) == fonte:
+            hash_lista = self.hash_extraido  # o hash dos bytes extraídos, sem ler a lista de novo
+        registro.registrar(fonte, hash_lista, itens, celulas_por_aba, originais)
+
+        if anterior is not None:
+            antes = {chave: valor[2] for chave, valor in anterior.itens.items()}
+            self.ultimo_incremental = {
+                'iguais': sum(1 for chave, valor in itens.items() if antes.get(chave) == valor[2]),
+                'alteradas': sum(1 for chave, valor in itens.items() if chave in antes and antes[chave] != valor[2]),
+                'adicionadas': sum(1 for chave in itens if chave not in antes),
+                'removidas': sum(1 for chave in antes if chave not in itens),
+                'celulas': sum(len(c) for c in alteracoes.values())}
+            print(f"  Preenchimento incremental de '{os.path.basename(fonte)}': {self.ultimo_incremental['adicionadas']} novo(s), "
+                  f"{self.ultimo_incremental['alteradas']} alterado(s), {self.ultimo_incremental['removidas']} "
+                  f"removido(s), {self.ultimo_incremental['iguais']} igual(is); "
+                  f"{self.ultimo_incremental['celulas']} célula(s) gravada(s).")
+        return alteracoes
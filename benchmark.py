@@ -0,0 +1,236 @@
+import io
+import os
+import sys
+import json
+import time
+import random
+import zipfile
+import argparse
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+import contextlib
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+import medicao
+from analisador import AnalisadorListaMaterial, NOME_MODELO_PADRAO, MODOS_ESCRITA
+from modelo_planilha import ModeloPlanilha
+
+# ==============================================================================
+# BENCHMARK DO PIPELINE COM LISTAS SINTÉTICAS NO FORMATO DO mCalc
+# ==============================================================================
+# Uso: python benchmark.py --linhas 20 1000 10000 100000 --saida benchmark_resultados.json
+# Cada execução acrescenta um registro ao arquivo JSON, para comparar versões.
+#
+# As etapas são as do próprio pipeline (extrair_dados_word +
+# preencher_planilha_excel), lidas dos registros de medicao.etapa: o que o
+# benchmark mede é o que o programa faz. O modelo é lido antes, uma vez, como
+# no lote e no serviço; o custo dessa leitura sai à parte em 'modelo'.
+
+LINHAS_PADRAO = (20, 1000, 10000, 100000)
+ETAPAS_PRINCIPAIS = ('extrair_dados_word', 'preencher_planilha_excel')  # as demais ficam dentro destas
+ETAPAS_IMPRESSAS = ('extrair_dados_word', 'classificação', 'parse_dimensoes_inteligente',
+                    'preencher_planilha_excel', 'planejar_celulas', 'save')
+
+POLEGADAS = ('3/4"', '1"', '1.1/4"', '1.1/2"', '1.3/4"', '2"', '2.1/2"', '3"')
+ESPESSURAS_POL = ('1/8"', '3/16"', '1/4"')
+ESPESSURAS_MM = ('1.5', '2', '2.25', '2.65', '3', '3.35', '3.75', '4.75')
+
+
+def _descricao_aleatoria(rng):
+    """Descrição no estilo do mCalc, sorteando entre os tipos de perfil que aparecem nas listas reais."""
+    tipo = rng.random()
+    esp = rng.choice(ESPESSURAS_MM)
+    if tipo < 0.35:
+        return f"[ {rng.choice((75, 100, 116, 117, 120, 127, 150, 200))} x {rng.choice((30, 40, 50))} x {esp}"
+    if tipo < 0.55:
+        prefixo = rng.choice(('CA', 'UENR', 'CART', 'IENR'))
+        return f"{prefixo} {rng.choice((100, 150, 200, 220))} x {rng.choice((40, 50, 60, 79))} x {rng.choice((15, 17, 20, 25))} x {esp}"
+    if tipo < 0.75:
+        return f"L {rng.choice((30, 40, 50, 60))} x {esp}"
+    if tipo < 0.85:
+        return f"L {rng.choice(POLEGADAS)}x{rng.choice(ESPESSURAS_POL)}"
+    return f"RED {rng.choice(('7.94', '9.53', '12.7', '15.88', '19.05', '25.4'))}"
+
+
+def _celula_docx(linhas):
+    paragrafos = ''.join(f'<w:p><w:r><w:t xml:space="preserve">{escape(texto)}</w:t></w:r></w:p>' for texto in linhas)
+    return f'<w:tc>{paragrafos}</w:tc>'
+
+
+def gerar_lista_sintetica(caminho, num_linhas, semente=0):
+    """Grava um .docx mínimo com a tabela Perfil/Aço/L total/Peso(kgf) de uma lista do mCalc."""
+    rng = random.Random(semente)
+    perfis = [_descricao_aleatoria(rng) for _ in range(num_linhas)]
+    acos = ['ASTM A36'] * num_linhas
+    comprimentos = [f"{rng.uniform(50, 40000):.2f}" for _ in range(num_linhas)]
+    pesos = [f"{rng.uniform(0.5, 1500):.2f}" for _ in range(num_linhas)]
+
+    cabecalho = ''.join(_celula_docx([t]) for t in ('Perfil', 'Aço', 'L total', 'Peso(kgf)'))
+    dados = ''.join(_celula_docx(coluna) for coluna in (perfis, acos, comprimentos, pesos))
+    documento = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+        '<w:p><w:r><w:t>LISTA DE MATERIAL: </w:t></w:r></w:p>'
+        '<w:tbl><w:tblGrid>' + '<w:gridCol w:w="1958"/>' * 4 + '</w:tblGrid>'
+        f'<w:tr>{cabecalho}</w:tr><w:tr>{dados}</w:tr></w:tbl>'
+        '<w:sectPr/></w:body></w:document>'
+    )
+    tipos = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/word/document.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+        '</Types>'
+    )
+    relacoes = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="word/document.xml"/></Relationships>'
+    )
+    with zipfile.ZipFile(caminho, 'w', zipfile.ZIP_DEFLATED) as pacote:
+        pacote.writestr('[Content_Types].xml', tipos)
+        pacote.writestr('_rels/.rels', relacoes)
+        pacote.writestr('word/document.xml', documento)
+    return caminho
+
+
+def _executar_pipeline(caminho_docx, caminho_modelo, caminho_saida, modo_escrita, medir):
+    """Extrai e preenche como o lote; `medir(nome, funcao)` envolve cada etapa principal."""
+    # Sem cache: a segunda passada (memória) leria a lista do cache gravado pela primeira.
+    analisador = AnalisadorListaMaterial(usar_cache=False)
+    analisador.registrar_preenchimento = False  # a saída é sempre nova; nada de registro ao lado do modelo
+    dados = medir('extrair_dados_word', lambda: analisador.extrair_dados_word(caminho_docx))
+    medir('preencher_planilha_excel', lambda: analisador.preencher_planilha_excel(
+        caminho_modelo, dados or [], caminho_saida, modo_escrita=modo_escrita))
+    return analisador, len(dados or [])
+
+
+def _somar_etapas(saida):
+    """{nome: {'tempo_s', 'vezes'}} das etapas registradas numa medicao.SaidaMemoria."""
+    return {nome: {'tempo_s': round(soma['total_s'], 6), 'vezes': soma['vezes']}
+            for nome, soma in saida.resumo().items()}
+
+
+def preparar_modelo(caminho_modelo, modo_escrita):
+    """Lê o modelo uma vez (e o workbook, no modo openpyxl); devolve as etapas dessa leitura."""
+    saida = medicao.adicionar_saida(medicao.SaidaMemoria())
+    try:
+        modelo = ModeloPlanilha.carregar(caminho_modelo)
+        modelo.ler_colunas(modelo.parte_ativa, 2)
+        if modo_escrita != 'xml':
+            modelo.workbook()
+    finally:
+        medicao.remover_saida(saida)
+    return _somar_etapas(saida)
+
+
+def medir_pipeline(caminho_docx, caminho_modelo, modo_escrita='openpyxl', medir_memoria=True):
+    """
+    Mede as etapas do pipeline para um documento. O tempo é medido numa passada
+    sem tracemalloc; o pico de memória das etapas principais, numa segunda passada com tracemalloc.
+    """
+    saida_medicao = medicao.SaidaMemoria()
+    picos = {}
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho_saida = os.path.join(pasta, 'saida.xlsx')
+
+        def sem_medir(_nome, funcao):
+            return funcao()
+
+        def medir_pico(nome, funcao):
+            tracemalloc.start()
+            try:
+                resultado = funcao()
+                picos[nome] = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+            return resultado
+
+        # Os avisos de "sem espaço na seção" seriam milhares de linhas nas listas grandes.
+        with contextlib.redirect_stdout(io.StringIO()):
+            medicao.adicionar_saida(saida_medicao)
+            try:
+                analisador, itens = _executar_pipeline(caminho_docx, caminho_modelo, caminho_saida, modo_escrita, sem_medir)
+            finally:
+                medicao.remover_saida(saida_medicao)
+            if medir_memoria:
+                _executar_pipeline(caminho_docx, caminho_modelo, caminho_saida, modo_escrita, medir_pico)
+    etapas = _somar_etapas(saida_medicao)
+    for nome, pico in picos.items():
+        etapas[nome]['pico_memoria_bytes'] = pico
+    return {'itens': itens, 'motor_extracao': analisador.motor_extracao, 'etapas': etapas,
+            'tempo_total_s': round(sum(etapas[nome]['tempo_s'] for nome in ETAPAS_PRINCIPAIS if nome in etapas), 6)}
+
+
+def _versao_codigo():
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def executar_benchmark(contagens, caminho_modelo, modo_escrita='openpyxl', medir_memoria=True, semente=0):
+    """Gera uma lista sintética por contagem de linhas e mede o pipeline em cada uma."""
+    execucao = {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'versao': _versao_codigo(),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'modo_escrita': modo_escrita,
+        'modelo': preparar_modelo(caminho_modelo, modo_escrita),
+        'resultados': [],
+    }
+    with tempfile.TemporaryDirectory() as pasta:
+        for num_linhas in contagens:
+            caminho_docx = gerar_lista_sintetica(os.path.join(pasta, f'lista_{num_linhas}.docx'), num_linhas, semente)
+            resultado = medir_pipeline(caminho_docx, caminho_modelo, modo_escrita, medir_memoria)
+            resultado['linhas'] = num_linhas
+            execucao['resultados'].append(resultado)
+            imprimir_resultado(resultado)
+    return execucao
+
+
+def imprimir_resultado(resultado):
+    partes = []
+    for nome in ETAPAS_IMPRESSAS:
+        etapa = resultado['etapas'].get(nome)
+        if etapa is None:
+            continue
+        memoria = f" ({etapa['pico_memoria_bytes'] / 2**20:.1f} MiB)" if 'pico_memoria_bytes' in etapa else ''
+        partes.append(f"{nome} {etapa['tempo_s']:.3f}s{memoria}")
+    print(f"{resultado['linhas']:>7} linhas | " + ' | '.join(partes) + f" | total {resultado['tempo_total_s']:.3f}s")
+
+
+def salvar_resultados(caminho, execucao):
+    """Acrescenta a execução ao arquivo de resultados (uma lista JSON de execuções)."""
+    execucoes = []
+    if os.path.exists(caminho):
+        with open(caminho, encoding='utf-8') as arquivo:
+            execucoes = json.load(arquivo)
+    execucoes.append(execucao)
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        json.dump(execucoes, arquivo, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline com listas sintéticas do mCalc.")
+    parser.add_argument('--linhas', type=int, nargs='+', default=list(LINHAS_PADRAO),
+                        help="Quantidades de linhas das listas geradas (padrão: 20 1000 10000 100000).")
+    parser.add_argument('--template', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), NOME_MODELO_PADRAO),
+                        help="Planilha modelo usada na etapa de gravação.")
+    parser.add_argument('--escrita', choices=MODOS_ESCRITA, default='openpyxl')
+    parser.add_argument('--saida', default='benchmark_resultados.json', help="Arquivo JSON de resultados.")
+    parser.add_argument('--sem-memoria', action='store_true', help="Não mede o pico de memória (metade do tempo).")
+    parser.add_argument('--semente', type=int, default=0)
+    args = parser.parse_args()
+
+    execucao = executar_benchmark(args.linhas, args.template, args.escrita, not args.sem_memoria, args.semente)
+    salvar_resultados(args.saida, execucao)
+    print(f"\nResultados gravados em {args.saida}", file=sys.stderr)
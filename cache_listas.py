@@ -0,0 +1,199 @@
+import os
+import sys
+import zlib
+import struct
+import hashlib
+import tempfile
+from array import array
+
+from itens import ItemMaterial
+
+# ==============================================================================
+# CACHE EM DISCO DAS LISTAS JÁ EXTRAÍDAS E CLASSIFICADAS
+# ==============================================================================
+# Chave: SHA-256 do conteúdo do arquivo + versão do parser + assinatura das
+# regras de classificação. Mudou qualquer um dos três, a entrada antiga
+# simplesmente deixa de ser encontrada (e sai pela expulsão LRU).
+#
+# Formato de cada entrada (<chave>.bin), comprimido com zlib:
+#   cabeçalho  '<4sHII'  magia, versão do formato, nº de textos, nº de linhas
+#   textos     '<H' + utf-8, sem repetição (perfis, aços, códigos e classes)
+#   colunas    índices dos textos (array 'I') e l_total/peso (array 'd')
+#
+# O índice do catálogo de perfis (catalogo-<chave>.json, ver catalogo.py) fica
+# na mesma pasta e entra na mesma conta de tamanho e expulsão LRU.
+
+VERSAO_PARSER = 2          # incrementar quando a extração/montagem das linhas mudar
+VERSAO_FORMATO = 1
+MAGIA = b'ALMC'
+CABECALHO = struct.Struct('<4sHII')
+TAMANHO_TEXTO = struct.Struct('<H')
+TAMANHO_MAXIMO_PADRAO = 64 * 2**20
+VARIAVEL_PASTA = 'ANALISADOR_CACHE_DIR'
+PREFIXO_CATALOGO = 'catalogo-'
+
+
+def e_entrada(nome):
+    """Se o arquivo da pasta do cache é uma entrada (lista .bin ou índice do catálogo)."""
+    return nome.endswith('.bin') or (nome.startswith(PREFIXO_CATALOGO) and nome.endswith('.json'))
+
+
+def pasta_cache_padrao():
+    """Pasta do cache do usuário (%LOCALAPPDATA% no Windows, ~/.cache nos demais)."""
+    if os.environ.get(VARIAVEL_PASTA):
+        return os.environ[VARIAVEL_PASTA]
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'AnalisadorListaMaterial', 'listas')
+
+
+def hash_arquivo(caminho, tamanho_bloco=1 << 20):
+    """SHA-256 do conteúdo do arquivo, lido em blocos."""
+    resumo = hashlib.sha256()
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(tamanho_bloco), b''):
+            resumo.update(bloco)
+    return resumo.hexdigest()
+
+
+def hash_conteudo(conteudo):
+    """SHA-256 de um conteúdo já lido (o mesmo valor de hash_arquivo para o arquivo com esses bytes)."""
+    return hashlib.sha256(conteudo).hexdigest()
+
+
+def codificar(dados, classificacoes):
+    """Serializa [[perfil, aco, l_total_m, peso]] e {perfil: (codigo, classe)} no formato binário."""
+    indices, textos = {}, []
+
+    def indice(texto):
+        if texto not in indices:
+            indices[texto] = len(textos)
+            textos.append(texto)
+        return indices[texto]
+
+    refs, numeros = array('I'), array('d')
+    for perfil, aco, l_total_m, peso in dados:
+        codigo, classe = classificacoes[perfil]
+        refs.extend((indice(perfil), indice(aco), indice(codigo), indice(classe)))
+        numeros.extend((l_total_m, peso))
+    if sys.byteorder != 'little':
+        refs.byteswap()
+        numeros.byteswap()
+
+    partes = [CABECALHO.pack(MAGIA, VERSAO_FORMATO, len(textos), len(dados))]
+    for texto in textos:
+        bruto = texto.encode('utf-8')
+        partes.append(TAMANHO_TEXTO.pack(len(bruto)))
+        partes.append(bruto)
+    partes.append(refs.tobytes())
+    partes.append(numeros.tobytes())
+    return zlib.compress(b''.join(partes), 6)
+
+
+def decodificar(conteudo):
+    """
+    Inverso de codificar: devolve (dados, classificacoes), com as linhas já como ItemMaterial
+    classificados. ValueError se a entrada não for válida.
+    """
+    bruto = zlib.decompress(conteudo)
+    magia, versao, num_textos, num_linhas = CABECALHO.unpack_from(bruto, 0)
+    if magia != MAGIA or versao != VERSAO_FORMATO:
+        raise ValueError("entrada de cache em formato desconhecido")
+    posicao = CABECALHO.size
+    textos = []
+    for _ in range(num_textos):
+        (tamanho,) = TAMANHO_TEXTO.unpack_from(bruto, posicao)
+        posicao += TAMANHO_TEXTO.size
+        textos.append(bruto[posicao:posicao + tamanho].decode('utf-8'))
+        posicao += tamanho
+
+    refs, numeros = array('I'), array('d')
+    fim_refs = posicao + 4 * num_linhas * refs.itemsize
+    refs.frombytes(bruto[posicao:fim_refs])
+    numeros.frombytes(bruto[fim_refs:fim_refs + 2 * num_linhas * numeros.itemsize])
+    if len(numeros) != 2 * num_linhas:
+        raise ValueError("entrada de cache truncada")
+    if sys.byteorder != 'little':
+        refs.byteswap()
+        numeros.byteswap()
+
+    dados, classificacoes = [], {}
+    for i in range(num_linhas):
+        perfil, aco, codigo, classe = (textos[j] for j in refs[4 * i:4 * i + 4])
+        dados.append(ItemMaterial(perfil, aco, numeros[2 * i], numeros[2 * i + 1], codigo, classe))
+        classificacoes[perfil] = (codigo, classe)
+    return dados, classificacoes
+
+
+class CacheListas:
+    """Cache em disco, um arquivo por lista, com limite de tamanho e expulsão LRU (pela data de acesso)."""
+
+    def __init__(self, pasta=None, tamanho_maximo=TAMANHO_MAXIMO_PADRAO):
+        self.pasta = pasta or pasta_cache_padrao()
+        self.tamanho_maximo = tamanho_maximo
+
+    def chave(self, caminho_arquivo, assinatura_regras='', hash_lista=None):
+        """hash_lista: o SHA-256 do conteúdo, se já calculado (senão o arquivo é lido)."""
+        base = f"{hash_lista or hash_arquivo(caminho_arquivo)}:{VERSAO_PARSER}:{assinatura_regras}"
+        return hashlib.sha256(base.encode('ascii')).hexdigest()
+
+    def _caminho(self, chave):
+        return os.path.join(self.pasta, chave + '.bin')
+
+    def obter(self, chave):
+        """Devolve (dados, classificacoes) ou None. Entradas ilegíveis contam como ausentes."""
+        caminho = self._caminho(chave)
+        try:
+            with open(caminho, 'rb') as arquivo:
+                resultado = decodificar(arquivo.read())
+            os.utime(caminho)  # marca como usada recentemente para a expulsão LRU
+            return resultado
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, struct.error, zlib.error, UnicodeDecodeError, IndexError):
+            self._remover(caminho)
+            return None
+
+    def gravar(self, chave, dados, classificacoes):
+        """Grava a entrada (escrita atômica, vários processos do lote podem gravar juntos)."""
+        try:
+            os.makedirs(self.pasta, exist_ok=True)
+            descritor, temporario = tempfile.mkstemp(dir=self.pasta, suffix='.tmp')
+            with os.fdopen(descritor, 'wb') as arquivo:
+                arquivo.write(codificar(dados, classificacoes))
+            os.replace(temporario, self._caminho(chave))
+            self.expulsar()
+        except OSError as e:
+            print(f"  AVISO: não foi possível gravar o cache ({e}).")
+
+    def expulsar(self):
+        """Apaga as entradas usadas há mais tempo até o cache caber em tamanho_maximo."""
+        entradas, total = [], 0
+        with os.scandir(self.pasta) as itens:
+            for item in itens:
+                if e_entrada(item.name) and item.is_file():
+                    info = item.stat()
+                    entradas.append((info.st_mtime, info.st_size, item.path))
+                    total += info.st_size
+        if total <= self.tamanho_maximo:
+            return
+        for _, tamanho, caminho in sorted(entradas):
+            self._remover(caminho)
+            total -= tamanho
+            if total <= self.tamanho_maximo:
+                break
+
+    def limpar(self):
+        if os.path.isdir(self.pasta):
+            for nome in os.listdir(self.pasta):
+                if e_entrada(nome) or nome.endswith('.tmp'):
+                    self._remover(os.path.join(self.pasta, nome))
+
+    @staticmethod
+    def _remover(caminho):
+        try:
+            os.remove(caminho)
+        except OSError:
+            pass
@@ -0,0 +1,166 @@
+import os
+import re
+import json
+import bisect
+import hashlib
+import tempfile
+import zipfile
+from collections import namedtuple
+from functools import lru_cache
+
+import dimensoes
+import planilha_xml
+import cache_listas
+
+# ==============================================================================
+# CATÁLOGO DE PERFIS LAMINADOS DO MODELO (W e L em polegadas)
+# ==============================================================================
+# O modelo traz os perfis de catálogo como texto na coluna A ("W150X13",
+# "W200X26,6", 'L 1.1/2"x3/16"'), cada um na sua linha. Na primeira vez que um
+# modelo é usado, todas as abas são varridas, os rótulos reconhecidos viram uma
+# chave normalizada (família, medidas em mm) e o índice vai para o disco, ao
+# lado do cache das listas. O índice é refeito quando o conteúdo do modelo muda.
+#
+# Os L do catálogo são os laminados em polegadas: uma descrição de L sem
+# polegadas ("L 38.1 x 4.8", "L DOBRADO 50X50X3") é de cantoneira dobrada em mm
+# e não casa com um laminado, mesmo que as medidas convertidas coincidam.
+#
+# Busca: dicionário pela chave exata (O(1)) e, por família, as chaves ordenadas
+# para a busca com tolerância (bisect, O(log n)).
+
+VERSAO_CATALOGO = 2            # incrementar quando a normalização das chaves mudar (2: L só em polegadas)
+CLASSE_CATALOGO = 'CATALOGO'   # classe dos itens resolvidos pelo catálogo
+COLUNA_KG_M = 12               # L: peso linear dos laminados no modelo
+CASAS_MM = 1                   # as medidas das chaves são arredondadas a 0,1 mm
+
+PADRAO_W = re.compile(r'W\s*(\d+(?:\.\d+)?)\s*X\s*(\d+(?:\.\d+)?)')
+PADRAO_L = re.compile(r'L\s*(\d[\d./]*"?)\s*X\s*(\d[\d./]*"?)(?:\s*X\s*(\d[\d./]*"?))?')
+PADRAO_FRACAO_SEPARADA = re.compile(r'(\d) (\d+/\d+)')   # 1 1/2" -> 1.1/2"
+
+PerfilCatalogo = namedtuple('PerfilCatalogo', 'familia medidas rotulo planilha linha kg_m')
+
+
+def _normalizar(descricao):
+    texto = ' '.join(str(descricao).upper().replace('×', 'X').replace(',', '.').split())
+    return PADRAO_FRACAO_SEPARADA.sub(r'\1.\2', texto)
+
+
+def chave_perfil(descricao):
+    """Chave (família, medidas em mm) de um perfil W ou L (em polegadas), ou None se a descrição não for de catálogo."""
+    texto = _normalizar(descricao)
+    encontrado = PADRAO_W.fullmatch(texto)
+    if encontrado:
+        return 'W', tuple(round(float(g), CASAS_MM) for g in encontrado.groups())
+    encontrado = PADRAO_L.fullmatch(texto)
+    if encontrado and '"' in texto:
+        medidas = [round(dimensoes.converter_para_mm(g), CASAS_MM) for g in encontrado.groups() if g]
+        if 0.0 in medidas:
+            return None
+        if len(medidas) == 2:   # abas iguais: L aba x espessura
+            medidas.insert(0, medidas[0])
+        abas = sorted(medidas[:2], reverse=True)
+        return 'L', (abas[0], abas[1], medidas[2])
+    return None
+
+
+class CatalogoPerfis:
+    """Índice dos perfis de catálogo de um modelo."""
+
+    def __init__(self, perfis):
+        self.perfis = list(perfis)
+        self.por_chave = {}
+        for perfil in self.perfis:
+            self.por_chave.setdefault((perfil.familia, perfil.medidas), perfil)
+        self.familias = {}   # {familia: ([medidas ordenadas], [perfis na mesma ordem])}
+        for (familia, medidas), perfil in sorted(self.por_chave.items()):
+            chaves, perfis_familia = self.familias.setdefault(familia, ([], []))
+            chaves.append(medidas)
+            perfis_familia.append(perfil)
+        self.resolver = lru_cache(maxsize=4096)(self._resolver)
+
+    def __len__(self):
+        return len(self.perfis)
+
+    def _resolver(self, descricao, tolerancia_mm=0.0):
+        """
+        Perfil do modelo para a descrição, ou None. Com tolerancia_mm, aceita o mais próximo
+        cujas medidas difiram no máximo isso (nos W, a segunda medida é o peso em kg/m).
+        """
+        chave = chave_perfil(descricao)
+        if chave is None:
+            return None
+        perfil = self.por_chave.get(chave)
+        if perfil is not None or not tolerancia_mm:
+            return perfil
+        familia, medidas = chave
+        melhor, menor_erro = None, None
+        for candidato in self.faixa(familia, medidas[0] - tolerancia_mm, medidas[0] + tolerancia_mm):
+            erro = max(abs(x - y) for x, y in zip(candidato.medidas, medidas))
+            if erro <= tolerancia_mm and (menor_erro is None or erro < menor_erro):
+                melhor, menor_erro = candidato, erro
+        return melhor
+
+    def faixa(self, familia, minimo, maximo):
+        """Perfis da família com a primeira medida entre minimo e maximo (busca binária)."""
+        chaves, perfis = self.familias.get(familia, ((), ()))
+        inicio = bisect.bisect_left(chaves, (minimo,))
+        fim = bisect.bisect_left(chaves, (maximo + 10 ** -CASAS_MM / 2,))
+        return perfis[inicio:fim]
+
+    @classmethod
+    def colher(cls, caminho_planilha):
+        """Varre todas as abas do modelo (leitura em fluxo) e monta o catálogo."""
+        perfis = []
+        with zipfile.ZipFile(caminho_planilha) as pacote:
+            planilhas = planilha_xml.listar_planilhas(pacote)
+        for nome, parte in planilhas:
+            for linha, valores in planilha_xml.ler_colunas(caminho_planilha, parte, COLUNA_KG_M):
+                rotulo = valores[0]
+                if not isinstance(rotulo, str):
+                    continue
+                chave = chave_perfil(rotulo)
+                if chave is None:
+                    continue
+                kg_m = valores[COLUNA_KG_M - 1]
+                kg_m = float(kg_m) if isinstance(kg_m, (int, float)) and not isinstance(kg_m, bool) else None
+                perfis.append(PerfilCatalogo(chave[0], chave[1], rotulo, nome, linha, kg_m))
+        return cls(perfis)
+
+    @classmethod
+    def carregar(cls, caminho_planilha, pasta_cache=None):
+        """Catálogo do modelo: da memória, do disco, ou colhido do modelo (e gravado no disco)."""
+        info = os.stat(caminho_planilha)
+        pasta = pasta_cache or cache_listas.pasta_cache_padrao()
+        return _carregar(os.path.abspath(caminho_planilha), pasta, info.st_mtime_ns, info.st_size)
+
+
+def _caminho_indice(pasta, caminho_planilha):
+    base = f"{cache_listas.hash_arquivo(caminho_planilha)}:{VERSAO_CATALOGO}"
+    return os.path.join(pasta, cache_listas.PREFIXO_CATALOGO + hashlib.sha256(base.encode('ascii')).hexdigest() + '.json')
+
+
+@lru_cache(maxsize=8)
+def _carregar(caminho_planilha, pasta, _mtime_ns, _tamanho):
+    caminho_indice = _caminho_indice(pasta, caminho_planilha)
+    try:
+        with open(caminho_indice, encoding='utf-8') as arquivo:
+            dados = json.load(arquivo)
+        os.utime(caminho_indice)  # usado recentemente, para a expulsão LRU do cache
+        return CatalogoPerfis(PerfilCatalogo(p[0], tuple(p[1]), *p[2:]) for p in dados['perfis'])
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError, KeyError, TypeError, IndexError):
+        cache_listas.CacheListas._remover(caminho_indice)   # índice corrompido: refaz
+
+    catalogo = CatalogoPerfis.colher(caminho_planilha)
+    try:
+        os.makedirs(pasta, exist_ok=True)
+        descritor, temporario = tempfile.mkstemp(dir=pasta, suffix='.tmp')
+        with os.fdopen(descritor, 'w', encoding='utf-8') as arquivo:
+            json.dump({'versao': VERSAO_CATALOGO, 'perfis': [list(p) for p in catalogo.perfis]},
+                      arquivo, ensure_ascii=False)
+        os.replace(temporario, caminho_indice)
+        cache_listas.CacheListas(pasta).expulsar()
+    except OSError as e:
+        print(f"  AVISO: não foi possível gravar o índice do catálogo ({e}).")
+    return catalogo
@@ -0,0 +1,77 @@
+import os
+import re
+import sys
+import json
+import hashlib
+from functools import lru_cache
+
+# ==============================================================================
+# MOTOR DE REGRAS DE CLASSIFICAÇÃO DE PERFIS
+# ==============================================================================
+# As regras ficam em regras_perfis.json (ordem = precedência) e são compiladas
+# numa única regex ancorada: cada regra vira uma alternativa com lookahead, e o
+# motor de regex testa as alternativas na ordem, então a primeira regra que casa
+# vence -- a mesma precedência da antiga cadeia de `if`s.
+
+ARQUIVO_REGRAS_PADRAO = 'regras_perfis.json'
+TAMANHO_CACHE_PADRAO = 4096
+
+
+def caminho_recurso(nome_arquivo):
+    """Resolve um arquivo de dados ao lado do código (ou dentro do executável do PyInstaller)."""
+    base = getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(base, nome_arquivo)
+
+
+class ClassificadorPerfis:
+    """Classifica descrições de perfil em (código da planilha, classe do perfil)."""
+
+    def __init__(self, regras, padrao=('N/D', 'OUTROS'), tamanho_cache=TAMANHO_CACHE_PADRAO):
+        self.regras = [(r['codigo'], r['classe']) for r in regras]
+        self.padrao = tuple(padrao)
+        self.regex = self._compilar(regras)
+        # Identifica o conjunto de regras (entra na chave do cache de listas já classificadas).
+        self.assinatura = hashlib.sha256(
+            json.dumps([regras, self.padrao], sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+        # Cache LRU por instância: a mesma descrição se repete muito entre listas.
+        self.classificar = lru_cache(maxsize=tamanho_cache)(self._classificar)
+
+    @classmethod
+    def carregar(cls, caminho=None, tamanho_cache=TAMANHO_CACHE_PADRAO):
+        """Lê as regras de um arquivo JSON (padrão: regras_perfis.json)."""
+        caminho = caminho or caminho_recurso(ARQUIVO_REGRAS_PADRAO)
+        with open(caminho, encoding='utf-8') as arquivo:
+            dados = json.load(arquivo)
+        padrao = dados.get('padrao', {'codigo': 'N/D', 'classe': 'OUTROS'})
+        return cls(dados['regras'], (padrao['codigo'], padrao['classe']), tamanho_cache)
+
+    @staticmethod
+    def _compilar(regras):
+        alternativas = []
+        for indice, regra in enumerate(regras):
+            condicoes = []
+            contem = [t.upper() for t in regra.get('contem', [])]
+            comeca_com = [t.upper() for t in regra.get('comeca_com', [])]
+            palavra = [t.upper() for t in regra.get('palavra', [])]
+            if contem:
+                condicoes.append('(?=.*?(?:' + '|'.join(map(re.escape, contem)) + '))')
+            if palavra:
+                condicoes.append(r'(?=.*?\b(?:' + '|'.join(map(re.escape, palavra)) + r')\b)')
+            if comeca_com:
+                condicoes.append('(?=' + '|'.join(map(re.escape, comeca_com)) + ')')
+            if not condicoes:
+                raise ValueError(f"Regra {indice} ({regra.get('codigo')}) sem 'contem', 'palavra' nem 'comeca_com'.")
+            alternativas.append('(?:' + '|'.join(condicoes) + f')(?P<r{indice}>)')
+        return re.compile('^(?:' + '|'.join(alternativas) + ')', re.DOTALL)
+
+    def _classificar(self, desc):
+        encontrado = self.regex.match(desc.upper())
+        if encontrado is None:
+            return self.padrao
+        return self.regras[int(encontrado.lastgroup[1:])]
+
+
+@lru_cache(maxsize=None)
+def classificador_padrao():
+    """Instância compartilhada, carregada uma única vez por processo."""
+    return ClassificadorPerfis.carregar()
@@ -0,0 +1,232 @@
+import math
+import time
+
+# ==============================================================================
+# OTIMIZAÇÃO DE CORTE DE BARRAS (6 m / 12 m)
+# ==============================================================================
+# Problema de corte unidimensional: encaixar as peças nas barras comerciais
+# gastando o mínimo de barras. Tudo é feito em milímetros inteiros para não
+# acumular erro de ponto flutuante.
+#
+# - resolver_ffd: First-Fit Decreasing com árvore de segmentos (máximo de
+#   espaço livre), O(n log n) -- milhares de peças em milissegundos.
+# - resolver_melhorado: parte do FFD e, dentro de um tempo limite, procura por
+#   busca em profundidade um arranjo com menos barras (até o limite inferior).
+#
+# A lista do mCalc só traz o comprimento TOTAL de cada perfil, então cada
+# linha vira barras inteiras + uma peça com o resto (ver pecas_da_linha); o
+# ganho sobre o ROUNDUP da planilha vem de juntar os restos de linhas com o
+# mesmo perfil (mesma seção, dimensões e espessura) nas mesmas barras.
+
+BARRA_PADRAO_M = 6.0
+BARRA_PERFIL_W_M = 12.0    # "BARRA 12M PERFIL W" no modelo
+TEMPO_LIMITE_PADRAO = 0.2  # segundos por grupo no resolver_melhorado
+
+
+def comprimento_barra(codigo_secao):
+    """Barra comercial da seção, em metros: 12 m para os perfis W, 6 m para os demais."""
+    return BARRA_PERFIL_W_M if str(codigo_secao or '').upper().startswith('W') else BARRA_PADRAO_M
+
+
+def para_mm(metros):
+    return int(round(metros * 1000))
+
+
+def pecas_da_linha(l_total_m, barra_m):
+    """Divide o comprimento total de uma linha em barras inteiras + o resto, em mm."""
+    total, barra = para_mm(l_total_m), para_mm(barra_m)
+    inteiras, resto = divmod(total, barra)
+    return [barra] * inteiras + ([resto] if resto else [])
+
+
+class PlanoCorte:
+    """Resultado: barras como listas de índices das peças, com comprimentos em mm."""
+
+    def __init__(self, barras, pecas, barra_mm, perda_corte_mm=0, otimo=False):
+        self.barras = barras
+        self.pecas = pecas
+        self.barra_mm = barra_mm
+        self.perda_corte_mm = perda_corte_mm
+        self.otimo = otimo  # True quando atinge o limite inferior (não dá para usar menos barras)
+
+    @property
+    def num_barras(self):
+        return len(self.barras)
+
+    def sobra_mm(self, barra):
+        usados = sum(self.pecas[i] for i in barra) + self.perda_corte_mm * (len(barra) - 1)
+        return self.barra_mm - usados
+
+    @property
+    def sobra_total_m(self):
+        return sum(self.sobra_mm(barra) for barra in self.barras) / 1000
+
+
+def limite_inferior(pecas, barra_mm, perda_corte_mm=0):
+    """Nenhum arranjo usa menos barras que isto (soma das peças / barra, arredondado para cima)."""
+    if not pecas:
+        return 0
+    return math.ceil(sum(p + perda_corte_mm for p in pecas) / (barra_mm + perda_corte_mm))
+
+
+def _validar(pecas, barra_mm):
+    maior = max(pecas, default=0)
+    if maior > barra_mm:
+        raise ValueError(f"Peça de {maior} mm não cabe na barra de {barra_mm} mm.")
+
+
+def resolver_ffd(pecas, barra_mm, perda_corte_mm=0):
+    """
+    First-Fit Decreasing: cada peça (da maior para a menor) vai para a primeira barra
+    em que cabe. A árvore guarda o maior espaço livre de cada intervalo de barras,
+    então achar "a primeira barra que cabe" custa O(log n).
+    """
+    _validar(pecas, barra_mm)
+    # Com perda de corte, cada peça ocupa p + perda e a barra vale barra + perda
+    # (n peças numa barra precisam de n - 1 cortes).
+    capacidade = barra_mm + perda_corte_mm
+    ordem = sorted(range(len(pecas)), key=lambda i: -pecas[i])
+    tamanho = 1
+    while tamanho < max(len(pecas), 1):
+        tamanho *= 2
+    livre = [0] * (2 * tamanho)   # folhas: espaço livre de cada barra (0 = barra ainda não aberta)
+    barras = []
+
+    for indice in ordem:
+        ocupa = pecas[indice] + perda_corte_mm
+        if livre[1] >= ocupa:
+            no = 1
+            while no < tamanho:  # desce pela esquerda sempre que possível -> primeira barra que cabe
+                no = 2 * no if livre[2 * no] >= ocupa else 2 * no + 1
+            posicao = no - tamanho
+        else:
+            posicao = len(barras)
+            barras.append([])
+            no = tamanho + posicao
+            livre[no] = capacidade
+        barras[posicao].append(indice)
+        livre[no] -= ocupa
+        no //= 2
+        while no:
+            livre[no] = max(livre[2 * no], livre[2 * no + 1])
+            no //= 2
+    return PlanoCorte(barras, list(pecas), barra_mm, perda_corte_mm,
+                      otimo=len(barras) == limite_inferior(pecas, barra_mm, perda_corte_mm))
+
+
+class _TempoEsgotado(Exception):
+    pass
+
+
+def _encaixar(pecas, ordem, num_barras, capacidade, perda_corte_mm, prazo):
+    """
+    Busca em profundidade (iterativa, sem limite de recursão): tenta pôr as peças, na
+    ordem decrescente, em num_barras barras. Barras com o mesmo espaço livre são
+    equivalentes, então só a primeira delas é tentada para cada peça.
+    """
+    total = len(ordem)
+    livres = [capacidade] * num_barras
+    conteudo = [[] for _ in range(num_barras)]
+    restante = [0] * (total + 1)  # soma das peças ainda não colocadas a partir de cada posição
+    for posicao in range(total - 1, -1, -1):
+        restante[posicao] = restante[posicao + 1] + pecas[ordem[posicao]] + perda_corte_mm
+    livre_total = capacidade * num_barras
+    escolha = [-1] * (total + 1)  # barra usada em cada posição (-1: ainda nenhuma)
+    posicao, passos = 0, 0
+
+    while posicao < total:
+        passos += 1
+        if passos % 64 == 0 and time.perf_counter() > prazo:
+            raise _TempoEsgotado()
+        indice = ordem[posicao]
+        ocupa = pecas[indice] + perda_corte_mm
+        inicio = 0
+        if escolha[posicao] >= 0:  # voltando: desfaz a tentativa anterior desta peça
+            barra = escolha[posicao]
+            livres[barra] += ocupa
+            conteudo[barra].pop()
+            livre_total += ocupa
+            inicio = barra + 1
+
+        proxima = -1
+        if restante[posicao] <= livre_total:
+            vistos = set(livres[:inicio])
+            for barra in range(inicio, num_barras):
+                espaco = livres[barra]
+                if espaco >= ocupa and espaco not in vistos:
+                    proxima = barra
+                    break
+                vistos.add(espaco)
+
+        if proxima < 0:
+            escolha[posicao] = -1
+            posicao -= 1
+            if posicao < 0:
+                return None
+            continue
+        livres[proxima] -= ocupa
+        conteudo[proxima].append(indice)
+        livre_total -= ocupa
+        escolha[posicao] = proxima
+        posicao += 1
+    return conteudo
+
+
+def resolver_melhorado(pecas, barra_mm, perda_corte_mm=0, tempo_limite=TEMPO_LIMITE_PADRAO):
+    """
+    Parte do FFD e tenta arranjos com uma barra a menos de cada vez, até o limite
+    inferior, até não achar ou o tempo acabar. Nunca devolve um plano pior que o do FFD.
+    """
+    plano = resolver_ffd(pecas, barra_mm, perda_corte_mm)
+    if plano.otimo:
+        return plano
+    prazo = time.perf_counter() + tempo_limite
+    # Peças do tamanho da barra ocupam uma barra inteira cada; a busca fica só com o resto.
+    inteiras = [[i] for i in range(len(pecas)) if pecas[i] == barra_mm]
+    ordem = sorted((i for i in range(len(pecas)) if pecas[i] != barra_mm), key=lambda i: -pecas[i])
+    minimo = limite_inferior(pecas, barra_mm, perda_corte_mm)
+    try:
+        for num_barras in range(plano.num_barras - len(inteiras) - 1, max(minimo - len(inteiras), 1) - 1, -1):
+            barras = _encaixar(pecas, ordem, num_barras, barra_mm + perda_corte_mm, perda_corte_mm, prazo)
+            if barras is None:
+                break  # se não coube em num_barras, com menos também não cabe
+            plano = PlanoCorte(inteiras + barras, list(pecas), barra_mm, perda_corte_mm,
+                               otimo=len(inteiras) + num_barras == minimo)
+    except _TempoEsgotado:
+        pass
+    return plano
+
+
+def otimizar_linhas(linhas, perda_corte_m=0.0, tempo_limite=None):
+    """
+    linhas: [(linha_planilha, chave_do_perfil, l_total_m, barra_m)]. Linhas com a mesma
+    chave (seção, dimensões, espessura) dividem as barras.
+
+    Devolve {linha_planilha: (barras, sobra_m)}. Cada barra é atribuída à linha da
+    maior peça que ela contém; uma linha cujas peças couberam todas nas barras de
+    outras fica com (0, 0.0). tempo_limite=None usa só o FFD; um número (s) liga o
+    resolver_melhorado com esse tempo para cada grupo.
+    """
+    grupos = {}
+    for linha, chave, l_total_m, barra_m in linhas:
+        grupo = grupos.setdefault((chave, barra_m), ([], []))
+        for peca in pecas_da_linha(l_total_m, barra_m):
+            grupo[0].append(peca)
+            grupo[1].append(linha)
+
+    resultado = {linha: (0, 0.0) for linha, _, _, _ in linhas}
+    perda_corte_mm = para_mm(perda_corte_m)
+    for (_, barra_m), (pecas, dono) in grupos.items():
+        if tempo_limite is None:
+            plano = resolver_ffd(pecas, para_mm(barra_m), perda_corte_mm)
+        else:
+            plano = resolver_melhorado(pecas, para_mm(barra_m), perda_corte_mm, tempo_limite)
+        sobras_mm = {}
+        for barra in plano.barras:
+            linha = dono[max(barra, key=lambda i: pecas[i])]
+            barras, _ = resultado[linha]
+            resultado[linha] = (barras + 1, 0.0)
+            sobras_mm[linha] = sobras_mm.get(linha, 0) + plano.sobra_mm(barra)
+        for linha, sobra in sobras_mm.items():
+            resultado[linha] = (resultado[linha][0], sobra / 1000)
+    return resultado
@@ -0,0 +1,128 @@
+import re
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def _numpy():
+    """Importa o NumPy só quando um array é pedido (ele pesa ~0,1 s no início do programa)."""
+    try:
+        import numpy
+    except ImportError:  # NumPy é opcional: sem ele o lote devolve sempre a lista de tuplas.
+        return None
+    return numpy
+
+
+# ==============================================================================
+# PARSER DE DIMENSÕES (por linha e em lote)
+# ==============================================================================
+PADRAO_NUMEROS = re.compile(r'[\d\./"]+')
+POLEGADA_MM = 25.4
+
+# Frações de polegada mais comuns já convertidas para mm, calculadas com a mesma
+# expressão do parser original ((num / den) * 25.4) para dar o mesmo float.
+TABELA_FRACOES = {
+    f"{num}/{den}": (float(num) / float(den)) * POLEGADA_MM
+    for den in (2, 4, 8, 16, 32, 64)
+    for num in range(1, 2 * den)
+}
+
+# Classes de perfil e quantos números cada uma consome da descrição.
+CLASSES_COM_DIMENSOES = ('PERFIL_U', 'TERCA', 'CANTONEIRA', 'TUBO')
+
+
+def _fracao_para_mm(fracao):
+    valor = TABELA_FRACOES.get(fracao)
+    if valor is None:
+        num, den = map(float, fracao.split('/'))
+        valor = (num / den) * POLEGADA_MM
+    return valor
+
+
+@lru_cache(maxsize=8192)
+def converter_para_mm(dim_str):
+    """Converte dimensões em polegadas (ex: "1.1/2"") para mm."""
+    dim_str = dim_str.strip().replace(',', '.')
+    total_mm = 0.0
+    try:
+        if '"' in dim_str:
+            dim_str = dim_str.replace('"', '')
+            parts = dim_str.split('.')
+            if parts[0] and '/' in parts[0]:
+                total_mm += _fracao_para_mm(parts[0])
+            elif parts[0]:
+                total_mm += float(parts[0]) * POLEGADA_MM
+            if len(parts) > 1 and '/' in parts[1]:
+                total_mm += _fracao_para_mm(parts[1])
+        else:
+            total_mm = float(dim_str)
+    except (ValueError, ZeroDivisionError): return 0.0
+    return total_mm
+
+
+def parse_dimensoes(desc, tipo_perfil):
+    """Aplica regras de extração de dimensões e retorna as 4 medidas principais (a, b, c, esp)."""
+    a, b, c, esp = 0.0, 0.0, 0.0, 0.0
+    if tipo_perfil not in CLASSES_COM_DIMENSOES:
+        return a, b, c, esp
+    numeros = PADRAO_NUMEROS.findall(desc)
+
+    if tipo_perfil == 'PERFIL_U':
+        if len(numeros) >= 3:
+            a, b, esp = converter_para_mm(numeros[0]), converter_para_mm(numeros[1]), converter_para_mm(numeros[2])
+    elif tipo_perfil == 'TERCA':
+        if len(numeros) >= 4:
+            a, b = converter_para_mm(numeros[0]), converter_para_mm(numeros[1])
+            c, esp = converter_para_mm(numeros[2]), converter_para_mm(numeros[3])
+    elif tipo_perfil == 'CANTONEIRA':
+        if len(numeros) == 2:
+            aba = converter_para_mm(numeros[0])
+            a, b = aba, aba
+            esp = converter_para_mm(numeros[1])
+        elif len(numeros) >= 3:
+            a, b, esp = converter_para_mm(numeros[0]), converter_para_mm(numeros[1]), converter_para_mm(numeros[2])
+    elif tipo_perfil == 'TUBO':
+        # Para RED 12.7, a única medida é a espessura/diâmetro.
+        if len(numeros) >= 1:
+            esp = converter_para_mm(numeros[0])
+
+    return a, b, c, esp
+
+
+def parse_dimensoes_lote(descricoes, tipos=None, classificador=None, como_array=False):
+    """
+    Extrai as dimensões de uma lista inteira de descrições de uma vez.
+
+    tipos: classe de perfil de cada descrição; se omitido, usa o classificador
+    (padrão: classificador_padrao()). Cada par (descrição, classe) distinto é
+    interpretado uma única vez (o ganho do lote: as descrições se repetem muito).
+
+    Retorna uma lista de tuplas (a, b, c, esp, classe), uma por descrição, com as
+    repetidas apontando para a mesma tupla. Com como_array, um array estruturado
+    NumPy com os campos a, b, c, esp (float64) e classe (se o NumPy existir). A
+    interpretação das descrições é por regex, não vetorizável: o array não é
+    mais rápido (a lista é mais leve: 8 bytes por linha), então só é montado a
+    pedido e as listas comuns não pagam a importação do NumPy.
+    """
+    descricoes = list(descricoes)
+    if tipos is None:
+        if classificador is None:
+            from classificador import classificador_padrao
+            classificador = classificador_padrao()
+        tipos = [classificador.classificar(desc)[1] for desc in descricoes]
+    else:
+        tipos = list(tipos)
+    if len(tipos) != len(descricoes):
+        raise ValueError("descricoes e tipos precisam ter o mesmo tamanho")
+
+    posicoes = {}
+    indices = [posicoes.setdefault(chave, len(posicoes)) for chave in zip(descricoes, tipos)]
+    unicos = [parse_dimensoes(desc, tipo) + (tipo,) for desc, tipo in posicoes]
+
+    np = _numpy() if como_array else None
+    if np is None:
+        return [unicos[i] for i in indices]
+
+    largura_classe = max((len(t) for t in tipos), default=1) or 1
+    dtype = np.dtype([('a', 'f8'), ('b', 'f8'), ('c', 'f8'), ('esp', 'f8'), ('classe', f'U{largura_classe}')])
+    tabela_unicos = np.array(unicos, dtype=dtype)
+    return tabela_unicos[np.asarray(indices, dtype=np.intp)]
@@ -0,0 +1,238 @@
+import os
+import sys
+import json
+import zlib
+import struct
+from array import array
+
+from itens import TabelaItens
+
+# ==============================================================================
+# EXPORTAÇÃO COLUNAR DAS LINHAS EXTRAÍDAS (Parquet ou formato colunar próprio)
+# ==============================================================================
+# Para a análise de consumo de aço sem reabrir as planilhas preenchidas: as
+# linhas já classificadas de cada lista (python main.py batch ... --exportar
+# linhas.parquet) vão para um único arquivo, com os tipos preservados:
+#
+#   fonte, codigo, classe, perfil, aco        textos ('' = sem valor)
+#   a, b, c, esp (mm), l_total_m, peso (kg)   float64
+#
+# As linhas ficam em memória só até completar um grupo (LINHAS_POR_GRUPO); aí
+# o grupo é gravado e descartado, então um fechamento de mês com milhares de
+# listas sai numa passada com memória constante. Uma lista nunca é dividida
+# entre grupos.
+#
+# Com o pyarrow instalado o arquivo é Parquet (um row group por grupo, textos
+# em dicionário). Sem ele, o mesmo conteúdo vai para o formato colunar abaixo
+# (extensão .colunas), lido de volta por ler_grupos():
+#
+#   MAGICA | grupo... | rodapé JSON | tamanho do rodapé (uint32) | MAGICA
+#
+#   cada grupo é um bloco zlib por coluna, na ordem de COLUNAS:
+#     número: float64 little-endian, uma por linha
+#     texto:  uint32 nº de textos distintos, uint32 comprimento (bytes) de cada
+#             um, os textos em UTF-8 concatenados, uint32 índice de cada linha
+#   rodapé: {"versao", "colunas": [[nome, tipo]], "grupos": [{"linhas",
+#            "blocos": [[deslocamento, tamanho], ...]}]}
+
+COLUNAS = (
+    ('fonte', 'texto'), ('codigo', 'texto'), ('classe', 'texto'), ('perfil', 'texto'),
+    ('a', 'numero'), ('b', 'numero'), ('c', 'numero'), ('esp', 'numero'),
+    ('aco', 'texto'), ('l_total_m', 'numero'), ('peso', 'numero'),
+)
+LINHAS_POR_GRUPO = 65536
+MAGICA = b'LMCOL1\n'
+SUFIXO_COLUNAR = '.colunas'
+VERSAO_COLUNAR = 1
+
+_BIG_ENDIAN = sys.byteorder == 'big'
+
+
+def _pyarrow():
+    """Importa o pyarrow só na exportação; é opcional (sem ele vale o formato colunar próprio)."""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        return None
+    return pyarrow
+
+
+def formato_padrao():
+    return 'parquet' if _pyarrow() is not None else 'colunar'
+
+
+class EscritorColunar:
+    """
+    Grava as linhas de várias listas num arquivo colunar, em grupos. Use com `with`.
+    formato: 'parquet', 'colunar' ou None (Parquet se o pyarrow existir). Sem o pyarrow, um
+    caminho .parquet troca de extensão para .colunas (o caminho final fica em self.caminho).
+    """
+
+    def __init__(self, caminho, formato=None, linhas_por_grupo=LINHAS_POR_GRUPO):
+        self.formato = formato or formato_padrao()
+        if self.formato == 'parquet' and _pyarrow() is None:
+            raise RuntimeError("Exportação Parquet precisa do pyarrow (pip install pyarrow).")
+        base, extensao = os.path.splitext(caminho)
+        if self.formato == 'colunar' and extensao.lower() == '.parquet':
+            print(f"  AVISO: pyarrow não instalado; exportando no formato colunar próprio ({base + SUFIXO_COLUNAR}).")
+            caminho = base + SUFIXO_COLUNAR
+        self.caminho = caminho
+        self.linhas_por_grupo = linhas_por_grupo
+        self.linhas = 0
+        self.grupos = 0
+        self._novo_grupo()
+        if self.formato == 'parquet':
+            pa = _pyarrow()
+            self._esquema = pa.schema([(nome, pa.dictionary(pa.int32(), pa.string()) if tipo == 'texto' else pa.float64())
+                                       for nome, tipo in COLUNAS])
+            self._parquet = pa.parquet.ParquetWriter(caminho, self._esquema, compression='zstd')
+        else:
+            self._arquivo = open(caminho, 'wb')
+            self._arquivo.write(MAGICA)
+            self._rodape = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, *_):
+        self.fechar()
+
+    def _novo_grupo(self):
+        self._tabela = TabelaItens()
+        self._fontes = ['']
+        self._indices_fonte = {}
+        self._ref_fonte = array('I')
+
+    def acrescentar(self, fonte, itens):
+        """Acrescenta as linhas de uma lista (ItemMaterial classificados ou uma TabelaItens)."""
+        antes = len(self._tabela)
+        self._tabela.estender(itens)
+        novas = len(self._tabela) - antes
+        indice = self._indices_fonte.get(fonte)
+        if indice is None:
+            indice = self._indices_fonte[fonte] = len(self._fontes)
+            self._fontes.append(fonte)
+        self._ref_fonte.extend((indice,) * novas)
+        self.linhas += novas
+        if len(self._tabela) >= self.linhas_por_grupo:
+            self._gravar_grupo()
+
+    def _colunas_grupo(self):
+        """(nome, tipo, textos, índices) dos textos e (nome, tipo, array('d'), None) dos números."""
+        tabela = self._tabela
+        for nome, tipo in COLUNAS:
+            if nome == 'fonte':
+                yield nome, tipo, self._fontes, self._ref_fonte
+            elif tipo == 'texto':
+                yield nome, tipo, tabela.textos, tabela.referencias[nome]
+            else:
+                yield nome, tipo, tabela.numeros[nome], None
+
+    def _gravar_grupo(self):
+        n = len(self._tabela)
+        if not n:
+            return
+        if self.formato == 'parquet':
+            pa = _pyarrow()
+            arrays = [pa.DictionaryArray.from_arrays(_array_arrow(pa, pa.int32(), indices), pa.array(valores, type=pa.string()))
+                      if tipo == 'texto' else _array_arrow(pa, pa.float64(), valores)
+                      for _nome, tipo, valores, indices in self._colunas_grupo()]
+            self._parquet.write_table(pa.Table.from_arrays(arrays, schema=self._esquema))
+        else:
+            blocos = []
+            for _nome, tipo, valores, indices in self._colunas_grupo():
+                dados = zlib.compress(_bloco_texto(valores, indices) if tipo == 'texto' else _bytes_le(valores))
+                blocos.append([self._arquivo.tell(), len(dados)])
+                self._arquivo.write(dados)
+            self._rodape.append({'linhas': n, 'blocos': blocos})
+        self.grupos += 1
+        self._novo_grupo()
+
+    def fechar(self):
+        """Grava o último grupo e fecha o arquivo (o rodapé do formato próprio vai no fim)."""
+        if self._tabela is None:
+            return
+        try:
+            self._gravar_grupo()
+        finally:
+            self._tabela = None
+            if self.formato == 'parquet':
+                self._parquet.close()
+            else:
+                rodape = json.dumps({'versao': VERSAO_COLUNAR, 'colunas': [list(c) for c in COLUNAS],
+                                     'grupos': self._rodape}).encode('utf-8')
+                self._arquivo.write(rodape + struct.pack('<I', len(rodape)) + MAGICA)
+                self._arquivo.close()
+
+
+def _array_arrow(pa, tipo, valores):
+    """Array do Arrow sobre a memória do array('I'/'d'), sem copiar (os índices cabem em int32)."""
+    return pa.Array.from_buffers(tipo, len(valores), [None, pa.py_buffer(valores)])
+
+
+def _bytes_le(valores):
+    """Bytes little-endian de um array (troca a ordem só em máquina big-endian)."""
+    if _BIG_ENDIAN:
+        valores = array(valores.typecode, valores)
+        valores.byteswap()
+    return valores.tobytes()
+
+
+def _bloco_texto(textos, indices):
+    codificados = [texto.encode('utf-8') for texto in textos]
+    cabecalho = array('I', [len(codificados)])
+    cabecalho.extend(len(texto) for texto in codificados)
+    return _bytes_le(cabecalho) + b''.join(codificados) + _bytes_le(array('I', indices))
+
+
+def _array_le(typecode, dados):
+    valores = array(typecode)
+    valores.frombytes(dados)
+    if _BIG_ENDIAN:
+        valores.byteswap()
+    return valores
+
+
+def ler_grupos(caminho):
+    """
+    Lê de volta o arquivo exportado, um grupo por vez: {coluna: lista de textos ou array('d')}.
+    Aceita o formato colunar próprio e, com o pyarrow, o Parquet.
+    """
+    with open(caminho, 'rb') as arquivo:
+        inicio = arquivo.read(len(MAGICA))
+        if inicio != MAGICA:
+            yield from _ler_grupos_parquet(caminho)
+            return
+        arquivo.seek(-(len(MAGICA) + 4), os.SEEK_END)
+        tamanho = struct.unpack('<I', arquivo.read(4))[0]
+        arquivo.seek(-(len(MAGICA) + 4 + tamanho), os.SEEK_END)
+        rodape = json.loads(arquivo.read(tamanho).decode('utf-8'))
+        if rodape.get('versao') != VERSAO_COLUNAR:
+            raise ValueError(f"Versão do formato colunar não suportada: {rodape.get('versao')}")
+        for grupo in rodape['grupos']:
+            colunas = {}
+            for (nome, tipo), (deslocamento, tamanho) in zip(rodape['colunas'], grupo['blocos']):
+                arquivo.seek(deslocamento)
+                dados = zlib.decompress(arquivo.read(tamanho))
+                if tipo == 'numero':
+                    colunas[nome] = _array_le('d', dados)
+                    continue
+                quantidade = struct.unpack_from('<I', dados)[0]
+                comprimentos = _array_le('I', dados[4:4 + 4 * quantidade])
+                posicao, textos = 4 + 4 * quantidade, []
+                for comprimento in comprimentos:
+                    textos.append(dados[posicao:posicao + comprimento].decode('utf-8'))
+                    posicao += comprimento
+                colunas[nome] = [textos[i] for i in _array_le('I', dados[posicao:])]
+            yield colunas
+
+
+def _ler_grupos_parquet(caminho):
+    pa = _pyarrow()
+    if pa is None:
+        raise RuntimeError(f"'{caminho}' não é do formato colunar próprio; para ler Parquet instale o pyarrow.")
+    arquivo = pa.parquet.ParquetFile(caminho)
+    for indice in range(arquivo.num_row_groups):
+        colunas = arquivo.read_row_group(indice).to_pydict()
+        yield {nome: (array('d', colunas[nome]) if tipo == 'numero' else colunas[nome]) for nome, tipo in COLUNAS}
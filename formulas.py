@@ -0,0 +1,280 @@
+import os
+import re
+import math
+from functools import lru_cache
+
+import planilha_xml
+from modelo_planilha import ModeloPlanilha
+
+# ==============================================================================
+# AVALIADOR DAS FÓRMULAS DA PLANILHA MODELO (sem abrir o Excel)
+# ==============================================================================
+# As células da aba vêm do ModeloPlanilha (o mesmo modelo lido uma vez para o
+# preenchimento), com as fórmulas como texto. Aqui cada fórmula é traduzida
+# uma única vez para uma função Python (cacheada por modelo) e os valores são
+# calculados sob demanda, com as células preenchidas pelo programa
+# sobrepostas às do modelo.
+#
+# Cobre o subconjunto usado na TABELA-DE-AÇO: números, referências (A1, $A$1),
+# intervalos (A1:B9), + - * / ^, sinal, parênteses, PI(), SUM() e ROUNDUP().
+
+class ErroFormula(ValueError):
+    """Fórmula fora do subconjunto suportado, ou erro de cálculo (#VALUE!, #DIV/0!, ...)."""
+
+
+PADRAO_TOKEN = re.compile(r"""
+    \s*(?:
+      (?P<intervalo>\$?[A-Z]{1,3}\$?\d+:\$?[A-Z]{1,3}\$?\d+)
+    | (?P<funcao>[A-Z][A-Z0-9.]*)\(
+    | (?P<celula>\$?[A-Z]{1,3}\$?\d+)
+    | (?P<numero>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+    | (?P<operador>[-+*/^(),])
+    )""", re.VERBOSE)
+PADRAO_REFERENCIA = re.compile(r'\$?([A-Z]{1,3})\$?(\d+)')
+
+
+def _referencia(texto):
+    coluna, linha = PADRAO_REFERENCIA.fullmatch(texto).groups()
+    return int(linha), planilha_xml.numero_coluna(coluna)
+
+
+def _tokenizar(formula):
+    tokens, posicao = [], 0
+    texto = formula.upper()
+    while posicao < len(texto):
+        if texto[posicao:].isspace():
+            break
+        token = PADRAO_TOKEN.match(texto, posicao)
+        if token is None:
+            raise ErroFormula(f"trecho não suportado em '={formula}': {formula[posicao:]!r}")
+        tokens.append((token.lastgroup, token.group(token.lastgroup)))
+        posicao = token.end()
+    return tokens
+
+
+class _Tradutor:
+    """
+    Descida recursiva que gera o código Python da fórmula, todo entre parênteses
+    (a precedência do Excel difere da do Python: -2^2 é 4 no Excel).
+    `n(l, c)` dá o valor numérico de uma célula e `r(l1, c1, l2, c2)` os valores de um intervalo.
+    """
+
+    FUNCOES = {'PI': 'PI', 'SUM': 'SUM', 'ROUNDUP': 'ROUNDUP'}
+
+    def __init__(self, formula):
+        self.formula = formula
+        self.tokens = _tokenizar(formula)
+        self.posicao = 0
+
+    def traduzir(self):
+        codigo = self._soma()
+        if self.posicao != len(self.tokens):
+            raise ErroFormula(f"sobra na fórmula '={self.formula}': {self.tokens[self.posicao][1]!r}")
+        return codigo
+
+    def _espiar(self):
+        return self.tokens[self.posicao] if self.posicao < len(self.tokens) else (None, None)
+
+    def _consumir(self, esperado=None):
+        tipo, valor = self._espiar()
+        if tipo is None or (esperado is not None and valor != esperado):
+            raise ErroFormula(f"esperado {esperado or 'mais'} em '={self.formula}'")
+        self.posicao += 1
+        return tipo, valor
+
+    def _soma(self):
+        codigo = self._produto()
+        while self._espiar() in (('operador', '+'), ('operador', '-')):
+            operador = self._consumir()[1]
+            codigo = f"({codigo} {operador} {self._produto()})"
+        return codigo
+
+    def _produto(self):
+        codigo = self._potencia()
+        while self._espiar() in (('operador', '*'), ('operador', '/')):
+            operador = self._consumir()[1]
+            direita = self._potencia()
+            codigo = f"({codigo} * {direita})" if operador == '*' else f"DIV({codigo}, {direita})"
+        return codigo
+
+    def _potencia(self):
+        codigo = self._sinal()
+        while self._espiar() == ('operador', '^'):
+            self._consumir()
+            codigo = f"({codigo} ** {self._sinal()})"
+        return codigo
+
+    def _sinal(self):
+        if self._espiar() in (('operador', '-'), ('operador', '+')):
+            operador = self._consumir()[1]
+            return f"({operador}{self._sinal()})"
+        return self._primario()
+
+    def _primario(self):
+        tipo, valor = self._consumir()
+        if tipo == 'numero':
+            return repr(float(valor))
+        if tipo == 'celula':
+            return "n(%d, %d)" % _referencia(valor)
+        if tipo == 'intervalo':
+            raise ErroFormula(f"intervalo fora de função em '={self.formula}'")
+        if tipo == 'funcao':
+            return self._funcao(valor)
+        if valor == '(':
+            codigo = self._soma()
+            self._consumir(')')
+            return codigo
+        raise ErroFormula(f"token inesperado {valor!r} em '={self.formula}'")
+
+    def _funcao(self, nome):
+        if nome not in self.FUNCOES:
+            raise ErroFormula(f"função não suportada: {nome}() em '={self.formula}'")
+        argumentos = []
+        if self._espiar() != ('operador', ')'):
+            while True:
+                if self._espiar()[0] == 'intervalo':
+                    inicio, fim = self._consumir()[1].split(':')
+                    argumentos.append("r(%d, %d, %d, %d)" % (_referencia(inicio) + _referencia(fim)))
+                else:
+                    argumentos.append(self._soma())
+                if self._espiar() != ('operador', ','):
+                    break
+                self._consumir()
+        self._consumir(')')
+        return f"{self.FUNCOES[nome]}({', '.join(argumentos)})"
+
+
+def _dividir(a, b):
+    if b == 0:
+        raise ErroFormula('#DIV/0!')
+    return a / b
+
+
+def _pi():
+    return math.pi
+
+
+def _somar(*argumentos):
+    """SUM: nos intervalos, texto e células vazias são ignorados (como no Excel)."""
+    total = 0.0
+    for argumento in argumentos:
+        if isinstance(argumento, list):
+            total += sum(v for v in argumento if isinstance(v, (int, float)) and not isinstance(v, bool))
+        else:
+            total += argumento
+    return total
+
+
+def _arredondar_para_cima(numero, digitos=0.0):
+    """ROUNDUP do Excel: afasta do zero; os dígitos são truncados (ROUNDUP(x; 0,5) usa 0)."""
+    digitos = int(digitos)
+    # O Excel trabalha com 15 algarismos significativos: 12/6 não pode virar 2,0000000000000004 -> 3.
+    numero = float(f"{numero:.15g}")
+    fator = 10.0 ** digitos
+    return math.copysign(math.ceil(abs(numero) * fator) / fator, numero)
+
+
+AMBIENTE = {'__builtins__': {}, 'DIV': _dividir, 'PI': _pi, 'SUM': _somar, 'ROUNDUP': _arredondar_para_cima}
+
+
+def compilar_formula(formula):
+    """Traduz o texto de uma fórmula (com ou sem '=') numa função f(n, r) -> float."""
+    formula = formula[1:] if formula.startswith('=') else formula
+    codigo = _Tradutor(formula).traduzir()
+    return eval(compile(f"lambda n, r: {codigo}", f"={formula}", 'eval'), AMBIENTE)
+
+
+class ModeloFormulas:
+    """Valores e fórmulas compiladas de uma aba do modelo."""
+
+    def __init__(self, valores, formulas, titulo=None):
+        self.valores = valores      # {(linha, coluna): valor}, sem as fórmulas
+        self.formulas = formulas    # {(linha, coluna): função compilada ou ErroFormula}
+        self.titulo = titulo
+
+    @classmethod
+    def carregar(cls, caminho_planilha, nome_planilha=None):
+        """Lê o modelo uma vez por arquivo (o cache é invalidado se o arquivo mudar)."""
+        info = os.stat(caminho_planilha)
+        return _carregar(os.path.abspath(caminho_planilha), nome_planilha, info.st_mtime_ns, info.st_size)
+
+    def avaliar(self, sobrepor=None):
+        """Nova avaliação com as células de `sobrepor` ({(linha, coluna): valor}) no lugar das do modelo."""
+        return Avaliacao(self, sobrepor or {})
+
+
+@lru_cache(maxsize=8)
+def _carregar(caminho_planilha, nome_planilha, _mtime_ns, _tamanho):
+    # As células vêm do ModeloPlanilha já lido pelo preenchimento (com as fórmulas
+    # compartilhadas expandidas para cada célula): o modelo não é interpretado de novo.
+    modelo = ModeloPlanilha.carregar(caminho_planilha)
+    nome_planilha = nome_planilha or modelo.nome_ativa
+    if nome_planilha not in modelo.planilhas:
+        raise KeyError(f"A aba '{nome_planilha}' não existe na planilha.")
+    valores, formulas = {}, {}
+    compiladas = {}
+    linhas = modelo.ler_colunas(nome_planilha, modelo.ultima_coluna(nome_planilha), formulas=True)
+    for linha, celulas in linhas:
+        for coluna, valor in enumerate(celulas, start=1):
+            if valor is None:
+                continue
+            chave = (linha, coluna)
+            if isinstance(valor, str) and valor.startswith('='):
+                if valor not in compiladas:
+                    try:
+                        compiladas[valor] = compilar_formula(valor)
+                    except ErroFormula as e:
+                        compiladas[valor] = e
+                formulas[chave] = compiladas[valor]
+            else:
+                valores[chave] = valor
+    return ModeloFormulas(valores, formulas, nome_planilha)
+
+
+class Avaliacao:
+    """Calcula células sob demanda, guardando cada resultado (cada célula é calculada uma vez)."""
+
+    def __init__(self, modelo, sobrepor):
+        self.modelo = modelo
+        self.sobrepor = sobrepor
+        self.calculados = {}
+        self._em_calculo = set()
+
+    def valor(self, linha, coluna):
+        """Valor da célula como o Excel mostraria (fórmulas calculadas). Levanta ErroFormula."""
+        chave = (linha, coluna)
+        if chave in self.sobrepor:
+            return self.sobrepor[chave]
+        if chave in self.calculados:
+            return self.calculados[chave]
+        formula = self.modelo.formulas.get(chave)
+        if formula is None:
+            return self.modelo.valores.get(chave)
+        if isinstance(formula, ErroFormula):
+            raise formula
+        if chave in self._em_calculo:
+            raise ErroFormula(f"referência circular em {planilha_xml.letra_coluna(coluna)}{linha}")
+        self._em_calculo.add(chave)
+        try:
+            resultado = formula(self.numero, self.intervalo)
+        finally:
+            self._em_calculo.discard(chave)
+        self.calculados[chave] = resultado
+        return resultado
+
+    def numero(self, linha, coluna):
+        """Valor usado numa conta: vazio é 0, texto numérico é convertido, outro texto é #VALUE!."""
+        valor = self.valor(linha, coluna)
+        if valor is None:
+            return 0.0
+        if isinstance(valor, str):
+            try:
+                return float(valor.replace(',', '.')) if valor.strip() else 0.0
+            except ValueError:
+                raise ErroFormula(f"#VALUE! ({planilha_xml.letra_coluna(coluna)}{linha} = {valor!r})") from None
+        return float(valor)
+
+    def intervalo(self, linha_1, coluna_1, linha_2, coluna_2):
+        return [self.valor(linha, coluna)
+                for linha in range(min(linha_1, linha_2), max(linha_1, linha_2) + 1)
+                for coluna in range(min(coluna_1, coluna_2), max(coluna_1, coluna_2) + 1)]
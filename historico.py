@@ -0,0 +1,183 @@
+import os
+import sqlite3
+import time
+
+import cache_listas
+from catalogo import chave_perfil
+
+# ==============================================================================
+# HISTÓRICO DAS LISTAS PROCESSADAS (SQLite local)
+# ==============================================================================
+# Opcional (--historico no lote/vigia): cada lista processada acrescenta as
+# suas linhas ao banco, numa única transação. Tabelas:
+#
+#   listas         uma linha por processamento (hash do arquivo, projeto, data)
+#   itens          as linhas da lista: código, família, medidas, aço, L, peso
+#   resumo_mensal  peso e nº de itens por (família, mês), atualizado na mesma
+#                  transação; é ele que responde a consulta de tonelagem em
+#                  milissegundos, sem varrer os itens de anos de histórico.
+#
+# Reprocessar a mesma lista (mesmo hash) grava o processamento e as linhas de
+# novo, mas não soma outra vez no resumo mensal (listas.repetida = 1).
+#
+# Vários processos do lote gravam no mesmo arquivo: modo WAL e espera de até
+# TEMPO_ESPERA_S pelo bloqueio de escrita.
+
+NOME_BANCO = 'historico.sqlite3'
+VARIAVEL_BANCO = 'ANALISADOR_HISTORICO'
+TEMPO_ESPERA_S = 30.0
+VERSAO_ESQUEMA = 1
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS listas (
+    id INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL,
+    arquivo TEXT NOT NULL,
+    projeto TEXT,
+    processado_em TEXT NOT NULL,
+    mes TEXT NOT NULL,
+    itens INTEGER NOT NULL,
+    peso_total REAL NOT NULL,
+    repetida INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS listas_hash ON listas (hash);
+CREATE INDEX IF NOT EXISTS listas_data ON listas (processado_em);
+
+CREATE TABLE IF NOT EXISTS itens (
+    lista_id INTEGER NOT NULL REFERENCES listas (id),
+    codigo TEXT,
+    familia TEXT NOT NULL,
+    classe TEXT,
+    perfil TEXT NOT NULL,
+    a REAL, b REAL, c REAL, esp REAL,
+    aco TEXT,
+    l_total_m REAL,
+    peso REAL,
+    processado_em TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS itens_codigo ON itens (codigo, processado_em);
+CREATE INDEX IF NOT EXISTS itens_data ON itens (processado_em);
+CREATE INDEX IF NOT EXISTS itens_lista ON itens (lista_id);
+
+CREATE TABLE IF NOT EXISTS resumo_mensal (
+    familia TEXT NOT NULL,
+    mes TEXT NOT NULL,
+    peso REAL NOT NULL,
+    itens INTEGER NOT NULL,
+    PRIMARY KEY (familia, mes)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS resumo_mes ON resumo_mensal (mes);
+"""
+
+
+def caminho_padrao():
+    """historico.sqlite3 na pasta do programa no perfil do usuário (ou em ANALISADOR_HISTORICO)."""
+    if os.environ.get(VARIAVEL_BANCO):
+        return os.environ[VARIAVEL_BANCO]
+    return os.path.join(os.path.dirname(cache_listas.pasta_cache_padrao()), NOME_BANCO)
+
+
+def familia_perfil(item):
+    """Família para os totais: W/L dos laminados, a classe dos dobrados e, nos demais, o código."""
+    chave = chave_perfil(item.perfil)
+    if chave is not None:
+        return chave[0]
+    if item.classe and item.classe != 'OUTROS':
+        return item.classe
+    return item.codigo or 'N/D'
+
+
+class HistoricoListas:
+    """Banco SQLite do histórico. Use com `with` (fecha a conexão no fim)."""
+
+    def __init__(self, caminho=None):
+        self.caminho = caminho or caminho_padrao()
+        pasta = os.path.dirname(os.path.abspath(self.caminho))
+        os.makedirs(pasta, exist_ok=True)
+        self.conexao = sqlite3.connect(self.caminho, timeout=TEMPO_ESPERA_S, isolation_level=None)
+        self.conexao.execute('PRAGMA journal_mode=WAL')
+        self.conexao.execute('PRAGMA synchronous=NORMAL')
+        versao = self.conexao.execute('PRAGMA user_version').fetchone()[0]
+        if versao < VERSAO_ESQUEMA:
+            self.conexao.executescript(ESQUEMA)
+            self.conexao.execute(f'PRAGMA user_version={VERSAO_ESQUEMA}')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.fechar()
+
+    def fechar(self):
+        self.conexao.close()
+
+    def registrar_lista(self, arquivo, itens, projeto=None, hash_lista=None, quando=None):
+        """
+        Acrescenta um processamento e as suas linhas (ItemMaterial já classificados) numa
+        única transação. projeto: padrão, o nome da pasta da lista. Devolve o id da lista.
+        """
+        hash_lista = hash_lista or cache_listas.hash_arquivo(arquivo)
+        projeto = projeto or os.path.basename(os.path.dirname(os.path.abspath(arquivo)))
+        processado_em = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(quando))
+        mes = processado_em[:7]
+        linhas = [(item.codigo, familia_perfil(item), item.classe, item.perfil, item.a, item.b, item.c, item.esp,
+                   item.aco, item.l_total_m, item.peso) for item in itens]
+        cursor = self.conexao.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            repetida = cursor.execute('SELECT 1 FROM listas WHERE hash = ? LIMIT 1', (hash_lista,)).fetchone() is not None
+            cursor.execute('INSERT INTO listas (hash, arquivo, projeto, processado_em, mes, itens, peso_total, repetida) '
+                           'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                           (hash_lista, os.path.basename(arquivo), projeto, processado_em, mes, len(linhas),
+                            sum(linha[10] for linha in linhas), int(repetida)))
+            lista_id = cursor.lastrowid
+            cursor.executemany('INSERT INTO itens (lista_id, codigo, familia, classe, perfil, a, b, c, esp, aco, '
+                               'l_total_m, peso, processado_em) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                               [(lista_id, *linha, processado_em) for linha in linhas])
+            if not repetida:
+                por_familia = {}
+                for linha in linhas:
+                    peso, quantidade = por_familia.get(linha[1], (0.0, 0))
+                    por_familia[linha[1]] = (peso + linha[10], quantidade + 1)
+                cursor.executemany('INSERT INTO resumo_mensal (familia, mes, peso, itens) VALUES (?, ?, ?, ?) '
+                                   'ON CONFLICT (familia, mes) DO UPDATE SET peso = peso + excluded.peso, '
+                                   'itens = itens + excluded.itens',
+                                   [(familia, mes, peso, quantidade) for familia, (peso, quantidade) in por_familia.items()])
+            cursor.execute('COMMIT')
+        except BaseException:
+            cursor.execute('ROLLBACK')
+            raise
+        return lista_id
+
+    def tonelagem_mensal(self, desde=None, ate=None, familia=None):
+        """[(familia, mes 'AAAA-MM', toneladas, itens)] das listas distintas, por mês e família."""
+        condicoes, parametros = [], []
+        if desde:
+            condicoes.append('mes >= ?')
+            parametros.append(desde[:7])
+        if ate:
+            condicoes.append('mes <= ?')
+            parametros.append(ate[:7])
+        if familia:
+            condicoes.append('familia = ?')
+            parametros.append(familia)
+        onde = ('WHERE ' + ' AND '.join(condicoes)) if condicoes else ''
+        return [(familia, mes, peso / 1000.0, itens) for familia, mes, peso, itens in self.conexao.execute(
+            f'SELECT familia, mes, peso, itens FROM resumo_mensal {onde} ORDER BY mes, familia', parametros)]
+
+
+def imprimir_tonelagem(linhas):
+    """Tabela família x mês, com o total de cada mês."""
+    if not linhas:
+        print("Nenhuma lista no histórico para o período.")
+        return
+    mes_atual, total = None, 0.0
+    for familia, mes, toneladas, itens in linhas:
+        if mes != mes_atual:
+            if mes_atual is not None:
+                print(f"  {'total':<22} {total:10.3f} t")
+            print(mes)
+            mes_atual, total = mes, 0.0
+        total += toneladas
+        print(f"  {familia:<22} {toneladas:10.3f} t  ({itens} itens)")
+    print(f"  {'total':<22} {total:10.3f} t")
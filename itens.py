@@ -0,0 +1,129 @@
+import sys
+from array import array
+
+# ==============================================================================
+# REPRESENTAÇÃO DAS LINHAS DA LISTA DE MATERIAL
+# ==============================================================================
+# ItemMaterial: uma linha, criada uma única vez na extração e completada com a
+# classificação e as medidas; __slots__ evita o dicionário por objeto. Ela se
+# comporta como a antiga lista [perfil, aco, l_total_m, peso] (desempacotar,
+# item[0], len), então o código que recebe listas continua funcionando.
+#
+# TabelaItens: as mesmas linhas em colunas (textos numa tabela sem repetição +
+# índices em array('I'), números em array('d')), para trabalhar com muitas
+# listas sem um objeto por linha (é o buffer da exportação colunar).
+
+
+class ItemMaterial:
+    """Uma linha da lista: descrição, aço, comprimento total (m), peso (kg), classificação e medidas (mm)."""
+
+    __slots__ = ('perfil', 'aco', 'l_total_m', 'peso', 'codigo', 'classe', 'a', 'b', 'c', 'esp')
+
+    def __init__(self, perfil, aco, l_total_m, peso, codigo=None, classe=None, a=0.0, b=0.0, c=0.0, esp=0.0):
+        self.perfil = perfil
+        self.aco = sys.intern(aco)  # poucos aços diferentes: todas as linhas dividem o mesmo texto
+        self.l_total_m = l_total_m
+        self.peso = peso
+        self.codigo = codigo
+        self.classe = classe
+        self.a, self.b, self.c, self.esp = a, b, c, esp
+
+    def classificar(self, codigo, classe, medidas):
+        self.codigo, self.classe = codigo, classe
+        self.a, self.b, self.c, self.esp = medidas
+
+    @property
+    def medidas(self):
+        return self.a, self.b, self.c, self.esp
+
+    # Compatibilidade com a lista [perfil, aco, l_total_m, peso].
+    def __iter__(self):
+        return iter((self.perfil, self.aco, self.l_total_m, self.peso))
+
+    def __getitem__(self, indice):
+        return (self.perfil, self.aco, self.l_total_m, self.peso)[indice]
+
+    def __len__(self):
+        return 4
+
+    def __eq__(self, outro):
+        if isinstance(outro, ItemMaterial):
+            return all(getattr(self, campo) == getattr(outro, campo) for campo in self.__slots__)
+        if isinstance(outro, (list, tuple)):
+            return list(self) == list(outro)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return (f"ItemMaterial({self.perfil!r}, {self.aco!r}, {self.l_total_m!r}, {self.peso!r}, "
+                f"codigo={self.codigo!r}, classe={self.classe!r})")
+
+
+class TabelaItens:
+    """Linhas da lista guardadas em colunas (sem um objeto por linha)."""
+
+    CAMPOS_TEXTO = ('perfil', 'aco', 'codigo', 'classe')
+    CAMPOS_NUMERO = ('l_total_m', 'peso', 'a', 'b', 'c', 'esp')
+
+    def __init__(self):
+        self.textos = ['']  # o índice 0 é "sem valor" (codigo/classe ainda não definidos)
+        self._indices = {'': 0}
+        self.referencias = {campo: array('I') for campo in self.CAMPOS_TEXTO}
+        self.numeros = {campo: array('d') for campo in self.CAMPOS_NUMERO}
+
+    @classmethod
+    def de_itens(cls, itens):
+        tabela = cls()
+        tabela.estender(itens)
+        return tabela
+
+    def _indice_texto(self, texto):
+        texto = texto or ''
+        indice = self._indices.get(texto)
+        if indice is None:
+            indice = self._indices[texto] = len(self.textos)
+            self.textos.append(texto)
+        return indice
+
+    def adicionar(self, item):
+        """Acrescenta um ItemMaterial (ou uma lista [perfil, aco, l_total_m, peso])."""
+        if not isinstance(item, ItemMaterial):
+            item = ItemMaterial(*item)
+        for campo in self.CAMPOS_TEXTO:
+            self.referencias[campo].append(self._indice_texto(getattr(item, campo)))
+        for campo in self.CAMPOS_NUMERO:
+            self.numeros[campo].append(getattr(item, campo))
+
+    def estender(self, itens):
+        """Acrescenta várias linhas; de outra TabelaItens, coluna a coluna (sem remontar as linhas)."""
+        if isinstance(itens, TabelaItens):
+            mapa = [self._indice_texto(texto) for texto in itens.textos]
+            for campo in self.CAMPOS_TEXTO:
+                self.referencias[campo].extend(mapa[i] for i in itens.referencias[campo])
+            for campo in self.CAMPOS_NUMERO:
+                self.numeros[campo].extend(itens.numeros[campo])
+            return
+        for item in itens:
+            self.adicionar(item)
+
+    def __len__(self):
+        return len(self.numeros['peso'])
+
+    def __getitem__(self, linha):
+        """Remonta a linha como ItemMaterial (criado na hora, só para quem precisa dele)."""
+        textos = [self.textos[self.referencias[campo][linha]] or None for campo in self.CAMPOS_TEXTO]
+        textos[1] = textos[1] or ''
+        numeros = [self.numeros[campo][linha] for campo in self.CAMPOS_NUMERO]
+        return ItemMaterial(textos[0] or '', textos[1], *numeros[:2], textos[2], textos[3], *numeros[2:])
+
+    def __iter__(self):
+        for linha in range(len(self)):
+            yield self[linha]
+
+    def coluna(self, campo):
+        """Uma coluna inteira: lista de textos ou o próprio array('d') dos números."""
+        if campo in self.numeros:
+            return self.numeros[campo]
+        textos = self.textos
+        return [textos[i] for i in self.referencias[campo]]
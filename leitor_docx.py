@@ -0,0 +1,93 @@
+import zipfile
+import xml.etree.ElementTree as ET
+
+# ==============================================================================
+# LEITOR EM FLUXO DO DOCX (sem montar o modelo de objetos do python-docx)
+# ==============================================================================
+W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+TAG_TBL = W_NS + 'tbl'
+TAG_TR = W_NS + 'tr'
+TAG_TC = W_NS + 'tc'
+TAG_P = W_NS + 'p'
+TAG_T = W_NS + 't'
+TAG_TAB = W_NS + 'tab'
+TAG_BR = W_NS + 'br'
+TAG_CR = W_NS + 'cr'
+TAG_HIFEN = W_NS + 'noBreakHyphen'
+ATTR_TIPO = W_NS + 'type'
+
+
+TAG_BODY = W_NS + 'body'
+DOCUMENTO = 'word/document.xml'
+
+
+class DocumentoAusente(ValueError):
+    """O arquivo é um zip, mas não um documento do Word (não tem o word/document.xml)."""
+
+
+def ler_linhas_tabelas(caminho_arquivo_word):
+    """
+    Lê o word/document.xml em fluxo e gera (indice_tabela, [texto das células]) para cada
+    linha de cada tabela do corpo, com o texto de cada célula no mesmo formato de
+    `cell.text` do python-docx (parágrafos unidos por '\\n'). Tabelas aninhadas numa
+    célula não contam (nem o seu texto). Mesmo contrato de leitor_rtf.ler_linhas_tabelas.
+    caminho_arquivo_word pode ser também um arquivo binário aberto (ex: io.BytesIO).
+    """
+    with zipfile.ZipFile(caminho_arquivo_word) as pacote:
+        if DOCUMENTO not in pacote.namelist():
+            raise DocumentoAusente(f"O pacote não tem o {DOCUMENTO}.")
+        with pacote.open(DOCUMENTO) as documento_xml:
+            yield from _varrer_tabelas(documento_xml)
+
+
+def _varrer_tabelas(documento_xml):
+    profundidade_tabela = 0
+    indice_tabela = -1
+    corpo = None
+    celulas, paragrafos, trechos = [], [], []
+
+    for evento, elem in ET.iterparse(documento_xml, events=('start', 'end')):
+        tag = elem.tag
+        if evento == 'start':
+            if tag == TAG_TBL:
+                profundidade_tabela += 1
+                if profundidade_tabela == 1:
+                    indice_tabela += 1
+            elif tag == TAG_BODY:
+                corpo = elem
+            elif profundidade_tabela == 1:
+                if tag == TAG_TR:
+                    celulas = []
+                elif tag == TAG_TC:
+                    paragrafos = []
+                elif tag == TAG_P:
+                    trechos = []
+            continue
+
+        # evento == 'end'
+        if tag == TAG_TBL:
+            profundidade_tabela -= 1
+        elif profundidade_tabela == 1:
+            if tag == TAG_T:
+                trechos.append(elem.text or '')
+            elif tag == TAG_TAB:
+                trechos.append('\t')
+            elif tag in (TAG_BR, TAG_CR):
+                if elem.get(ATTR_TIPO) in (None, 'textWrapping'):
+                    trechos.append('\n')
+            elif tag == TAG_HIFEN:
+                trechos.append('-')
+            elif tag == TAG_P:
+                paragrafos.append(''.join(trechos))
+            elif tag == TAG_TC:
+                celulas.append('\n'.join(paragrafos))
+            elif tag == TAG_TR:
+                yield indice_tabela, celulas
+
+        # Libera os nós já consumidos para manter a memória constante, mesmo em
+        # relatórios de centenas de páginas: as linhas e, ao fim de cada bloco do
+        # corpo (parágrafo ou tabela), o próprio corpo.
+        if tag in (TAG_P, TAG_TR):
+            elem.clear()
+        if profundidade_tabela == 0 and corpo is not None and tag in (TAG_TBL, TAG_P):
+            corpo.clear()
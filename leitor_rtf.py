@@ -0,0 +1,140 @@
+import io
+import re
+
+# ==============================================================================
+# LEITOR EM FLUXO DE RTF (exportação do mCalc)
+# ==============================================================================
+# Tokeniza o arquivo em blocos e só acompanha o necessário para montar as
+# tabelas: grupos {}, \par, \cell, \row, \intbl/\pard, \'hh e \uN. Destinos
+# que não contêm texto do documento (tabelas de fonte, estilos, temas, ...)
+# são pulados inteiros.
+
+TAMANHO_BLOCO = 1 << 16
+
+PADRAO_TOKEN = re.compile(
+    r"\\([a-zA-Z]+)(-?\d+)? ?"   # palavra de controle (com parâmetro opcional)
+    r"|\\'([0-9a-fA-F]{2})"      # caractere em hexadecimal
+    r"|\\([^a-zA-Z'])"           # símbolo de controle (\*, \~, \\, \{ ...)
+    r"|([{}])"                   # início/fim de grupo
+    r"|([^\\{}\r\n]+)"           # texto
+    r"|[\r\n]+",                 # quebras de linha do arquivo (não são texto)
+    re.S,
+)
+
+DESTINOS_IGNORADOS = frozenset((
+    'fonttbl', 'colortbl', 'stylesheet', 'info', 'pict', 'object', 'header', 'footer',
+    'headerl', 'headerr', 'headerf', 'footerl', 'footerr', 'footerf', 'listtable',
+    'listoverridetable', 'rsidtbl', 'generator', 'xmlnstbl', 'themedata',
+    'colorschememapping', 'datastore', 'latentstyles', 'fldinst', 'pgdsctbl', 'filetbl',
+    'revtbl', 'field', 'footnote', 'annotation', 'bkmkstart', 'bkmkend', 'pntext', 'pntxta', 'pntxtb',
+))
+SIMBOLOS = {'~': '\u00a0', '-': '', '_': '\u2011', '\\': '\\', '{': '{', '}': '}'}
+
+
+def _tokens(arquivo):
+    """Gera os tokens do PADRAO_TOKEN lendo o arquivo em blocos."""
+    resto = ''
+    while True:
+        bloco = arquivo.read(TAMANHO_BLOCO)
+        texto = resto + bloco
+        posicao = 0
+        for token in PADRAO_TOKEN.finditer(texto):
+            # O último token do bloco pode estar cortado (ex: '\pa' + 'r'); fica para o próximo.
+            if bloco and token.end() == len(texto):
+                break
+            yield token
+            posicao = token.end()
+        resto = texto[posicao:]
+        if not bloco:
+            return
+
+
+def ler_linhas_tabelas(caminho_arquivo_rtf):
+    """
+    Lê o RTF em fluxo e gera (indice_tabela, [texto das células]) para cada linha de tabela,
+    com o texto de cada célula no formato do docx (parágrafos unidos por '\\n').
+    caminho_arquivo_rtf pode ser também um arquivo binário aberto (ex: io.BytesIO).
+    """
+    codificacao = 'cp1252'
+    pilha = []                      # estado salvo ao abrir cada grupo
+    ignorar, uc, pular = False, 1, 0
+    no_grupo_novo = False           # logo após '{' (para detectar destinos)
+    em_tabela = False
+    celula, celulas = [], []
+    indice_tabela, linhas_na_tabela = 0, 0
+
+    if hasattr(caminho_arquivo_rtf, 'read'):
+        arquivo = io.TextIOWrapper(caminho_arquivo_rtf, encoding='latin-1', newline='')
+    else:
+        arquivo = open(caminho_arquivo_rtf, encoding='latin-1', newline='')
+    with arquivo:
+        for token in _tokens(arquivo):
+            palavra, parametro, hexa, simbolo, grupo, texto = token.groups()
+            comeco_de_grupo, no_grupo_novo = no_grupo_novo, False
+
+            if grupo == '{':
+                pilha.append((ignorar, uc))
+                no_grupo_novo = True
+                continue
+            if grupo == '}':
+                if pilha:
+                    ignorar, uc = pilha.pop()
+                continue
+            if ignorar:
+                continue
+
+            if simbolo is not None:
+                if simbolo == '*' and comeco_de_grupo:
+                    ignorar = True  # destino opcional desconhecido: {\*\destino ...}
+                else:
+                    celula.append(SIMBOLOS.get(simbolo, ''))
+                continue
+
+            if palavra is not None:
+                if comeco_de_grupo and palavra in DESTINOS_IGNORADOS:
+                    ignorar = True
+                elif palavra == 'ansicpg' and parametro:
+                    codificacao = f'cp{parametro}'
+                elif palavra == 'uc' and parametro:
+                    uc = int(parametro)
+                elif palavra == 'u' and parametro:
+                    codigo = int(parametro)
+                    celula.append(chr(codigo + 65536 if codigo < 0 else codigo))
+                    pular = uc
+                elif palavra == 'intbl':
+                    em_tabela = True
+                elif palavra == 'pard':
+                    em_tabela = False
+                elif palavra in ('par', 'line'):
+                    if em_tabela:
+                        celula.append('\n')
+                    else:
+                        celula = []
+                        if linhas_na_tabela:
+                            # Parágrafo fora de tabela depois de linhas: a tabela acabou.
+                            indice_tabela += 1
+                            linhas_na_tabela = 0
+                elif palavra == 'tab':
+                    celula.append('\t')
+                elif palavra in ('cell', 'nestcell'):
+                    celulas.append(''.join(celula))
+                    celula = []
+                elif palavra in ('row', 'nestrow'):
+                    if celulas:
+                        yield indice_tabela, celulas
+                        linhas_na_tabela += 1
+                    celulas, celula = [], []
+                continue
+
+            if hexa is not None:
+                if pular:
+                    pular -= 1
+                else:
+                    celula.append(bytes([int(hexa, 16)]).decode(codificacao, errors='replace'))
+                continue
+
+            if texto is not None:
+                if pular:
+                    consumidos = min(pular, len(texto))
+                    texto, pular = texto[consumidos:], pular - consumidos
+                celula.append(texto)
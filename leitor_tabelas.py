@@ -0,0 +1,105 @@
+import unicodedata
+
+import leitor_docx
+import leitor_rtf
+
+# ==============================================================================
+# VARREDURA DE TODAS AS TABELAS DA LISTA (docx e rtf, em uma passada)
+# ==============================================================================
+# O mCalc põe a lista numa tabela de cabeçalho "Perfil | Aço | L total |
+# Peso(kgf)" seguida das linhas de dados (cada célula com um item por
+# parágrafo). Listas longas são quebradas em várias tabelas na troca de página
+# e relatórios de várias estruturas trazem várias listas. Aqui as linhas de
+# todas as tabelas (leitor_docx / leitor_rtf .ler_linhas_tabelas) passam uma
+# única vez:
+#
+#   - uma linha de cabeçalho reconhecida abre um bloco e diz em que coluna está
+#     cada campo (a ordem pode variar);
+#   - as linhas seguintes da mesma tabela são dados do bloco;
+#   - uma tabela sem cabeçalho logo depois de um bloco continua esse bloco (é a
+#     mesma lista quebrada na página);
+#   - as demais tabelas são ignoradas.
+#
+# As linhas saem uma a uma (gerador), então a memória não cresce com o tamanho
+# do relatório. Se nenhum cabeçalho for reconhecido, vale o comportamento
+# antigo: a linha 1 da primeira tabela.
+
+CAMPOS = ('perfil', 'aco', 'l_total', 'peso')
+
+# Início do texto normalizado (minúsculas, sem acentos, espaços e pontuação) de cada cabeçalho.
+CABECALHOS = {
+    'perfil': ('perfil',),
+    'aco': ('aco', 'material'),
+    'l_total': ('ltotal', 'comprimento', 'compr'),
+    'peso': ('peso',),
+}
+
+# Linhas de totalização no fim de um bloco (não são itens).
+ROTULOS_TOTAL = ('total', 'subtotal')
+
+
+def _normalizar(texto):
+    texto = unicodedata.normalize('NFKD', texto.lower())
+    return ''.join(c for c in texto if c.isalnum() and not unicodedata.combining(c))
+
+
+def mapear_cabecalho(celulas):
+    """
+    Índices das colunas (perfil, aco, l_total, peso) se a linha é um cabeçalho de lista,
+    ou None. Precisa achar os quatro campos.
+    """
+    colunas = {}
+    for indice, texto in enumerate(celulas):
+        texto = _normalizar(texto)
+        for campo, inicios in CABECALHOS.items():
+            if campo not in colunas and texto.startswith(inicios):
+                colunas[campo] = indice
+                break
+    if len(colunas) < len(CAMPOS):
+        return None
+    return tuple(colunas[campo] for campo in CAMPOS)
+
+
+def blocos_lista(linhas_tabelas):
+    """
+    Gera, para cada linha de dados de cada bloco da lista, o texto das quatro células
+    (perfil, aco, l_total, peso) na ordem de montar_dados_materiais.
+
+    linhas_tabelas: iterável de (indice_tabela, [texto das células]), em ordem.
+    """
+    colunas = None              # mapa do bloco aberto
+    tabela_bloco = None         # última tabela que pertence ao bloco aberto
+    achou_cabecalho = False
+    primeira_linha_dados = None  # comportamento antigo, usado se não houver cabeçalho
+    for indice_linha, (indice_tabela, celulas) in enumerate(linhas_tabelas):
+        if indice_linha == 1 and indice_tabela == 0:
+            primeira_linha_dados = celulas
+
+        mapa = mapear_cabecalho(celulas)
+        if mapa is not None:
+            colunas, tabela_bloco, achou_cabecalho = mapa, indice_tabela, True
+            continue
+        if colunas is None:
+            continue
+        if indice_tabela != tabela_bloco:
+            if indice_tabela == tabela_bloco + 1 and len(celulas) > max(colunas):
+                tabela_bloco = indice_tabela  # continuação da lista na página seguinte
+            else:
+                colunas = None  # outra tabela qualquer: o bloco acabou
+                continue
+        if len(celulas) <= max(colunas):
+            continue
+        campos = tuple(celulas[i] for i in colunas)
+        if _normalizar(campos[0]).startswith(ROTULOS_TOTAL) or not any(c.strip() for c in campos):
+            continue
+        yield campos
+
+    if not achou_cabecalho and primeira_linha_dados is not None and len(primeira_linha_dados) >= 4:
+        yield tuple(primeira_linha_dados[:4])
+
+
+def ler_linhas_tabelas(caminho_arquivo):
+    """Linhas de todas as tabelas do .docx ou .rtf, pelo leitor em fluxo do formato."""
+    if caminho_arquivo.lower().endswith('.rtf'):
+        return leitor_rtf.ler_linhas_tabelas(caminho_arquivo)
+    return leitor_docx.ler_linhas_tabelas(caminho_arquivo)
@@ -0,0 +1,196 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import medicao
+from analisador import AnalisadorListaMaterial
+from itens import TabelaItens
+
+# ==============================================================================
+# PROCESSAMENTO EM LOTE (sem interface, um processo por documento)
+# ==============================================================================
+
+EXTENSOES_LISTA = ('.docx', '.rtf')
+
+
+def e_lista(nome):
+    """Arquivo de lista de material: .docx/.rtf, fora os temporários do Word (~$)."""
+    return nome.lower().endswith(EXTENSOES_LISTA) and not nome.startswith('~$')
+
+
+def escolher_listas(nomes):
+    """
+    Dos nomes de arquivo de uma pasta, os das listas a processar (usado pelo lote e pelo vigia).
+    Se a mesma lista existe nos dois formatos, fica só o .docx (as saídas teriam o mesmo nome).
+    """
+    por_nome = {}
+    for nome in nomes:
+        if not e_lista(nome):
+            continue
+        base, extensao = os.path.splitext(nome)
+        if base not in por_nome or extensao.lower() == '.docx':
+            por_nome[base] = nome
+    return list(por_nome.values())
+
+
+def listar_documentos(pasta):
+    """Lista as listas de material da pasta (ver escolher_listas), em ordem."""
+    return sorted(os.path.join(pasta, nome) for nome in escolher_listas(os.listdir(pasta)))
+
+
+def processar_documento(caminho_docx, caminho_modelo, pasta_saida, modo_escrita=None, usar_cache=True,
+                        conferir_pesos=False, otimizar_cortes=False, tempo_limite_cortes=None,
+                        modo_secoes=None, tolerancia_secoes=None, historico=None, projeto=None,
+                        exportar=False):
+    """
+    Extrai uma lista e grava uma cópia preenchida do modelo em pasta_saida.
+    Roda dentro dos processos do pool, por isso devolve só um dicionário simples.
+    Com conferir_pesos, inclui em 'conferencia' os pesos calculados pelas fórmulas
+    do modelo contra o Peso(kgf) do mCalc (ver AnalisadorListaMaterial.conferir_pesos).
+    Com modo_secoes ('marcar'/'ajustar'), 'fora_padrao' traz as linhas com seção fora da série padrão.
+    Com historico (caminho do banco, ou '' para o padrão), as linhas da lista vão para o
+    histórico SQLite (ver historico.py), no projeto `projeto` (padrão: o nome da pasta).
+    Com exportar, 'linhas' traz as linhas classificadas em colunas (TabelaItens), para a
+    exportação colunar feita no processo principal (ver exportacao.py).
+    'sha256' é o hash do conteúdo extraído: a lista é lida uma vez e interpretada a partir
+    desses mesmos bytes (ver AnalisadorListaMaterial.extrair_dados_word).
+    """
+    nome_saida = os.path.splitext(os.path.basename(caminho_docx))[0] + '.xlsx'
+    resultado = {'arquivo': caminho_docx, 'saida': os.path.join(pasta_saida, nome_saida),
+                 'status': 'ok', 'itens': 0, 'tempos': {}, 'erro': None, 'conferencia': None,
+                 'fora_padrao': [], 'sha256': None}
+    analisador = AnalisadorListaMaterial(usar_cache=usar_cache)
+    analisador.otimizar_cortes = otimizar_cortes
+    analisador.tempo_limite_cortes = tempo_limite_cortes
+    analisador.modo_secoes = modo_secoes
+    if tolerancia_secoes is not None:
+        analisador.tolerancia_secoes = tolerancia_secoes
+    inicio = time.perf_counter()
+    try:
+        dados = analisador.extrair_dados_word(caminho_docx)
+        resultado['sha256'] = analisador.hash_extraido
+        resultado['tempos']['extracao'] = time.perf_counter() - inicio
+        if not dados:
+            resultado['status'] = 'vazio'
+            return resultado
+        resultado['itens'] = len(dados)
+        if exportar:
+            resultado['linhas'] = TabelaItens.de_itens(dados)
+
+        inicio_preenchimento = time.perf_counter()
+        celulas = analisador.preencher_planilha_excel(caminho_modelo, dados, caminho_saida=resultado['saida'],
+                                                      modo_escrita=modo_escrita)
+        resultado['tempos']['preenchimento'] = time.perf_counter() - inicio_preenchimento
+        resultado['fora_padrao'] = analisador.secoes_fora_padrao
+        if historico is not None:
+            registrar_historico(historico, caminho_docx, dados, projeto, analisador.hash_extraido)
+
+        if conferir_pesos:
+            inicio_conferencia = time.perf_counter()
+            resultado['conferencia'] = analisador.conferir_pesos(caminho_modelo, celulas)
+            resultado['tempos']['conferencia'] = time.perf_counter() - inicio_conferencia
+    except Exception as e:
+        resultado['status'] = 'erro'
+        resultado['erro'] = f"{type(e).__name__}: {e}"
+    finally:
+        resultado['tempos']['total'] = time.perf_counter() - inicio
+        medicao.emitir_contadores(arquivo=caminho_docx)
+    return resultado
+
+
+def registrar_historico(caminho_banco, caminho_docx, dados, projeto=None, hash_lista=None):
+    """Acrescenta a lista ao histórico; uma falha no banco não derruba o processamento."""
+    import sqlite3
+    import historico
+    try:
+        with medicao.etapa('historico'), historico.HistoricoListas(caminho_banco or None) as banco:
+            banco.registrar_lista(caminho_docx, dados, projeto, hash_lista)
+    except (sqlite3.Error, OSError) as e:
+        print(f"  AVISO: Não foi possível gravar '{os.path.basename(caminho_docx)}' no histórico ({e}).")
+
+
+def processar_pasta(pasta, caminho_modelo, pasta_saida, max_workers=None, modo_escrita=None, usar_cache=True,
+                    conferir_pesos=False, otimizar_cortes=False, tempo_limite_cortes=None,
+                    modo_secoes=None, tolerancia_secoes=None, historico=None, projeto=None,
+                    exportar=None):
+    """
+    Distribui os documentos da pasta num pool de processos (padrão: nº de CPUs).
+    Com exportar (caminho .parquet/.colunas), as linhas de todas as listas vão para um
+    único arquivo colunar, gravado em grupos à medida que os documentos terminam.
+    """
+    documentos = listar_documentos(pasta)
+    os.makedirs(pasta_saida, exist_ok=True)
+    if not documentos:
+        return []
+
+    max_workers = min(max_workers or os.cpu_count() or 1, len(documentos))
+    resultados = []
+    escritor = None
+    if exportar:
+        import exportacao
+        escritor = exportacao.EscritorColunar(exportar)
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futuros = [executor.submit(processar_documento, doc, caminho_modelo, pasta_saida, modo_escrita, usar_cache,
+                                       conferir_pesos, otimizar_cortes, tempo_limite_cortes, modo_secoes,
+                                       tolerancia_secoes, historico, projeto, escritor is not None)
+                       for doc in documentos]
+            for futuro in as_completed(futuros):
+                resultado = futuro.result()
+                linhas = resultado.pop('linhas', None)
+                if linhas is not None:
+                    with medicao.etapa('exportacao', itens=len(linhas)):
+                        escritor.acrescentar(os.path.basename(resultado['arquivo']), linhas)
+                resultados.append(resultado)
+    finally:
+        if escritor is not None:
+            escritor.fechar()
+    if escritor is not None:
+        print(f"Linhas exportadas ({escritor.formato}): {escritor.linhas} em {escritor.grupos} grupo(s) -> {escritor.caminho}")
+    resultados.sort(key=lambda r: r['arquivo'])
+    return resultados
+
+
+def imprimir_resumo(resultados, tempo_decorrido=None):
+    """Imprime uma linha por arquivo com os tempos de cada etapa e um total no fim."""
+    if not resultados:
+        print("Nenhuma lista .docx/.rtf encontrada.")
+        return
+    for r in resultados:
+        t = r['tempos']
+        etapas = f"extração {t.get('extracao', 0):.2f}s | preenchimento {t.get('preenchimento', 0):.2f}s | total {t['total']:.2f}s"
+        detalhe = f"  {r['erro']}" if r['erro'] else ''
+        print(f"[{r['status'].upper():5}] {os.path.basename(r['arquivo'])}: {r['itens']} itens | {etapas}{detalhe}")
+        if r.get('conferencia'):
+            imprimir_conferencia(r['conferencia'])
+        if r.get('fora_padrao'):
+            imprimir_fora_padrao(r['fora_padrao'])
+    ok = sum(1 for r in resultados if r['status'] == 'ok')
+    soma = sum(r['tempos']['total'] for r in resultados)
+    print(f"\n{ok}/{len(resultados)} listas processadas. Tempo somado dos arquivos: {soma:.2f}s")
+    if tempo_decorrido is not None:
+        print(f"Tempo decorrido do lote: {tempo_decorrido:.2f}s")
+
+
+def imprimir_conferencia(conferencia):
+    """Peso total pelas fórmulas do modelo x mCalc e as linhas fora da tolerância."""
+    print(f"        pesos: planilha {conferencia['peso_calculado']:.2f} kg | mCalc {conferencia['peso_mcalc']:.2f} kg"
+          f" | {len(conferencia['divergentes'])} linha(s) divergente(s)")
+    for registro in conferencia['divergentes']:
+        if registro['erro']:
+            situacao = registro['erro']
+        else:
+            situacao = (f"planilha {registro['peso_calculado']:.2f} kg x mCalc {registro['peso_mcalc']:.2f} kg"
+                        f" ({registro['diferenca']:+.1%})" if registro['diferenca'] is not None else "sem peso do mCalc")
+        print(f"          linha {registro['linha']} ({registro['secao']}): {situacao}")
+
+
+def imprimir_fora_padrao(fora_padrao):
+    """Linhas com seção fora da série padrão e a seção padrão mais próxima."""
+    ajustadas = sum(1 for registro in fora_padrao if registro[5])
+    print(f"        seções fora do padrão: {len(fora_padrao)} ({ajustadas} ajustada(s))")
+    for linha, perfil, _medidas, padrao, distancia, ajustada in fora_padrao:
+        a, b, c, esp = (f"{m:g}" for m in padrao)
+        medidas = ' x '.join(m for m in (a, b, c) if m != '0') + f" x {esp}"
+        print(f"          linha {linha} ({perfil}): {'ajustada para' if ajustada else 'mais próxima'} "
+              f"{medidas} (distância {distancia:.1f})")
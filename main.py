@@ -1,17 +1,36 @@
+import sys
+import tempo_inicio
+tempo_inicio.iniciar('--tempo-inicio' in sys.argv)  # antes das demais importações, para medi-las
+
 import os
-import re
-import docx
-import openpyxl
+import time
+import argparse
+import multiprocessing
+import queue
+import threading
 import tkinter as tk
 from tkinter import filedialog, messagebox
 
-class DocxToExcelAutomator:
+from analisador import (AnalisadorListaMaterial, AutomacaoCancelada, NOME_MODELO_PADRAO, MODOS_ESCRITA,
+                        preaquecer_dependencias)
+from secoes import MODOS_SECOES
+import medicao
+
+tempo_inicio.marcar('importações do main.py')
+
+class DocxToExcelAutomator(AnalisadorListaMaterial):
     def __init__(self, root):
+        super().__init__()
         self.root = root
         self.root.title("Aut Lista de Material - DOCX to Excel Automator")
-        self.root.geometry("500x200")
+        self.root.geometry("500x270")
 
         self.file_path = tk.StringVar()
+        self.var_otimizar_cortes = tk.BooleanVar(value=False)
+        self.fila_eventos = queue.Queue()   # worker -> interface
+        self.evento_cancelar = threading.Event()
+        self.worker = None
+        self.tempos_etapas = []             # [(etapa, inicio)] da execução atual
 
         # --- UI Elements ---
 
@@ -20,7 +39,7 @@ class DocxToExcelAutomator:
         file_frame.pack(pady=10, padx=10, fill=tk.X)
 
         # Label for file selection
-        self.label = tk.Label(file_frame, text="Selecionar a Lista de Material! (.docx):")
+        self.label = tk.Label(file_frame, text="Selecionar a Lista de Material! (.docx / .rtf):")
         self.label.pack(anchor=tk.W)
 
         # Entry box for file path
@@ -31,19 +50,29 @@ class DocxToExcelAutomator:
         self.browse_button = tk.Button(file_frame, text="Browse...", command=self.browse_file)
         self.browse_button.pack(side=tk.RIGHT, padx=(5, 0))
 
+        # Bar-cutting optimization (fills columns O and S)
+        self.cortes_check = tk.Checkbutton(root, text="Otimizar corte das barras (6 m / 12 m) e preencher sobras",
+                                           variable=self.var_otimizar_cortes)
+        self.cortes_check.pack(anchor=tk.W, padx=10)
+
         # Start Automation button
         self.start_button = tk.Button(root, text="Iniciar Script", command=self.start_automation, font=("Helvetica", 12, "bold"))
-        self.start_button.pack(pady=20, padx=10, fill=tk.X, ipady=5)
+        self.start_button.pack(pady=(20, 5), padx=10, fill=tk.X, ipady=5)
+
+        # Cancel button (only enabled while the automation is running)
+        self.cancel_button = tk.Button(root, text="Cancelar", command=self.cancel_automation, state=tk.DISABLED)
+        self.cancel_button.pack(padx=10, fill=tk.X)
 
         # Status label
         self.status_label = tk.Label(root, text="Status: Ready", bd=1, relief=tk.SUNKEN, anchor=tk.W)
         self.status_label.pack(side=tk.BOTTOM, fill=tk.X)
 
     def browse_file(self):
-        """Opens a file dialog to select a .docx file."""
+        """Opens a file dialog to select a .docx or .rtf file."""
         filepath = filedialog.askopenfilename(
-            title="Select a DOCX file",
-            filetypes=(("Word Documents", "*.docx"), ("All files", "*.*"))
+            title="Select a DOCX or RTF file",
+            filetypes=(("Listas de material", "*.docx *.rtf"), ("Word Documents", "*.docx"),
+                       ("RTF (mCalc)", "*.rtf"), ("All files", "*.*"))
         )
         if filepath:
             self.file_path.set(filepath)
@@ -53,203 +82,268 @@ class DocxToExcelAutomator:
         """Starts the main automation process."""
         arquivo_word = self.file_path.get()
         if not arquivo_word:
-            messagebox.showerror("Error", "Please select a .docx file first.")
+            messagebox.showerror("Error", "Please select a .docx or .rtf file first.")
             return
 
         # Assuming the Excel file is in the same directory and has a fixed name
-        planilha_excel = os.path.join(os.path.dirname(arquivo_word), "TABELA-DE-AÇO R8.xlsx")
+        planilha_excel = os.path.join(os.path.dirname(arquivo_word), NOME_MODELO_PADRAO)
 
         if not os.path.exists(planilha_excel):
             messagebox.showerror("Error", f"Excel file not found:\n{planilha_excel}")
             return
 
+        self.evento_cancelar.clear()
+        self.tempos_etapas = []
+        self.otimizar_cortes = self.var_otimizar_cortes.get()
+        self.start_button.config(state=tk.DISABLED)
+        self.cancel_button.config(state=tk.NORMAL)
         self.update_status("Processing...")
-        self.root.update_idletasks() # Force UI update
+
+        self.worker = threading.Thread(
+            target=self._executar_automacao, args=(arquivo_word, planilha_excel), daemon=True
+        )
+        self.worker.start()
+        self.root.after(100, self._verificar_fila_eventos)
+
+    def cancel_automation(self):
+        """Asks the worker to stop at the next stage boundary."""
+        self.evento_cancelar.set()
+        self.cancel_button.config(state=tk.DISABLED)
+        self.update_status("Cancelando...")
+
+    def iniciar_preaquecimento(self):
+        """Loads openpyxl/python-docx on a background thread while the user picks a file."""
+        threading.Thread(target=preaquecer_dependencias, daemon=True).start()
+
+    def _executar_automacao(self, arquivo_word, planilha_excel):
+        """Roda no worker: nunca toca na interface, só publica eventos na fila."""
+        def avisar(etapa):
+            self.fila_eventos.put(('etapa', etapa, time.perf_counter()))
 
         try:
+            avisar('leitura')
             dados_extraidos = self.extrair_dados_word(arquivo_word)
+            self._verificar_cancelamento(self.evento_cancelar)
             if dados_extraidos:
-                self.preencher_planilha_excel(planilha_excel, dados_extraidos)
-                self.update_status("Success: Excel sheet updated.")
-                messagebox.showinfo("Success", "The Excel sheet has been successfully updated.")
+                self.preencher_planilha_excel(planilha_excel, dados_extraidos,
+                                              progresso=avisar, cancelamento=self.evento_cancelar)
+                self.fila_eventos.put(('sucesso', None, time.perf_counter()))
             else:
-                self.update_status("No data extracted from Word file.")
-                messagebox.showwarning("Warning", "No data was extracted from the Word file. Please check the file.")
+                self.fila_eventos.put(('vazio', None, time.perf_counter()))
+        except AutomacaoCancelada:
+            self.fila_eventos.put(('cancelado', None, time.perf_counter()))
         except Exception as e:
-            self.update_status(f"Error: {e}")
-            messagebox.showerror("Automation Error", f"An error occurred: {e}")
-
+            self.fila_eventos.put(('erro', e, time.perf_counter()))
+        finally:
+            medicao.emitir_contadores(arquivo=arquivo_word)
+
+    def _resumo_tempos(self, agora):
+        """Texto com o tempo gasto em cada etapa já iniciada, ex: 'leitura 0.02s | preenchimento 1.30s'."""
+        partes = []
+        for i, (etapa, inicio) in enumerate(self.tempos_etapas):
+            fim = self.tempos_etapas[i + 1][1] if i + 1 < len(self.tempos_etapas) else agora
+            partes.append(f"{etapa} {fim - inicio:.2f}s")
+        return ' | '.join(partes)
+
+    def _verificar_fila_eventos(self):
+        """Polled with root.after: applies the worker events to the UI."""
+        try:
+            while True:
+                tipo, valor, instante = self.fila_eventos.get_nowait()
+                if tipo == 'etapa':
+                    self.tempos_etapas.append((valor, instante))
+                    self.update_status(f"Processing... {self._resumo_tempos(instante)}")
+                else:
+                    self._finalizar_automacao(tipo, valor, instante)
+                    return
+        except queue.Empty:
+            pass
+        self.root.after(100, self._verificar_fila_eventos)
+
+    def _finalizar_automacao(self, tipo, valor, instante):
+        self.start_button.config(state=tk.NORMAL)
+        self.cancel_button.config(state=tk.DISABLED)
+        tempos = self._resumo_tempos(instante)
+        if tipo == 'sucesso':
+            self.update_status(f"Success: Excel sheet updated. (extração: {self.motor_extracao}) {tempos}")
+            messagebox.showinfo("Success", "The Excel sheet has been successfully updated.")
+        elif tipo == 'vazio':
+            self.update_status("No data extracted from Word file.")
+            messagebox.showwarning("Warning", "No data was extracted from the Word file. Please check the file.")
+        elif tipo == 'cancelado':
+            self.update_status(f"Cancelled: the Excel sheet was not changed. {tempos}")
+        else:
+            self.update_status(f"Error: {valor}")
+            messagebox.showerror("Automation Error", f"An error occurred: {valor}")
 
     def update_status(self, message):
         """Updates the status label text."""
         self.status_label.config(text=f"Status: {message}")
 
-    # MÓDULO DE INTELIGÊNCIA DE ENGENHARIA
-    #______________________________________________________________________
-    def convert_to_mm(self, dim_str):
-        """Converte dimensões em polegadas (ex: "1.1/2"") para mm."""
-        dim_str = dim_str.strip().replace(',', '.')
-        total_mm = 0.0
-        try:
-            if '"' in dim_str:
-                dim_str = dim_str.replace('"', '')
-                parts = dim_str.split('.')
-                if parts[0] and '/' in parts[0]:
-                    num, den = map(float, parts[0].split('/'))
-                    total_mm += (num / den) * 25.4
-                elif parts[0]:
-                    total_mm += float(parts[0]) * 25.4
-                if len(parts) > 1 and '/' in parts[1]:
-                    num, den = map(float, parts[1].split('/'))
-                    total_mm += (num / den) * 25.4
-            else:
-                total_mm = float(dim_str)
-        except (ValueError, ZeroDivisionError): return 0.0
-        return total_mm
-
-    # ==============================================================================
-    # Função para identificar o tipo de perfil e retornar o código correto
-    # ==============================================================================
-    def classificar_e_mapear_perfil(self, desc):
-        """Identifica o TIPO de perfil e retorna o código e uma chave de classificação."""
-        desc_upper = desc.upper()
-        if '[' in desc_upper or '][' in desc_upper: return 'U.s', 'PERFIL_U'
-        if 'UENR' in desc_upper or 'IENR' in desc_upper or 'CART' in desc_upper or 'CA ' in desc_upper: return 'U.e', 'TERCA'
-        if 'L DOBRADO' in desc_upper or desc_upper.startswith('L '): return 'L DOBRADO', 'CANTONEIRA'
-
-
-        # Se encontrar 'RED', mapeia para o código exato da planilha.
-        if 'RED' in desc_upper:
-            return 'FERRO MECANICO RED.', 'TUBO' # Mapeamento corrigido
-
-        if 'TUBO' in desc_upper: return 'TUBO', 'TUBO' # Mantém genérico se for outra coisa
-
-        return 'N/D', 'OUTROS'
-
-
-    # ==============================================================================
-    # Extrai as 4 medidas principais de uma descrição de perfil
-    # ==============================================================================
-    def parse_dimensoes_inteligente(self, desc, tipo_perfil):
-        """Aplica regras de extração de dimensões e retorna as 4 medidas principais."""
-        a, b, c, esp = 0.0, 0.0, 0.0, 0.0
-        numeros_str_list = re.findall(r'[\d\./"]+', desc)
-
-        if tipo_perfil in ['PERFIL_U']:
-            if len(numeros_str_list) >= 3:
-                a = self.convert_to_mm(numeros_str_list[0])
-                b = self.convert_to_mm(numeros_str_list[1])
-                esp = self.convert_to_mm(numeros_str_list[2])
-        elif tipo_perfil == 'TERCA':
-            if len(numeros_str_list) >= 4:
-                a = self.convert_to_mm(numeros_str_list[0])
-                b = self.convert_to_mm(numeros_str_list[1])
-                c = self.convert_to_mm(numeros_str_list[2])
-                esp = self.convert_to_mm(numeros_str_list[3])
-        elif tipo_perfil == 'CANTONEIRA':
-            if len(numeros_str_list) == 2:
-                aba = self.convert_to_mm(numeros_str_list[0])
-                a, b = aba, aba
-                esp = self.convert_to_mm(numeros_str_list[1])
-            elif len(numeros_str_list) >= 3:
-                a = self.convert_to_mm(numeros_str_list[0])
-                b = self.convert_to_mm(numeros_str_list[1])
-                esp = self.convert_to_mm(numeros_str_list[2])
-
-        # --- CORREÇÃO APLICADA AQUI ---
-        # Lógica específica para Tubo/RED
-        elif tipo_perfil == 'TUBO':
-            # Para RED 12.7, a única medida é a espessura/diâmetro.
-            if len(numeros_str_list) >= 1:
-                esp = self.convert_to_mm(numeros_str_list[0]) # Coloca o valor na variável 'esp'
-
-        return a, b, c, esp
-
-    # ==============================================================================
-    # MÓDULO PRINCIPAL DO SCRIPT (Leitura e Preenchimento Não-Destrutivo)
-    # ==============================================================================
-
-    def extrair_dados_word(self, caminho_arquivo_word):
-        """Função robusta para extrair dados do Word."""
-        documento = docx.Document(caminho_arquivo_word)
-        tabela = documento.tables[0]
-        if len(tabela.rows) < 2: return None
-        perfils_str = tabela.cell(1, 0).text; acos_str = tabela.cell(1, 1).text
-        ltotais_str = tabela.cell(1, 2).text; pesos_str = tabela.cell(1, 3).text
-        lista_perfis = list(filter(None, perfils_str.strip().split('\n')))
-        lista_acos = list(filter(None, acos_str.strip().split('\n')))
-        lista_ltotais = list(filter(None, ltotais_str.strip().split('\n')))
-        lista_pesos = list(filter(None, pesos_str.strip().split('\n')))
-        num_perfis = len(lista_perfis)
-        if not (num_perfis == len(lista_ltotais) == len(lista_pesos)): return None
-        if num_perfis == 0: return None
-        
-        dados_finais = []
-        for i in range(num_perfis):
-            perfil, aco = lista_perfis[i].strip(), lista_acos[i].strip() if i < len(lista_acos) else lista_acos[0].strip()
-            l_total_str, peso_str = lista_ltotais[i].strip().replace(',', '.'), lista_pesos[i].strip().replace(',', '.')
-            try:
-                l_total_m = float(l_total_str) / 100 if l_total_str else 0.0
-                peso_final = float(peso_str) if peso_str else 0.0
-                dados_finais.append([perfil, aco, l_total_m, peso_final])
-            except ValueError: continue
-        return dados_finais
-
-    def encontrar_proxima_linha_vazia(self, sheet, codigo_secao, linha_inicio_busca):
-        """
-        Encontra a primeira linha vazia para uma seção, aceitando placeholders como 'X' ou 0.
-        """
-        for row in range(linha_inicio_busca, sheet.max_row + 2):
-            celula_codigo = sheet.cell(row=row, column=1)
-            celula_dado_ref = sheet.cell(row=row, column=2)
-            if celula_codigo.value == codigo_secao and celula_dado_ref.value in [None, 0, 'X', '']:
-                return row
+# ==============================================================================
+# LINHA DE COMANDO
+# ==============================================================================
+def criar_parser():
+    """Monta o parser da linha de comando. Sem subcomando, abre a janela."""
+    parser = argparse.ArgumentParser(description="Analisador de listas de material do mCalc.")
+    parser.add_argument('--tempo-inicio', nargs='?', const='-', metavar='ARQUIVO',
+                        help="Relata o tempo até a janela aparecer e as importações mais caras "
+                             "(no stderr, ou em ARQUIVO).")
+    parser.add_argument('--medicao', metavar='DESTINO',
+                        help="Registra o tempo de cada etapa e os contadores em DESTINO (.jsonl, "
+                             "um registro por linha) ou no stderr com '-'. Vale também para o lote, "
+                             "o vigia e o serviço.")
+    subcomandos = parser.add_subparsers(dest='comando')
+
+    # Opções do processamento de cada lista, comuns ao lote e ao vigia.
+    comuns = argparse.ArgumentParser(add_help=False)
+    comuns.add_argument('--template', help="Planilha modelo (padrão: TABELA-DE-AÇO R8.xlsx dentro da pasta).")
+    comuns.add_argument('--out', help="Pasta de saída (padrão: <pasta>/saida).")
+    comuns.add_argument('--workers', type=int, default=None, help="Processos em paralelo (padrão: nº de CPUs).")
+    comuns.add_argument('--escrita', choices=MODOS_ESCRITA, default='openpyxl',
+                        help="Como gravar a planilha: 'openpyxl' (workbook inteiro) ou 'xml' (só a aba alterada).")
+    comuns.add_argument('--no-cache', dest='usar_cache', action='store_false',
+                        help="Não usa o cache de listas já extraídas (relê todos os arquivos).")
+    comuns.add_argument('--cortes', action='store_true',
+                        help="Otimiza o corte em barras de 6 m / 12 m e preenche barras (O) e sobras (S).")
+    comuns.add_argument('--tempo-cortes', type=float, default=None, metavar='SEG',
+                        help="Com --cortes, tempo por grupo para o resolvedor melhorado (padrão: só o FFD).")
+    comuns.add_argument('--conferir-pesos', action='store_true',
+                        help="Calcula os pesos com as fórmulas do modelo e compara com o Peso(kgf) do mCalc.")
+    comuns.add_argument('--secoes', choices=MODOS_SECOES, default=None,
+                        help="Compara os perfis dobrados com a série padrão: 'marcar' só aponta as seções "
+                             "fora do padrão, 'ajustar' troca pelas medidas da seção padrão mais próxima.")
+    comuns.add_argument('--tolerancia-secoes', type=float, default=None, metavar='MM',
+                        help="Com --secoes ajustar, distância máxima para trocar as medidas (padrão: 5).")
+    comuns.add_argument('--historico', nargs='?', const='', default=None, metavar='BANCO',
+                        help="Grava as linhas de cada lista no histórico SQLite (padrão: historico.sqlite3 "
+                             "na pasta do programa no perfil do usuário).")
+    comuns.add_argument('--projeto', help="Projeto das listas no histórico (padrão: o nome da pasta da lista).")
+
+    lote_parser = subcomandos.add_parser('batch', parents=[comuns],
+                                         help="Processa todas as listas .docx/.rtf de uma pasta.")
+    lote_parser.add_argument('pasta', help="Pasta com as listas de material (.docx/.rtf).")
+    lote_parser.add_argument('--exportar', metavar='ARQUIVO',
+                             help="Exporta as linhas classificadas de todas as listas num arquivo colunar "
+                                  "(Parquet com o pyarrow; sem ele, o formato .colunas de exportacao.py).")
+
+    vigia_parser = subcomandos.add_parser('watch', parents=[comuns],
+                                          help="Observa uma pasta e processa as listas que chegarem.")
+    vigia_parser.add_argument('pasta', help="Pasta observada.")
+    vigia_parser.add_argument('--espera', type=float, default=None, metavar='SEG',
+                              help="Tempo sem mudanças para o arquivo ser considerado completo (padrão: 2).")
+    vigia_parser.add_argument('--intervalo', type=float, default=None, metavar='SEG',
+                              help="Intervalo entre varreduras da pasta (padrão: 1).")
+    vigia_parser.add_argument('--fila', type=int, default=None, metavar='N',
+                              help="Máximo de listas submetidas ao pool ao mesmo tempo (padrão: 2 x workers).")
+    vigia_parser.add_argument('--polling', action='store_true',
+                              help="Varre a pasta em vez de usar o inotify (necessário em pastas de rede).")
+
+    servico_parser = subcomandos.add_parser('serve', help="Serviço HTTP local: POST /convert e /extract.")
+    servico_parser.add_argument('--template', required=True, help="Planilha modelo usada nas conversões.")
+    servico_parser.add_argument('--host', default='127.0.0.1', help="Endereço de escuta (padrão: %(default)s).")
+    servico_parser.add_argument('--porta', type=int, default=8765, help="Porta (padrão: %(default)s).")
+    servico_parser.add_argument('--workers', type=int, default=None, help="Processos de trabalho (padrão: nº de CPUs).")
+    servico_parser.add_argument('--escrita', choices=MODOS_ESCRITA, default='openpyxl',
+                                help="Modo de gravação padrão (o pedido pode trocar com ?escrita=).")
+
+    historico_parser = subcomandos.add_parser('history', help="Tonelagem por família de perfil e mês, do histórico.")
+    historico_parser.add_argument('--banco', default=None, help="Banco do histórico (padrão: o do --historico).")
+    historico_parser.add_argument('--desde', metavar='AAAA-MM', help="Primeiro mês.")
+    historico_parser.add_argument('--ate', metavar='AAAA-MM', help="Último mês.")
+    historico_parser.add_argument('--familia', help="Só uma família (ex: PERFIL_U, W, VERGALHAO).")
+    return parser
+
+
+def opcoes_processamento(args):
+    """Argumentos de lote.processar_documento / processar_pasta vindos da linha de comando."""
+    return dict(modo_escrita=args.escrita, usar_cache=args.usar_cache, conferir_pesos=args.conferir_pesos,
+                otimizar_cortes=args.cortes, tempo_limite_cortes=args.tempo_cortes, modo_secoes=args.secoes,
+                tolerancia_secoes=args.tolerancia_secoes, historico=args.historico, projeto=args.projeto)
+
+
+def _pastas(args):
+    pasta = os.path.abspath(args.pasta)
+    modelo = args.template or os.path.join(pasta, NOME_MODELO_PADRAO)
+    pasta_saida = args.out or os.path.join(pasta, 'saida')
+    if not os.path.exists(modelo):
+        print(f"Planilha modelo não encontrada: {modelo}", file=sys.stderr)
         return None
+    return pasta, modelo, pasta_saida
+
+
+def executar_lote(args):
+    import lote
+    pastas = _pastas(args)
+    if pastas is None:
+        return 2
+    pasta, modelo, pasta_saida = pastas
+    inicio = time.perf_counter()
+    resultados = lote.processar_pasta(pasta, modelo, pasta_saida, max_workers=args.workers,
+                                      exportar=args.exportar, **opcoes_processamento(args))
+    lote.imprimir_resumo(resultados, time.perf_counter() - inicio)
+    return 0 if all(r['status'] == 'ok' for r in resultados) else 1
+
+
+def executar_vigia(args):
+    import vigia
+    pastas = _pastas(args)
+    if pastas is None:
+        return 2
+    pasta, modelo, pasta_saida = pastas
+    vigia.VigiaPasta(pasta, modelo, pasta_saida, max_workers=args.workers, tamanho_fila=args.fila,
+                     espera=args.espera, intervalo=args.intervalo, usar_polling=args.polling,
+                     opcoes=opcoes_processamento(args)).executar()
+    return 0
+
+
+def executar_servico(args):
+    import servico
+    if not os.path.exists(args.template):
+        print(f"Planilha modelo não encontrada: {args.template}", file=sys.stderr)
+        return 2
+    servico.servir(args.template, args.host, args.porta, args.workers, args.escrita)
+    return 0
+
+
+def executar_historico(args):
+    import historico
+    caminho = args.banco or historico.caminho_padrao()
+    if not os.path.exists(caminho):
+        print(f"Histórico não encontrado: {caminho}", file=sys.stderr)
+        return 2
+    with historico.HistoricoListas(caminho) as banco:
+        historico.imprimir_tonelagem(banco.tonelagem_mensal(args.desde, args.ate, args.familia))
+    return 0
 
-    def preencher_planilha_excel(self, caminho_planilha, dados_materiais):
-        """Preenche a planilha de forma não-destrutiva, seguindo a estrutura de colunas exata."""
-        workbook = openpyxl.load_workbook(caminho_planilha)
-        sheet = workbook.active
-        
-        dados_agrupados = {}
-        for item in dados_materiais:
-            codigo_excel, _ = self.classificar_e_mapear_perfil(item[0])
-            if codigo_excel not in dados_agrupados: dados_agrupados[codigo_excel] = []
-            dados_agrupados[codigo_excel].append(item)
-            
-        for codigo_secao, itens_da_secao in dados_agrupados.items():
-            linha_de_busca_secao = 4
-            for item in itens_da_secao:
-                linha_alvo = self.encontrar_proxima_linha_vazia(sheet, codigo_secao, linha_de_busca_secao)
-                
-                if linha_alvo is None:
-                    print(f"  AVISO: Não há mais espaço na planilha para a seção '{codigo_secao}'. Item '{item[0]}' não inserido.")
-                    continue
-
-                perfil_desc, aco_tipo, l_total_m, peso_total = item
-                _, tipo_perfil = self.classificar_e_mapear_perfil(perfil_desc)
-                dim_a, dim_b, dim_c, dim_esp = self.parse_dimensoes_inteligente(perfil_desc, tipo_perfil)
-
-                if tipo_perfil in ['PERFIL_U', 'TERCA']:
-                    sheet.cell(row=linha_alvo, column=2).value = dim_a
-                    sheet.cell(row=linha_alvo, column=4).value = dim_b
-                    sheet.cell(row=linha_alvo, column=6).value = dim_c
-                elif tipo_perfil == 'CANTONEIRA':
-                    sheet.cell(row=linha_alvo, column=4).value = dim_a
-                    sheet.cell(row=linha_alvo, column=6).value = dim_b
-
-                sheet.cell(row=linha_alvo, column=8).value = dim_esp
-                sheet.cell(row=linha_alvo, column=9).value = aco_tipo
-                sheet.cell(row=linha_alvo, column=10).value = l_total_m
-                sheet.cell(row=linha_alvo, column=17).value = peso_total
-                linha_de_busca_secao = linha_alvo + 1
-
-        workbook.save(caminho_planilha)
 
 # ==============================================================================
 # PONTO DE PARTIDA DO SCRIPT
 # ==============================================================================
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    args = criar_parser().parse_args()
+    if args.medicao:
+        medicao.configurar(args.medicao)
+    if args.comando == 'batch':
+        sys.exit(executar_lote(args))
+    if args.comando == 'watch':
+        sys.exit(executar_vigia(args))
+    if args.comando == 'serve':
+        sys.exit(executar_servico(args))
+    if args.comando == 'history':
+        sys.exit(executar_historico(args))
+
     root = tk.Tk()
     app = DocxToExcelAutomator(root)
+    tempo_inicio.marcar('janela montada')
+
+    def janela_pronta():
+        # Só roda depois que o Tk desenhou a janela pela primeira vez.
+        tempo_inicio.marcar('janela visível')
+        if args.tempo_inicio:
+            tempo_inicio.relatorio(args.tempo_inicio)
+        app.iniciar_preaquecimento()
+
+    root.after_idle(janela_pronta)
     root.mainloop()
@@ -0,0 +1,204 @@
+import os
+import sys
+import json
+import time
+import threading
+import functools
+
+# ==============================================================================
+# MEDIÇÃO DAS ETAPAS (registro estruturado de tempos e contadores)
+# ==============================================================================
+# Uso:  with medicao.etapa('gravação', modo='xml'): ...
+#       @medicao.etapa('extrair_dados_word')
+#       medicao.contar('linhas_varridas', n)
+#
+# Cada etapa vira um registro {'tipo': 'etapa', 'nome', 'inicio', 'duracao_s',
+# 'pid', 'pai', ...campos} entregue às saídas ligadas: qualquer função que
+# receba o dicionário (SaidaMemoria, SaidaJsonl, SaidaStderr já prontas).
+# Sem nenhuma saída ligada (o normal) a etapa só consulta uma lista vazia.
+#
+# Os contadores são somados sempre, por processo; emitir_contadores() manda o
+# acumulado como um registro {'tipo': 'contadores'} e zera.
+#
+# Pela linha de comando: python main.py --medicao tempos.jsonl batch ...
+# ('-' é o stderr). A variável ANALISADOR_MEDICAO faz o mesmo e é herdada
+# pelos processos do lote, do vigia e do serviço.
+
+VARIAVEL_AMBIENTE = 'ANALISADOR_MEDICAO'
+
+_saidas = []
+_contadores = {}
+_trava = threading.Lock()
+_local = threading.local()   # pilha das etapas abertas em cada thread (campo 'pai')
+
+
+# ------------------------------------------------------------------------------
+# Saídas
+# ------------------------------------------------------------------------------
+class SaidaMemoria:
+    """Guarda os registros numa lista; resumo() soma as etapas por nome."""
+
+    def __init__(self):
+        self.registros = []
+
+    def __call__(self, registro):
+        self.registros.append(registro)
+
+    def resumo(self):
+        """{nome da etapa: {'vezes', 'total_s', 'max_s'}}."""
+        resumo = {}
+        for registro in self.registros:
+            if registro['tipo'] != 'etapa':
+                continue
+            soma = resumo.setdefault(registro['nome'], {'vezes': 0, 'total_s': 0.0, 'max_s': 0.0})
+            soma['vezes'] += 1
+            soma['total_s'] += registro['duracao_s']
+            soma['max_s'] = max(soma['max_s'], registro['duracao_s'])
+        return resumo
+
+
+class SaidaJsonl:
+    """Um registro JSON por linha, acrescentado ao arquivo (vários processos podem gravar no mesmo)."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._trava = threading.Lock()
+        self._arquivo = open(caminho, 'a', encoding='utf-8', buffering=1)  # uma escrita por linha
+
+    def __call__(self, registro):
+        linha = json.dumps(registro, ensure_ascii=False, default=str) + '\n'
+        with self._trava:
+            self._arquivo.write(linha)
+
+    def fechar(self):
+        self._arquivo.close()
+
+
+class SaidaStderr:
+    """Uma linha legível por registro no stderr (nada no executável sem console)."""
+
+    def __call__(self, registro):
+        if sys.stderr is None:
+            return
+        if registro['tipo'] == 'etapa':
+            extras = ' '.join(f"{chave}={valor}" for chave, valor in registro.items()
+                              if chave not in ('tipo', 'nome', 'inicio', 'duracao_s', 'pid', 'pai'))
+            texto = f"{registro['duracao_s'] * 1000:10.3f} ms  {registro['nome']}"
+        else:
+            extras = ' '.join(f"{chave}={valor}" for chave, valor in registro.items() if chave not in ('tipo', 'pid'))
+            texto = registro['tipo']
+        print(f"[medição {registro['pid']}] {texto} {extras}".rstrip(), file=sys.stderr)
+
+
+def adicionar_saida(saida):
+    """Liga uma saída (qualquer função que receba o registro) e a devolve."""
+    _saidas.append(saida)
+    return saida
+
+
+def remover_saida(saida):
+    if saida in _saidas:
+        _saidas.remove(saida)
+
+
+def ativa():
+    return bool(_saidas)
+
+
+def configurar(destino, exportar=True):
+    """
+    Liga a saída pedida: '-' é o stderr, qualquer outro texto é um arquivo .jsonl.
+    Com exportar, grava o destino em ANALISADOR_MEDICAO para os processos filhos.
+    """
+    saida = adicionar_saida(SaidaStderr() if destino == '-' else SaidaJsonl(destino))
+    if exportar:
+        os.environ[VARIAVEL_AMBIENTE] = destino
+    return saida
+
+
+def emitir(registro):
+    for saida in tuple(_saidas):
+        saida(registro)
+
+
+# ------------------------------------------------------------------------------
+# Etapas e contadores
+# ------------------------------------------------------------------------------
+class Etapa:
+    """Cronometra um trecho (with) ou, como decorador, cada chamada da função."""
+
+    __slots__ = ('nome', 'campos', '_inicio')
+
+    def __init__(self, nome, campos):
+        self.nome = nome
+        self.campos = campos   # pode ser completado dentro do with (ex: etapa.campos['itens'] = n)
+        self._inicio = None
+
+    def __enter__(self):
+        if _saidas:
+            _pilha().append(self.nome)
+            self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, erro, rastro):
+        if self._inicio is None:
+            return False
+        duracao = time.perf_counter() - self._inicio
+        self._inicio = None
+        pilha = _pilha()
+        pilha.pop()
+        registro = {'tipo': 'etapa', 'nome': self.nome, 'inicio': round(time.time() - duracao, 6),
+                    'duracao_s': round(duracao, 6), 'pid': os.getpid(), 'pai': pilha[-1] if pilha else None}
+        registro.update(self.campos)
+        if tipo is not None:
+            registro['erro'] = tipo.__name__
+        emitir(registro)
+        return False
+
+    def __call__(self, funcao):
+        nome, campos = self.nome, self.campos
+
+        @functools.wraps(funcao)
+        def cronometrada(*args, **kwargs):
+            if not _saidas:
+                return funcao(*args, **kwargs)
+            with Etapa(nome, dict(campos)):
+                return funcao(*args, **kwargs)
+        return cronometrada
+
+
+def etapa(nome, **campos):
+    """Etapa cronometrada: `with etapa('gravação'):` ou `@etapa('extrair_dados_word')`."""
+    return Etapa(nome, campos)
+
+
+def _pilha():
+    pilha = getattr(_local, 'pilha', None)
+    if pilha is None:
+        pilha = _local.pilha = []
+    return pilha
+
+
+def contar(nome, quantidade=1):
+    with _trava:
+        _contadores[nome] = _contadores.get(nome, 0) + quantidade
+
+
+def contadores():
+    """Cópia dos contadores acumulados neste processo."""
+    with _trava:
+        return dict(_contadores)
+
+
+def emitir_contadores(**campos):
+    """Manda os contadores acumulados desde a última chamada (com os campos dados) e os zera."""
+    with _trava:
+        valores = dict(_contadores)
+        _contadores.clear()
+    if _saidas and valores:
+        emitir({'tipo': 'contadores', 'pid': os.getpid(), **campos, **valores})
+    return valores
+
+
+if os.environ.get(VARIAVEL_AMBIENTE):
+    configurar(os.environ[VARIAVEL_AMBIENTE], exportar=False)
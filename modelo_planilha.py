@@ -0,0 +1,164 @@
+import io
+import os
+import hashlib
+import zipfile
+import threading
+from collections import deque
+from functools import lru_cache
+
+import planilha_xml
+import medicao
+
+# ==============================================================================
+# MODELO PRÉ-LIDO E REAPROVEITADO ENTRE PREENCHIMENTOS
+# ==============================================================================
+# Num lote, todos os documentos usam o mesmo modelo; relê-lo e reinterpretar o
+# xml das abas a cada lista era a maior parte do tempo de preenchimento. Aqui o
+# modelo é lido uma vez por processo (e relido só se o arquivo mudar):
+#
+#   - o pacote .xlsx fica em memória (bytes); cada gravação abre um BytesIO
+#     novo sobre ele, sem copiar, e o modo 'xml' grava só as partes alteradas;
+#   - o índice de linhas livres da aba ativa é montado uma vez e cada trabalho
+#     recebe a sua cópia (deques novas; o índice original nunca é consumido);
+#   - as linhas das outras abas (telhas, vergalhões...) ficam guardadas;
+#   - no modo 'openpyxl' o workbook (células e estilos) é carregado uma vez;
+#     cada trabalho aplica as suas células, salva e devolve o valor anterior
+#     a cada célula tocada, deixando o workbook como o modelo.
+
+LINHA_INICIO_BUSCA = 4   # primeira linha do índice de linhas livres da aba ativa
+
+
+class ModeloPlanilha:
+    """Planilha modelo lida uma vez: pacote em memória, abas, linhas livres e (sob demanda) o workbook."""
+
+    def __init__(self, caminho_planilha):
+        self.caminho = os.path.abspath(caminho_planilha)
+        with medicao.etapa('ler_modelo'):
+            with open(self.caminho, 'rb') as arquivo:
+                self.conteudo = arquivo.read()
+            with zipfile.ZipFile(self.pacote()) as pacote:
+                self.planilhas = dict(planilha_xml.listar_planilhas(pacote))  # {aba: parte xml}
+            self.parte_ativa = planilha_xml.localizar_planilha_ativa(self.pacote())
+        self.nome_ativa = next(nome for nome, parte in self.planilhas.items() if parte == self.parte_ativa)
+        self._linhas = {}          # {(parte, max_col, linha_inicio, formulas): [(linha, valores)]}
+        self._ultimas_colunas = {}  # {parte: maior coluna usada}
+        self._livres = None        # {codigo_secao: (linhas livres)} da aba ativa
+        self._workbook = None
+        self._assinatura = None
+        self._trava = threading.Lock()
+
+    @classmethod
+    def carregar(cls, caminho_planilha):
+        """Modelo do arquivo, lido uma vez por processo (o cache é invalidado se o arquivo mudar)."""
+        info = os.stat(caminho_planilha)
+        acertos = _carregar.cache_info().hits
+        modelo = _carregar(os.path.abspath(caminho_planilha), info.st_mtime_ns, info.st_size)
+        medicao.contar('modelo_acertos' if _carregar.cache_info().hits > acertos else 'modelo_leituras')
+        return modelo
+
+    @property
+    def assinatura(self):
+        """SHA-256 do conteúdo do .xlsx (calculado uma vez)."""
+        if self._assinatura is None:
+            self._assinatura = hashlib.sha256(self.conteudo).hexdigest()
+        return self._assinatura
+
+    def pacote(self):
+        """O .xlsx como arquivo em memória (BytesIO sobre os mesmos bytes, sem cópia)."""
+        return io.BytesIO(self.conteudo)
+
+    # --------------------------------------------------------------------------
+    # Leitura (feita uma vez, servida da memória depois)
+    # --------------------------------------------------------------------------
+    def ler_colunas(self, nome_ou_parte, max_col=2, linha_inicio=1, formulas=False):
+        """
+        Mesmo resultado de planilha_xml.ler_colunas, guardado: [(linha, (valor_A, ...))].
+        Aceita o nome da aba ou a parte xml; devolve None se a aba não existe.
+        """
+        parte = self.planilhas.get(nome_ou_parte, nome_ou_parte)
+        if parte not in self.planilhas.values():
+            return None
+        chave = (parte, max_col, linha_inicio, formulas)
+        linhas = self._linhas.get(chave)
+        if linhas is None:
+            with medicao.etapa('ler_colunas', parte=parte):
+                linhas = self._linhas[chave] = list(planilha_xml.ler_colunas(self.pacote(), parte, max_col, linha_inicio, formulas))
+        return linhas
+
+    def ultima_coluna(self, nome_ou_parte):
+        """Maior coluna usada na aba (guardada)."""
+        parte = self.planilhas.get(nome_ou_parte, nome_ou_parte)
+        if parte not in self._ultimas_colunas:
+            self._ultimas_colunas[parte] = planilha_xml.ultima_coluna(self.pacote(), parte)
+        return self._ultimas_colunas[parte]
+
+    def linhas_livres(self, indexar):
+        """
+        Cópia, só deste trabalho, do índice {codigo_secao: deque(linhas livres)} da aba ativa.
+        `indexar` monta o índice a partir das linhas (AnalisadorListaMaterial._indexar_linhas).
+        """
+        if self._livres is None:
+            indice = indexar(self.ler_colunas(self.parte_ativa, 2, LINHA_INICIO_BUSCA))
+            self._livres = {codigo: tuple(linhas) for codigo, linhas in indice.items()}
+        return {codigo: deque(linhas) for codigo, linhas in self._livres.items()}
+
+    def valores(self, nome, celulas):
+        """{(linha, coluna): valor atual} da aba para as células pedidas (fórmulas como '=...')."""
+        if not celulas:
+            return {}
+        linhas = dict(self.ler_colunas(nome, max(coluna for _, coluna in celulas), formulas=True) or ())
+        return {(linha, coluna): (linhas[linha][coluna - 1] if linha in linhas else None)
+                for linha, coluna in celulas}
+
+    def workbook(self):
+        """Workbook openpyxl do modelo, carregado na primeira vez. Não alterar fora de gravar_openpyxl."""
+        if self._workbook is None:
+            import openpyxl
+            with medicao.etapa('load_workbook'):
+                self._workbook = openpyxl.load_workbook(self.pacote())
+        return self._workbook
+
+    # --------------------------------------------------------------------------
+    # Gravação (só as diferenças de cada trabalho)
+    # --------------------------------------------------------------------------
+    def gravar_xml(self, caminho_saida, celulas_por_aba):
+        """Grava {aba: {(linha, coluna): valor}} remendando só o xml das abas alteradas."""
+        alteracoes = {}
+        for nome, celulas in celulas_por_aba.items():
+            alteracoes.setdefault(self.planilhas[nome], {}).update(celulas)
+        with medicao.etapa('save', modo='xml'):
+            planilha_xml.gravar_celulas(self.pacote(), caminho_saida, alteracoes)
+
+    def gravar_openpyxl(self, caminho_saida, celulas_por_aba):
+        """
+        Grava {aba: {(linha, coluna): valor}} com o openpyxl sobre o workbook já carregado
+        e depois desfaz as alterações, para o próximo trabalho partir do modelo.
+        """
+        with self._trava:
+            workbook = self.workbook()
+            anteriores = []  # (aba, (linha, coluna), valor anterior ou célula nova)
+            try:
+                for nome, celulas in celulas_por_aba.items():
+                    aba = workbook[nome]
+                    for (linha, coluna), valor in celulas.items():
+                        existia = (linha, coluna) in aba._cells
+                        celula = aba.cell(row=linha, column=coluna)
+                        anteriores.append((aba, (linha, coluna), celula.value if existia else _NOVA))
+                        celula.value = valor
+                with medicao.etapa('save', modo='openpyxl'):
+                    workbook.save(caminho_saida)
+            finally:
+                for aba, (linha, coluna), valor in reversed(anteriores):
+                    if valor is _NOVA:
+                        # A célula não existia no modelo: removida para não virar <c> vazio nos próximos.
+                        aba._cells.pop((linha, coluna), None)
+                    else:
+                        aba.cell(row=linha, column=coluna).value = valor
+
+
+_NOVA = object()
+
+
+@lru_cache(maxsize=4)
+def _carregar(caminho_planilha, _mtime_ns, _tamanho):
+    return ModeloPlanilha(caminho_planilha)
@@ -0,0 +1,455 @@
+import io
+import os
+import re
+import stat
+import shutil
+import struct
+import tempfile
+import zipfile
+import posixpath
+import xml.etree.ElementTree as ET
+from functools import lru_cache
+from xml.sax.saxutils import escape
+
+# ==============================================================================
+# LEITURA E GRAVAÇÃO DIRETA NO XML DO .xlsx (sem carregar o workbook inteiro)
+# ==============================================================================
+# Na gravação só as partes das planilhas alteradas são reescritas (em fluxo,
+# linha a linha, trocando apenas os <c> alvo). As demais partes do pacote
+# (estilos, strings compartilhadas, outras planilhas...) são copiadas ainda
+# comprimidas, byte a byte, sem descomprimir e recomprimir. A única exceção é o
+# workbook.xml, que recebe
+# calcPr/@fullCalcOnLoad="1" para o Excel recalcular as fórmulas ao abrir,
+# já que os valores em cache das fórmulas ficam desatualizados.
+
+NS_MAIN = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+NS_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+NS_PKG_REL = 'http://schemas.openxmlformats.org/package/2006/relationships'
+S = '{%s}' % NS_MAIN
+
+PADRAO_LINHA = re.compile(rb'<row\b[^>]*?(?:/>|>.*?</row>)', re.S)
+PADRAO_CELULA = re.compile(rb'<c\b[^>]*?(?:/>|>.*?</c>)', re.S)
+PADRAO_ATRIBUTO_R = re.compile(rb'\br="([A-Z]+)?(\d+)?"')
+PADRAO_ATRIBUTO_S = re.compile(rb'\bs="(\d+)"')
+PADRAO_SPANS = re.compile(rb'\sspans="[^"]*"')
+PADRAO_FORMULA = re.compile(rb'<f\b([^>]*)')
+PADRAO_FORMULA_COMPLETA = re.compile(rb'<f\b([^>]*?)(?:/>|>([^<]*)</f>)')
+PADRAO_ATRIBUTO_SI = re.compile(rb'\bsi="(\d+)"')
+PADRAO_REFERENCIA = re.compile(r'(?<![A-Za-z0-9_.])(\$?)([A-Z]{1,3})(\$?)(\d+)(?![\dA-Za-z_(!])')
+TAMANHO_BLOCO = 1 << 16
+CABECALHO_LOCAL = struct.Struct('<4s2B4HL2L2H')   # cabeçalho local de uma entrada do zip
+ASSINATURA_LOCAL = b'PK\x03\x04'
+FLAG_CRIPTOGRAFADO = 0x01
+FLAG_DESCRITOR_DADOS = 0x08   # CRC e tamanhos depois dos dados (na cópia vão no cabeçalho)
+
+
+def letra_coluna(coluna):
+    """1 -> 'A', 28 -> 'AB'."""
+    letras = ''
+    while coluna:
+        coluna, resto = divmod(coluna - 1, 26)
+        letras = chr(65 + resto) + letras
+    return letras
+
+
+def numero_coluna(letras):
+    """'A' -> 1, 'AB' -> 28."""
+    numero = 0
+    for letra in letras:
+        numero = numero * 26 + (ord(letra) - 64)
+    return numero
+
+
+# ------------------------------------------------------------------------------
+# Leitura
+# ------------------------------------------------------------------------------
+def listar_planilhas(pacote):
+    """Devolve [(nome da aba, parte xml)] na ordem do workbook. `pacote` é um zipfile.ZipFile aberto."""
+    workbook = ET.fromstring(pacote.read('xl/workbook.xml'))
+    rels = ET.fromstring(pacote.read('xl/_rels/workbook.xml.rels'))
+    alvos = {rel.get('Id'): rel.get('Target') for rel in rels.iter('{%s}Relationship' % NS_PKG_REL)}
+    planilhas = []
+    for sheet in workbook.iter(S + 'sheet'):
+        alvo = alvos[sheet.get('{%s}id' % NS_REL)]
+        parte = alvo.lstrip('/') if alvo.startswith('/') else posixpath.normpath(posixpath.join('xl', alvo))
+        planilhas.append((sheet.get('name'), parte))
+    return planilhas
+
+
+def localizar_planilha_ativa(caminho_planilha):
+    """Parte xml da aba ativa (a mesma que o openpyxl devolve em workbook.active)."""
+    with zipfile.ZipFile(caminho_planilha) as pacote:
+        workbook = ET.fromstring(pacote.read('xl/workbook.xml'))
+        vista = workbook.find(f'{S}bookViews/{S}workbookView')
+        indice_ativo = int(vista.get('activeTab', 0)) if vista is not None else 0
+        return listar_planilhas(pacote)[indice_ativo][1]
+
+
+def ler_strings_compartilhadas(pacote):
+    try:
+        dados = pacote.read('xl/sharedStrings.xml')
+    except KeyError:
+        return []
+    return [''.join(t.text or '' for t in si.iter(S + 't')) for si in ET.fromstring(dados).iter(S + 'si')]
+
+
+def _valor_celula(elem, strings):
+    tipo = elem.get('t', 'n')
+    if tipo == 'inlineStr':
+        return ''.join(t.text or '' for t in elem.iter(S + 't'))
+    v = elem.find(S + 'v')
+    if v is None or v.text is None:
+        return None
+    texto = v.text
+    if tipo == 's':
+        return strings[int(texto)]
+    if tipo in ('str', 'e'):
+        return texto
+    if tipo == 'b':
+        return texto == '1'
+    try:
+        return int(texto)
+    except ValueError:
+        return float(texto)
+
+
+def _formula_celula(elem, linha, coluna, compartilhadas):
+    """'=fórmula' da célula (as compartilhadas já deslocadas para ela), ou None se não tiver fórmula."""
+    f = elem.find(S + 'f')
+    if f is None:
+        return None
+    texto = f.text
+    if f.get('t') == 'shared' and f.get('si') is not None:
+        si = int(f.get('si'))
+        if texto is not None:
+            compartilhadas[si] = (texto, linha, coluna)
+        elif si in compartilhadas:
+            texto_mestre, linha_mestre, coluna_mestre = compartilhadas[si]
+            texto = deslocar_formula(texto_mestre, linha - linha_mestre, coluna - coluna_mestre)
+    return '=' + texto if texto is not None else None
+
+
+def ultima_coluna(caminho_planilha, parte):
+    """Maior coluna com célula na aba (varre as células; o <dimension> do arquivo pode estar desatualizado)."""
+    maior = 0
+    with zipfile.ZipFile(caminho_planilha) as pacote, pacote.open(parte) as planilha:
+        for _evento, elem in ET.iterparse(planilha, events=('start',)):
+            if elem.tag == S + 'row':
+                coluna = 0
+            elif elem.tag == S + 'c':
+                referencia = elem.get('r')
+                coluna = numero_coluna(referencia.rstrip('0123456789')) if referencia else coluna + 1
+                maior = max(maior, coluna)
+    return maior
+
+
+def ler_colunas(caminho_planilha, parte, max_col=2, linha_inicio=1, formulas=False):
+    """
+    Lê em fluxo as colunas 1..max_col da planilha e devolve (linha, (valor_A, valor_B, ...))
+    para cada linha existente a partir de linha_inicio, com os mesmos tipos do openpyxl
+    (int/float/str/bool/None). Com formulas, as células com fórmula trazem '=fórmula'
+    (como o openpyxl sem data_only) em vez do último valor calculado.
+    caminho_planilha pode ser também um arquivo aberto (ex: io.BytesIO).
+    """
+    compartilhadas = {}
+    with zipfile.ZipFile(caminho_planilha) as pacote:
+        strings = ler_strings_compartilhadas(pacote)
+        with pacote.open(parte) as planilha:
+            linha_atual, valores = 0, None
+            for evento, elem in ET.iterparse(planilha, events=('start', 'end')):
+                if evento == 'start':
+                    if elem.tag == S + 'row':
+                        linha_atual = int(elem.get('r', linha_atual + 1))
+                        valores = [None] * max_col
+                        coluna_atual = 0
+                    elif elem.tag == S + 'c':
+                        referencia = elem.get('r')
+                        coluna_atual = numero_coluna(referencia.rstrip('0123456789')) if referencia else coluna_atual + 1
+                    continue
+                if elem.tag == S + 'c':
+                    formula = _formula_celula(elem, linha_atual, coluna_atual, compartilhadas) if formulas else None
+                    if coluna_atual <= max_col and linha_atual >= linha_inicio:
+                        valores[coluna_atual - 1] = formula if formula is not None else _valor_celula(elem, strings)
+                    elem.clear()
+                elif elem.tag == S + 'row':
+                    if linha_atual >= linha_inicio:
+                        yield linha_atual, tuple(valores)
+                    elem.clear()
+
+
+# ------------------------------------------------------------------------------
+# Gravação
+# ------------------------------------------------------------------------------
+def deslocar_formula(formula, linhas, colunas):
+    """
+    Desloca as referências relativas de uma fórmula (as com '$' ficam), como o Excel
+    faz ao copiar a célula: deslocar_formula('J4*$L$4', 2, 0) -> 'J6*$L$4'.
+    """
+    def deslocar(ref):
+        coluna_fixa, letras, linha_fixa, numero = ref.groups()
+        if not coluna_fixa:
+            letras = letra_coluna(numero_coluna(letras) + colunas)
+        if not linha_fixa:
+            numero = str(int(numero) + linhas)
+        return f'{coluna_fixa}{letras}{linha_fixa}{numero}'
+
+    # Os trechos ímpares entre aspas são textos literais e ficam como estão.
+    trechos = formula.split('"')
+    trechos[::2] = [PADRAO_REFERENCIA.sub(deslocar, trecho) for trecho in trechos[::2]]
+    return '"'.join(trechos)
+
+
+def _expandir_compartilhadas(xml_linha, numero_linha, grupos):
+    """
+    Troca as referências a fórmulas compartilhadas cuja célula mestre foi sobrescrita
+    (grupos: {si: (texto da fórmula, linha mestre, coluna mestre)}) pela fórmula própria da célula.
+    """
+    def expandir(celula):
+        xml_celula = celula.group(0)
+        formula = PADRAO_FORMULA_COMPLETA.search(xml_celula)
+        si = PADRAO_ATRIBUTO_SI.search(formula.group(1)) if formula else None
+        if si is None or int(si.group(1)) not in grupos:
+            return xml_celula
+        texto, linha_mestre, coluna_mestre = grupos[int(si.group(1))]
+        ref = PADRAO_ATRIBUTO_R.search(xml_celula[:xml_celula.index(b'>')])
+        deslocada = deslocar_formula(texto, numero_linha - linha_mestre, numero_coluna(ref.group(1).decode()) - coluna_mestre)
+        return xml_celula[:formula.start()] + f'<f>{deslocada}</f>'.encode('utf-8') + xml_celula[formula.end():]
+
+    return PADRAO_CELULA.sub(expandir, xml_linha)
+
+
+def _xml_celula(referencia, valor, estilo):
+    atributos = f'r="{referencia}"' + (f' s="{estilo.decode()}"' if estilo else '')
+    if valor is None:
+        return f'<c {atributos}/>'.encode()
+    if isinstance(valor, bool):
+        return f'<c {atributos} t="b"><v>{int(valor)}</v></c>'.encode()
+    if isinstance(valor, (int, float)):
+        # Mesmo formato numérico do openpyxl, para os dois modos gravarem valores idênticos.
+        return f'<c {atributos}><v>{valor:.16g}</v></c>'.encode()
+    if isinstance(valor, str) and valor.startswith('=') and len(valor) > 1:
+        # Como no openpyxl, texto começando com '=' é fórmula (ex: a original devolvida ao modelo).
+        return f'<c {atributos}><f>{escape(valor[1:])}</f></c>'.encode('utf-8')
+    texto = escape(str(valor))
+    return f'<c {atributos} t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'.encode('utf-8')
+
+
+def _remendar_linha(xml_linha, numero_linha, alteracoes_linha, estado):
+    """Troca/insere os <c> alvo de uma linha, mantendo o estilo (s) de cada célula substituída."""
+    pendentes = dict(alteracoes_linha)
+    if xml_linha.endswith(b'/>') and b'</row>' not in xml_linha:
+        abertura, conteudo, fechamento = xml_linha[:-2] + b'>', b'', b'</row>'
+    else:
+        fim_abertura = xml_linha.index(b'>') + 1
+        abertura, conteudo, fechamento = xml_linha[:fim_abertura], xml_linha[fim_abertura:-len(b'</row>')], b'</row>'
+    # 'spans' é só uma dica de otimização e pode ficar errada ao inserir células.
+    abertura = PADRAO_SPANS.sub(b'', abertura)
+
+    partes, posicao, coluna_atual = [], 0, 0
+    for celula in PADRAO_CELULA.finditer(conteudo):
+        xml_celula = celula.group(0)
+        ref = PADRAO_ATRIBUTO_R.search(xml_celula[:xml_celula.index(b'>')])
+        coluna_atual = numero_coluna(ref.group(1).decode()) if ref and ref.group(1) else coluna_atual + 1
+        partes.append(conteudo[posicao:celula.start()])
+        for coluna in sorted(c for c in pendentes if c < coluna_atual):
+            partes.append(_xml_celula(f'{letra_coluna(coluna)}{numero_linha}', pendentes.pop(coluna), None))
+        if coluna_atual in pendentes:
+            formula = PADRAO_FORMULA_COMPLETA.search(xml_celula)
+            if formula:
+                si = PADRAO_ATRIBUTO_SI.search(formula.group(1))
+                if si and b'ref="' in formula.group(1):
+                    # Célula mestre de uma fórmula compartilhada: as demais células do grupo
+                    # passam a ter a fórmula própria (ver _expandir_compartilhadas).
+                    estado['compartilhadas'][int(si.group(1))] = (
+                        (formula.group(2) or b'').decode('utf-8'), numero_linha, coluna_atual)
+                estado['formulas_removidas'] = True
+            estilo = PADRAO_ATRIBUTO_S.search(xml_celula[:xml_celula.index(b'>')])
+            partes.append(_xml_celula(f'{letra_coluna(coluna_atual)}{numero_linha}', pendentes.pop(coluna_atual),
+                                      estilo.group(1) if estilo else None))
+        else:
+            partes.append(xml_celula)
+        posicao = celula.end()
+    partes.append(conteudo[posicao:])
+    for coluna in sorted(pendentes):
+        partes.append(_xml_celula(f'{letra_coluna(coluna)}{numero_linha}', pendentes[coluna], None))
+    return abertura + b''.join(partes) + fechamento
+
+
+def _reescrever_planilha(origem, destino, alteracoes, estado):
+    """
+    Copia o xml da planilha em blocos, remendando só as linhas com alterações.
+    alteracoes: {(linha, coluna): valor}.
+    """
+    por_linha = {}
+    for (linha, coluna), valor in alteracoes.items():
+        por_linha.setdefault(linha, {})[coluna] = valor
+    linhas_faltando = sorted(por_linha)  # linhas alvo ainda não emitidas
+    ultima_linha = 0
+
+    def emitir_linhas_novas(ate):
+        while linhas_faltando and linhas_faltando[0] < ate:
+            numero = linhas_faltando.pop(0)
+            destino.write(_remendar_linha(f'<row r="{numero}"/>'.encode(), numero, por_linha[numero], estado))
+
+    pendente = b''
+    for bloco in iter(lambda: origem.read(TAMANHO_BLOCO), b''):
+        pendente += bloco
+        posicao = 0
+        for linha in PADRAO_LINHA.finditer(pendente):
+            xml_linha = linha.group(0)
+            ref = PADRAO_ATRIBUTO_R.search(xml_linha[:xml_linha.index(b'>')])
+            numero = int(ref.group(2)) if ref and ref.group(2) else ultima_linha + 1
+            ultima_linha = numero
+            destino.write(pendente[posicao:linha.start()])
+            emitir_linhas_novas(numero)
+            if numero in por_linha:
+                linhas_faltando.remove(numero)
+                xml_linha = _remendar_linha(xml_linha, numero, por_linha[numero], estado)
+            if estado['compartilhadas'] and b'si="' in xml_linha:
+                xml_linha = _expandir_compartilhadas(xml_linha, numero, estado['compartilhadas'])
+            destino.write(xml_linha)
+            posicao = linha.end()
+        pendente = pendente[posicao:]
+
+    # Linhas alvo depois da última linha existente entram antes de </sheetData>.
+    if linhas_faltando:
+        if b'<sheetData/>' in pendente:
+            antes, depois = pendente.split(b'<sheetData/>', 1)
+            destino.write(antes + b'<sheetData>')
+            emitir_linhas_novas(float('inf'))
+            pendente = b'</sheetData>' + depois
+        else:
+            antes, depois = pendente.split(b'</sheetData>', 1)
+            destino.write(antes)
+            emitir_linhas_novas(float('inf'))
+            pendente = b'</sheetData>' + depois
+    destino.write(pendente)
+
+
+def _forcar_recalculo(workbook_xml):
+    if b'fullCalcOnLoad=' in workbook_xml:
+        return re.sub(rb'fullCalcOnLoad="[^"]*"', b'fullCalcOnLoad="1"', workbook_xml)
+    if b'<calcPr' in workbook_xml:
+        return workbook_xml.replace(b'<calcPr', b'<calcPr fullCalcOnLoad="1"', 1)
+    return workbook_xml.replace(b'</workbook>', b'<calcPr fullCalcOnLoad="1"/></workbook>', 1)
+
+
+def _sem_calc_chain(nome, dados):
+    """Remove referências ao calcChain.xml (necessário quando alguma fórmula foi sobrescrita)."""
+    if nome == '[Content_Types].xml':
+        return re.sub(rb'<Override[^>]*PartName="/xl/calcChain.xml"[^>]*/>', b'', dados)
+    if nome == 'xl/_rels/workbook.xml.rels':
+        return re.sub(rb'<Relationship[^>]*Target="[^"]*calcChain.xml"[^>]*/>', b'', dados)
+    return dados
+
+
+def _nova_info(info):
+    """Cópia do ZipInfo de entrada para gravação (o zipfile altera o objeto ao gravar)."""
+    nova = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+    nova.compress_type = info.compress_type
+    nova.external_attr = info.external_attr
+    nova.create_system = info.create_system
+    return nova
+
+
+def _copiar_comprimida(entrada, saida, info):
+    """
+    Copia a entrada do pacote como está no disco (já comprimida), sem passar pelo zlib.
+    Entradas criptografadas ou zip64 (que não existem num .xlsx comum) são copiadas
+    descomprimindo e recomprimindo.
+    """
+    if (info.flag_bits & FLAG_CRIPTOGRAFADO or info.file_size >= zipfile.ZIP64_LIMIT
+            or info.compress_size >= zipfile.ZIP64_LIMIT):
+        with entrada.open(info) as origem, saida.open(_nova_info(info), 'w') as destino:
+            shutil.copyfileobj(origem, destino)
+        return
+    entrada.fp.seek(info.header_offset)
+    cabecalho = CABECALHO_LOCAL.unpack(entrada.fp.read(CABECALHO_LOCAL.size))
+    if cabecalho[0] != ASSINATURA_LOCAL:
+        raise zipfile.BadZipFile(f"Cabeçalho inválido na entrada {info.filename!r}.")
+    entrada.fp.seek(cabecalho[-2] + cabecalho[-1], os.SEEK_CUR)  # nome e campo extra locais
+
+    nova = _nova_info(info)
+    nova.flag_bits = info.flag_bits & ~FLAG_DESCRITOR_DADOS
+    nova.CRC, nova.compress_size, nova.file_size = info.CRC, info.compress_size, info.file_size
+    nova.header_offset = saida.fp.tell()
+    saida.fp.write(nova.FileHeader(zip64=False))
+    restante = info.compress_size
+    while restante:
+        bloco = entrada.fp.read(min(TAMANHO_BLOCO, restante))
+        if not bloco:
+            raise zipfile.BadZipFile(f"Entrada {info.filename!r} truncada.")
+        saida.fp.write(bloco)
+        restante -= len(bloco)
+    # Registra a entrada no diretório central, como o próprio zipfile faz ao gravar.
+    saida.filelist.append(nova)
+    saida.NameToInfo[nova.filename] = nova
+    saida.start_dir = saida.fp.tell()
+
+
+@lru_cache(maxsize=None)
+def _umask():
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+def copiar_permissoes(temporario, destino):
+    """
+    Dá ao temporário (o mkstemp cria com 0600) o modo do arquivo que ele vai substituir,
+    ou o de um arquivo novo (0666 menos a umask), antes do os.replace.
+    """
+    try:
+        modo = stat.S_IMODE(os.stat(destino).st_mode)
+    except FileNotFoundError:
+        modo = 0o666 & ~_umask()
+    os.chmod(temporario, modo)
+
+
+def gravar_celulas(caminho_planilha, caminho_saida, alteracoes_por_parte):
+    """
+    Grava as alterações direto no pacote .xlsx (caminho_planilha pode ser um arquivo aberto).
+
+    alteracoes_por_parte: {parte xml da planilha: {(linha, coluna): valor}}.
+    caminho_saida pode ser o próprio caminho_planilha; nesse caso o arquivo é
+    substituído só depois de a gravação terminar. As partes não alteradas são
+    copiadas ainda comprimidas, e o arquivo gravado fica com as permissões do que
+    ele substitui (ou as de um arquivo novo).
+    """
+    pasta_saida = os.path.dirname(os.path.abspath(caminho_saida))
+    estado = {'formulas_removidas': False, 'compartilhadas': {}}
+    with zipfile.ZipFile(caminho_planilha) as entrada:
+        # 1) Remenda as planilhas alteradas (em fluxo) antes de montar o pacote,
+        #    para saber se o calcChain precisa sair e manter a ordem original das partes.
+        remendadas = {}
+        for parte, alteracoes in alteracoes_por_parte.items():
+            if not alteracoes:
+                continue
+            destino = io.BytesIO()
+            estado['compartilhadas'] = {}  # os índices si são próprios de cada planilha
+            with entrada.open(parte) as origem:
+                _reescrever_planilha(origem, destino, alteracoes, estado)
+            remendadas[parte] = destino.getvalue()
+
+        # 2) Monta o novo pacote na mesma ordem, copiando o resto ainda comprimido.
+        descritor, caminho_temporario = tempfile.mkstemp(suffix='.xlsx', dir=pasta_saida)
+        os.close(descritor)
+        try:
+            with zipfile.ZipFile(caminho_temporario, 'w', zipfile.ZIP_DEFLATED) as saida:
+                for info in entrada.infolist():
+                    nome = info.filename
+                    if nome in remendadas:
+                        saida.writestr(_nova_info(info), remendadas[nome])
+                    elif nome == 'xl/workbook.xml' and remendadas:
+                        saida.writestr(_nova_info(info), _forcar_recalculo(entrada.read(info)))
+                    elif estado['formulas_removidas'] and nome == 'xl/calcChain.xml':
+                        continue
+                    elif estado['formulas_removidas'] and nome in ('[Content_Types].xml', 'xl/_rels/workbook.xml.rels'):
+                        saida.writestr(_nova_info(info), _sem_calc_chain(nome, entrada.read(info)))
+                    else:
+                        _copiar_comprimida(entrada, saida, info)
+            copiar_permissoes(caminho_temporario, caminho_saida)
+        except BaseException:
+            os.remove(caminho_temporario)
+            raise
+    os.replace(caminho_temporario, caminho_saida)
@@ -0,0 +1,163 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+from collections import namedtuple
+
+from planilha_xml import copiar_permissoes
+
+# ==============================================================================
+# REGISTRO DE PREENCHIMENTO (o que cada lista gravou na planilha)
+# ==============================================================================
+# Ao preencher a própria planilha de novo com uma revisão da mesma lista, o
+# programa tomava linhas livres novas e duplicava os itens. O registro fica ao
+# lado da planilha (<planilha>.xlsx.preenchimento.json; o openpyxl descartaria
+# uma parte extra dentro do .xlsx) e guarda, por lista de origem (identificada
+# pelo caminho absoluto: obraA/lista.docx e obraB/lista.docx são listas
+# diferentes):
+#
+#   itens     {chave do item: [código da seção, linha na aba ativa, hash]}
+#   celulas   {aba: [[linha, coluna, valor gravado]]}
+#   originais {aba: [[linha, coluna, valor do modelo antes]]} (fórmulas como '=...')
+#
+# A chave do item é (seção, descrição, ocorrência) e o hash cobre os campos
+# da linha. Numa nova passada da mesma lista, o cruzamento pelas chaves devolve
+# a cada item a linha que ele já ocupava, os itens removidos liberam a linha
+# (com os valores originais de volta) e só as células que mudaram são gravadas.
+#
+# Se as células registradas não batem mais com a planilha (modelo trocado,
+# linhas apagadas à mão), o registro daquela lista é descartado e a lista é
+# preenchida do zero.
+#
+# O registro é lido do mesmo arquivo em que é gravado. Numa cópia do modelo
+# (o lote), ele guarda também a assinatura do modelo: rodando o lote de novo,
+# a cópia anterior é a planilha de partida se veio do mesmo modelo; senão a
+# cópia é refeita do modelo, com um registro novo.
+
+SUFIXO_REGISTRO = '.preenchimento.json'
+VERSAO_REGISTRO = 2   # 1: listas pelo nome do arquivo
+TOLERANCIA_RELATIVA = 1e-9   # o Excel regrava os números com 15 algarismos
+
+EntradaFonte = namedtuple('EntradaFonte', 'hash_lista itens celulas originais data')
+
+
+def caminho_registro(caminho_planilha):
+    return caminho_planilha + SUFIXO_REGISTRO
+
+
+def chave_fonte(caminho_lista):
+    """Identificação da lista no registro: o caminho absoluto (sem distinção de maiúsculas no Windows)."""
+    return os.path.normcase(os.path.abspath(caminho_lista))
+
+
+def chaves_itens(dados_agrupados):
+    """{id(item): chave} na ordem de dados_agrupados ({codigo: [(item, tipo)]}); ocorrências numeradas."""
+    chaves, ocorrencias = {}, {}
+    for codigo, itens in dados_agrupados.items():
+        for item, _tipo in itens:
+            base = (codigo, item[0])
+            ocorrencias[base] = ocorrencias.get(base, 0) + 1
+            chaves[id(item)] = f"{codigo}\x1f{item[0]}\x1f{ocorrencias[base]}"
+    return chaves
+
+
+def hash_item(item):
+    campos = [item[0], item[1], item[2], item[3], getattr(item, 'classe', None), *getattr(item, 'medidas', ())]
+    return hashlib.sha1(json.dumps(campos, ensure_ascii=False).encode('utf-8')).hexdigest()[:16]
+
+
+def valores_iguais(a, b):
+    if isinstance(a, bool) or isinstance(b, bool):
+        return a is b
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return a == b or abs(a - b) <= TOLERANCIA_RELATIVA * max(abs(a), abs(b))
+    return a == b or (a in (None, '') and b in (None, ''))
+
+
+def diferencas(anteriores, desejadas, originais):
+    """
+    Células a gravar, {aba: {(linha, coluna): valor}}: as desejadas que mudaram e, das
+    gravadas antes que não são mais desejadas, o valor original do modelo.
+    """
+    gravar = {}
+    for aba, celulas in desejadas.items():
+        antes = anteriores.get(aba, {})
+        for chave, valor in celulas.items():
+            if chave not in antes or not valores_iguais(antes[chave], valor):
+                gravar.setdefault(aba, {})[chave] = valor
+    for aba, celulas in anteriores.items():
+        agora = desejadas.get(aba, {})
+        for chave in celulas:
+            if chave not in agora:
+                gravar.setdefault(aba, {})[chave] = originais.get(aba, {}).get(chave)
+    return gravar
+
+
+def _para_json(celulas_por_aba):
+    return {aba: [[linha, coluna, valor] for (linha, coluna), valor in sorted(celulas.items())]
+            for aba, celulas in celulas_por_aba.items() if celulas}
+
+
+def _de_json(dados):
+    return {aba: {(linha, coluna): valor for linha, coluna, valor in celulas} for aba, celulas in dados.items()}
+
+
+class RegistroPreenchimento:
+    """Entradas por lista de origem de uma planilha preenchida."""
+
+    def __init__(self, fontes=None, modelo=None):
+        self.fontes = fontes or {}   # {fonte: EntradaFonte}
+        self.modelo = modelo         # assinatura do modelo de que a planilha é cópia (None: preenchida no lugar)
+
+    @classmethod
+    def carregar(cls, caminho_planilha):
+        """Registro ao lado da planilha; vazio se não existe, é de outra versão ou está corrompido."""
+        caminho = caminho_registro(caminho_planilha)
+        try:
+            with open(caminho, encoding='utf-8') as arquivo:
+                dados = json.load(arquivo)
+            if dados.get('versao') != VERSAO_REGISTRO:
+                return cls()
+            return cls({fonte: EntradaFonte(e['hash_lista'], {chave: tuple(v) for chave, v in e['itens'].items()},
+                                            _de_json(e['celulas']), _de_json(e['originais']), e.get('data'))
+                        for fonte, e in dados['fontes'].items()}, dados.get('modelo'))
+        except FileNotFoundError:
+            return cls()
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"  AVISO: Registro de preenchimento ilegível ({e}); a planilha será preenchida do zero.")
+            return cls()
+
+    def entrada(self, fonte):
+        return self.fontes.get(fonte)
+
+    def descartar(self, fonte):
+        self.fontes.pop(fonte, None)
+
+    def registrar(self, fonte, hash_lista, itens, celulas, originais):
+        """itens: {chave: (codigo, linha ou None, hash)}; celulas/originais: {aba: {(linha, coluna): valor}}."""
+        self.fontes[fonte] = EntradaFonte(hash_lista, itens, celulas, originais, time.strftime('%Y-%m-%dT%H:%M:%S'))
+
+    def gravar(self, caminho_planilha):
+        """
+        Grava ao lado da planilha (troca atômica, mantendo as permissões do registro anterior).
+        Sem entradas, remove o registro antigo.
+        """
+        caminho = caminho_registro(caminho_planilha)
+        if not self.fontes:
+            if os.path.exists(caminho):
+                os.remove(caminho)
+            return
+        dados = {'versao': VERSAO_REGISTRO, 'modelo': self.modelo, 'fontes': {
+            fonte: {'hash_lista': e.hash_lista, 'data': e.data, 'itens': {chave: list(v) for chave, v in e.itens.items()},
+                    'celulas': _para_json(e.celulas), 'originais': _para_json(e.originais)}
+            for fonte, e in self.fontes.items()}}
+        descritor, temporario = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(caminho)), suffix='.tmp')
+        try:
+            with os.fdopen(descritor, 'w', encoding='utf-8') as arquivo:
+                json.dump(dados, arquivo, ensure_ascii=False)
+            copiar_permissoes(temporario, caminho)
+            os.replace(temporario, caminho)
+        except BaseException:
+            os.remove(temporario)
+            raise
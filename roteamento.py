@@ -0,0 +1,215 @@
+import re
+import json
+from collections import deque
+from functools import lru_cache
+
+import dimensoes
+import planilha_xml
+from classificador import ARQUIVO_REGRAS_PADRAO, caminho_recurso
+
+# ==============================================================================
+# ROTEAMENTO DOS ITENS PARA AS OUTRAS ABAS (TELHAS, vergalhão, Guarda corpo)
+# ==============================================================================
+# Os códigos que aparecem em "destinos" (regras_perfis.json) não vão para a aba
+# ativa: cada um aponta a aba, como achar a linha e quais colunas preencher.
+# Cada aba é lida uma única vez, montando o índice de linhas de todos os
+# destinos dela, e as células de todas as abas são gravadas juntas.
+#
+# casamento (como a linha da seção é reconhecida na coluna_secao):
+#   'codigo'    texto igual a `secao`
+#   'prefixo'   texto começando com `secao` (ex: TELHA 01, TELHA 02, ...)
+#   'numero'    número igual ao campo `campo_numero` do item (ex: bitola em mm)
+#   'descricao' o rótulo mais longo com que a descrição do item começa
+# modo:
+#   'vagas'     cada item ocupa uma linha livre (coluna_livre vazia, 0 ou 'X')
+#   'acumular'  os valores numéricos dos itens da linha são somados entre si; a
+#               soma parte de zero a cada preenchimento e substitui o número do
+#               modelo. Com "somar_ao_modelo": true ela parte do número que a
+#               célula tem no modelo (ex: Guarda corpo C1 = 10.8, mais os itens).
+# colunas: {letra: campo do item} ou {letra: valor fixo}. Campos: perfil, aco,
+#   comprimento_m, comprimento_mm, peso, bitola_mm.
+
+VALORES_LIVRES = (None, 0, 'X', '')
+TOLERANCIA_NUMERO = 0.05
+CAMPOS = ('perfil', 'aco', 'comprimento_m', 'comprimento_mm', 'peso', 'bitola_mm')
+PADRAO_TIPO_ACO = re.compile(r'\bCA\s*-?\s*\d+', re.IGNORECASE)  # CA50, CA-60: não são a bitola
+
+
+def _normalizar(texto):
+    """Maiúsculas, sem espaços repetidos e com hífen como espaço (GUARDA-CORPO = GUARDA CORPO)."""
+    return ' '.join(str(texto).upper().replace('-', ' ').split())
+
+
+def campos_do_item(item):
+    """Valores que um destino pode gravar, a partir de uma linha [perfil, aco, l_total_m, peso]."""
+    perfil, aco, l_total_m, peso = item
+    numeros = dimensoes.PADRAO_NUMEROS.findall(PADRAO_TIPO_ACO.sub(' ', perfil))
+    return {
+        'perfil': perfil,
+        'aco': aco,
+        'comprimento_m': l_total_m,
+        'comprimento_mm': round(l_total_m * 1000, 1),
+        'peso': peso,
+        # Bitola: a última medida da descrição (ex: "VERGALHÃO CA50 Ø 10" -> 10, 'Ø 3/8"' -> 9.525).
+        'bitola_mm': dimensoes.converter_para_mm(numeros[-1]) if numeros else 0.0,
+    }
+
+
+class Destino:
+    """Para onde vão os itens de um código: aba, reconhecimento da linha e colunas."""
+
+    def __init__(self, codigo, planilha, colunas, secao=None, coluna_secao='A', casamento='codigo',
+                 modo='vagas', coluna_livre=None, linha_inicio=1, campo_numero='bitola_mm', somar_ao_modelo=False):
+        if casamento not in ('codigo', 'prefixo', 'numero', 'descricao'):
+            raise ValueError(f"Destino '{codigo}': casamento desconhecido {casamento!r}.")
+        if modo not in ('vagas', 'acumular'):
+            raise ValueError(f"Destino '{codigo}': modo desconhecido {modo!r}.")
+        if modo == 'vagas' and coluna_livre is None:
+            raise ValueError(f"Destino '{codigo}': o modo 'vagas' precisa de 'coluna_livre'.")
+        if somar_ao_modelo and modo != 'acumular':
+            raise ValueError(f"Destino '{codigo}': 'somar_ao_modelo' só vale no modo 'acumular'.")
+        for letra, campo in colunas.items():
+            if isinstance(campo, str) and campo not in CAMPOS:
+                raise ValueError(f"Destino '{codigo}': campo desconhecido {campo!r} na coluna {letra}.")
+        self.codigo = codigo
+        self.planilha = planilha
+        self.colunas = {planilha_xml.numero_coluna(letra): campo for letra, campo in colunas.items()}
+        self.secao = secao if secao is not None else codigo
+        self.coluna_secao = planilha_xml.numero_coluna(coluna_secao)
+        self.casamento = casamento
+        self.modo = modo
+        self.coluna_livre = planilha_xml.numero_coluna(coluna_livre) if coluna_livre else None
+        self.linha_inicio = linha_inicio
+        self.campo_numero = campo_numero
+        self.somar_ao_modelo = somar_ao_modelo
+
+    @property
+    def max_coluna(self):
+        """Última coluna a ler da aba (somando ao modelo, também as colunas somadas)."""
+        colunas = [self.coluna_secao, self.coluna_livre or 0]
+        if self.somar_ao_modelo:
+            colunas.extend(self.colunas)
+        return max(colunas)
+
+    def indexar(self, linhas):
+        """Monta o índice de linhas deste destino a partir de [(linha, valores)] da aba."""
+        if self.casamento in ('codigo', 'prefixo'):
+            secao = _normalizar(self.secao)
+            livres = deque()
+            for linha, valores in linhas:
+                rotulo = valores[self.coluna_secao - 1]
+                if not isinstance(rotulo, str) or linha < self.linha_inicio:
+                    continue
+                rotulo = _normalizar(rotulo)
+                casou = rotulo == secao if self.casamento == 'codigo' else rotulo.startswith(secao)
+                livre = self.coluna_livre is None or valores[self.coluna_livre - 1] in VALORES_LIVRES
+                if casou and (livre or self.modo == 'acumular'):
+                    livres.append(linha)
+            return livres
+        indice = []
+        for linha, valores in linhas:
+            rotulo = valores[self.coluna_secao - 1]
+            if linha < self.linha_inicio or rotulo is None:
+                continue
+            if self.casamento == 'numero' and _numero(rotulo):
+                indice.append((float(rotulo), linha))
+            elif self.casamento == 'descricao' and isinstance(rotulo, str) and rotulo.strip():
+                indice.append((_normalizar(rotulo), linha))
+        if self.casamento == 'descricao':
+            indice.sort(key=lambda par: -len(par[0]))  # o rótulo mais específico primeiro
+        return indice
+
+    def localizar(self, indice, campos):
+        """Linha para o item (consumindo a vaga no modo 'vagas'), ou None."""
+        if self.casamento in ('codigo', 'prefixo'):
+            if not indice:
+                return None
+            return indice.popleft() if self.modo == 'vagas' else indice[0]
+        if self.casamento == 'numero':
+            alvo = campos[self.campo_numero]
+            for valor, linha in indice:
+                if abs(valor - alvo) <= TOLERANCIA_NUMERO:
+                    return linha
+            return None
+        descricao = _normalizar(campos['perfil'])
+        for rotulo, linha in indice:
+            if descricao.startswith(rotulo):
+                return linha
+        return None
+
+
+def _numero(valor):
+    return isinstance(valor, (int, float)) and not isinstance(valor, bool)
+
+
+def _valor_aba(valores_aba, linha, coluna):
+    """Valor da célula na aba lida ({linha: (valor_col_1, ...)}), ou None."""
+    valores = valores_aba.get(linha)
+    if valores is None or coluna > len(valores):
+        return None
+    return valores[coluna - 1]
+
+
+def carregar_destinos(caminho=None):
+    """Lê a seção "destinos" das regras: {codigo: Destino}."""
+    caminho = caminho or caminho_recurso(ARQUIVO_REGRAS_PADRAO)
+    with open(caminho, encoding='utf-8') as arquivo:
+        dados = json.load(arquivo)
+    return {codigo: Destino(codigo, **config) for codigo, config in dados.get('destinos', {}).items()}
+
+
+@lru_cache(maxsize=None)
+def destinos_padrao():
+    return carregar_destinos()
+
+
+def planejar_destinos(dados_agrupados, destinos, ler_linhas, cancelamento=None):
+    """
+    Decide as células das outras abas para os códigos com destino.
+
+    dados_agrupados: {codigo: [(item, tipo_perfil)]} (só os códigos roteados).
+    ler_linhas(nome_planilha, max_coluna): [(linha, (valor_col_1, ...))] da aba, ou None se a aba não existe.
+    Devolve {nome_planilha: {(linha, coluna): valor}}.
+    """
+    por_planilha = {}
+    for codigo in dados_agrupados:
+        destino = destinos[codigo]
+        por_planilha.setdefault(destino.planilha, []).append(destino)
+
+    celulas_por_planilha = {}
+    for nome_planilha, destinos_da_planilha in por_planilha.items():
+        linhas = ler_linhas(nome_planilha, max(d.max_coluna for d in destinos_da_planilha))
+        if linhas is None:
+            for destino in destinos_da_planilha:
+                print(f"  AVISO: A aba '{nome_planilha}' não existe na planilha. "
+                      f"{len(dados_agrupados[destino.codigo])} item(ns) de '{destino.codigo}' não inserido(s).")
+            continue
+        linhas = list(linhas)  # uma leitura da aba serve para todos os destinos dela
+        valores_aba = dict(linhas)
+        celulas = celulas_por_planilha.setdefault(nome_planilha, {})
+        for destino in destinos_da_planilha:
+            indice = destino.indexar(linhas)
+            for item, _tipo in dados_agrupados[destino.codigo]:
+                if cancelamento is not None and cancelamento.is_set():
+                    return celulas_por_planilha
+                campos = campos_do_item(item)
+                linha_alvo = destino.localizar(indice, campos)
+                if linha_alvo is None:
+                    print(f"  AVISO: Nenhuma linha livre/correspondente na aba '{nome_planilha}' para '{destino.codigo}'. "
+                          f"Item '{item[0]}' não inserido.")
+                    continue
+                for coluna, campo in destino.colunas.items():
+                    chave = (linha_alvo, coluna)
+                    if not isinstance(campo, str):
+                        celulas[chave] = campo  # valor fixo: gravado, nunca somado
+                        continue
+                    valor = campos[campo]
+                    if destino.modo == 'acumular' and _numero(valor):
+                        if chave in celulas:
+                            anterior = celulas[chave]
+                        else:
+                            anterior = _valor_aba(valores_aba, linha_alvo, coluna) if destino.somar_ao_modelo else None
+                        if _numero(anterior):
+                            valor = anterior + valor
+                    celulas[chave] = valor
+    return celulas_por_planilha
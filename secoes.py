@@ -0,0 +1,126 @@
+import json
+import math
+from collections import namedtuple
+from functools import lru_cache
+
+from classificador import caminho_recurso
+
+# ==============================================================================
+# SEÇÃO PADRÃO MAIS PRÓXIMA (perfis dobrados fora da série)
+# ==============================================================================
+# O mCalc gera dimensões como "[ 117 x 30 x 2" que não existem na série
+# comercial. As séries de secoes_padrao.json viram, por classe, uma árvore k-d
+# sobre (a, b, c, esp) montada uma vez por processo; a consulta desce só pelos
+# ramos que ainda podem ter um ponto mais perto, O(log n) em média.
+#
+# A espessura pesa PESO_ESPESSURA vezes mais na distância: errar 0,5 mm de
+# chapa muda o perfil muito mais que 5 mm de alma.
+
+ARQUIVO_SECOES_PADRAO = 'secoes_padrao.json'
+PESO_ESPESSURA = 10.0
+TOLERANCIA_PADRAO_MM = 5.0   # distância máxima para o modo 'ajustar' trocar as medidas
+MODOS_SECOES = ('marcar', 'ajustar')
+
+SecaoProxima = namedtuple('SecaoProxima', 'medidas distancia')
+
+
+class ArvoreKD:
+    """Árvore k-d estática: nós em listas paralelas, construída e consultada sem recursão."""
+
+    def __init__(self, pontos):
+        pontos = [tuple(map(float, p)) for p in pontos]
+        self.pontos, self.eixos, self.esquerda, self.direita = [], [], [], []
+        if not pontos:
+            self.raiz = -1
+            return
+        dimensao = len(pontos[0])
+        self.raiz = self._novo_no()
+        pilha = [(self.raiz, pontos, 0)]
+        while pilha:
+            no, grupo, profundidade = pilha.pop()
+            eixo = profundidade % dimensao
+            grupo.sort(key=lambda p: p[eixo])
+            meio = len(grupo) // 2
+            self.pontos[no], self.eixos[no] = grupo[meio], eixo
+            if grupo[:meio]:
+                self.esquerda[no] = self._novo_no()
+                pilha.append((self.esquerda[no], grupo[:meio], profundidade + 1))
+            if grupo[meio + 1:]:
+                self.direita[no] = self._novo_no()
+                pilha.append((self.direita[no], grupo[meio + 1:], profundidade + 1))
+
+    def _novo_no(self):
+        self.pontos.append(None)
+        self.eixos.append(0)
+        self.esquerda.append(-1)
+        self.direita.append(-1)
+        return len(self.pontos) - 1
+
+    def __len__(self):
+        return len(self.pontos)
+
+    def mais_proximo(self, alvo):
+        """(distância euclidiana, ponto) mais perto do alvo; (inf, None) se a árvore estiver vazia."""
+        melhor, melhor_d2 = None, math.inf
+        pilha = [(self.raiz, 0.0)] if self.raiz >= 0 else []
+        while pilha:
+            no, limite_d2 = pilha.pop()
+            if limite_d2 >= melhor_d2:
+                continue  # o outro lado do corte já está mais longe que o melhor achado
+            ponto = self.pontos[no]
+            d2 = sum((x - y) ** 2 for x, y in zip(ponto, alvo))
+            if d2 < melhor_d2:
+                melhor, melhor_d2 = ponto, d2
+            eixo = self.eixos[no]
+            diferenca = alvo[eixo] - ponto[eixo]
+            perto, longe = ((self.esquerda[no], self.direita[no]) if diferenca < 0
+                            else (self.direita[no], self.esquerda[no]))
+            if longe >= 0:
+                pilha.append((longe, diferenca * diferenca))
+            if perto >= 0:
+                pilha.append((perto, limite_d2))  # desempilhado primeiro: encolhe melhor_d2 cedo
+        return math.sqrt(melhor_d2), melhor
+
+
+class IndiceSecoes:
+    """Uma árvore k-d por classe de perfil sobre as medidas (a, b, c, esp) da série padrão."""
+
+    def __init__(self, series):
+        self.arvores = {}
+        for classe, serie in series.items():
+            pontos = []
+            for secao in serie['secoes']:
+                medidas = (list(secao) + [0.0, 0.0, 0.0])[:3]
+                for espessura in serie['espessuras']:
+                    pontos.append(_coordenadas(*medidas, espessura))
+            self.arvores[classe] = ArvoreKD(pontos)
+        self.mais_proxima = lru_cache(maxsize=4096)(self._mais_proxima)
+
+    @classmethod
+    def carregar(cls, caminho=None):
+        caminho = caminho or caminho_recurso(ARQUIVO_SECOES_PADRAO)
+        with open(caminho, encoding='utf-8') as arquivo:
+            dados = json.load(arquivo)
+        return cls({classe: serie for classe, serie in dados.items() if not classe.startswith('_')})
+
+    def _mais_proxima(self, classe, a, b, c, esp):
+        """
+        Seção padrão mais próxima de (a, b, c, esp), ou None se a classe não tem série.
+        distancia é 0 quando as medidas já são de uma seção padrão.
+        """
+        arvore = self.arvores.get(classe)
+        if arvore is None or not len(arvore):
+            return None
+        distancia, ponto = arvore.mais_proximo(_coordenadas(a, b, c, esp))
+        a, b, c, esp = ponto
+        return SecaoProxima((a, b, c, esp / PESO_ESPESSURA), round(distancia, 6))
+
+
+def _coordenadas(a, b, c, esp):
+    return float(a), float(b), float(c), float(esp) * PESO_ESPESSURA
+
+
+@lru_cache(maxsize=None)
+def indice_padrao():
+    """Índice das séries de secoes_padrao.json, montado uma única vez por processo."""
+    return IndiceSecoes.carregar()
@@ -0,0 +1,262 @@
+import os
+import sys
+import json
+import time
+import zipfile
+import tempfile
+import threading
+import multiprocessing
+import xml.etree.ElementTree as ET
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import medicao
+from leitor_docx import DocumentoAusente
+from analisador import AnalisadorListaMaterial, MODOS_ESCRITA, preaquecer_dependencias
+from secoes import MODOS_SECOES
+
+# ==============================================================================
+# SERVIÇO HTTP LOCAL DE CONVERSÃO (para chamar de outros programas, sem a janela)
+# ==============================================================================
+# Uso: python main.py serve --template "TABELA-DE-AÇO R8.xlsx" --porta 8765
+#
+#   POST /convert   corpo = .docx/.rtf  ->  planilha .xlsx preenchida
+#   POST /extract   corpo = .docx/.rtf  ->  JSON com as linhas da lista
+#   GET  /status    contadores do serviço
+#
+# Parâmetros na URL: formato=rtf (padrão docx), escrita=openpyxl|xml,
+# cortes=1, secoes=marcar|ajustar.
+#
+# Arquivo corrompido ou de outro formato: 422 (só os erros da leitura do
+# arquivo: zip inválido, xml inválido, docx sem o documento). Qualquer outra
+# exceção, inclusive KeyError/ValueError do próprio código, é falha do serviço: 500.
+# Em nenhum dos dois a resposta traz a mensagem da exceção (ela vai para o log).
+#
+# Os processos de trabalho são criados na partida (multiprocessing.Pool) e
+# cada um já importa openpyxl/python-docx, monta o catálogo, as regras de
+# destino e o índice de seções e faz um preenchimento de aquecimento com o
+# modelo. Um pedido não paga nada disso: só a extração e a gravação.
+
+PORTA_PADRAO = 8765
+HOST_PADRAO = '127.0.0.1'
+TAMANHO_MAXIMO_CORPO = 50 * 2**20
+TIPO_XLSX = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+FORMATOS = ('docx', 'rtf')
+
+_worker = {}  # estado de cada processo de trabalho (preenchido por _iniciar_worker)
+
+
+# ------------------------------------------------------------------------------
+# Processos de trabalho
+# ------------------------------------------------------------------------------
+def _iniciar_worker(caminho_modelo, modo_escrita):
+    import catalogo
+    import secoes
+    import roteamento
+    preaquecer_dependencias()
+    analisador = AnalisadorListaMaterial()
+    analisador.modo_escrita = modo_escrita
+    analisador.registrar_preenchimento = False  # cada pedido parte do modelo limpo, numa pasta temporária
+    catalogo.CatalogoPerfis.carregar(caminho_modelo)
+    secoes.indice_padrao()
+    roteamento.destinos_padrao()
+    with tempfile.TemporaryDirectory() as pasta:  # aquecimento: o mesmo caminho de um pedido real
+        analisador.preencher_planilha_excel(caminho_modelo, [], os.path.join(pasta, 'aquecimento.xlsx'))
+    _worker.update(analisador=analisador, modelo=caminho_modelo, modo_escrita=modo_escrita)
+
+
+class ListaIlegivel(Exception):
+    """O arquivo enviado não é uma lista .docx/.rtf legível (vira 422, sem detalhes do processo de trabalho)."""
+
+
+def _erros_leitura():
+    """Exceções dos leitores para um arquivo corrompido ou de outro formato (e só elas)."""
+    from docx.opc.exceptions import OpcError  # já importado pelo aquecimento do worker
+    return zipfile.BadZipFile, ET.ParseError, DocumentoAusente, OpcError
+
+
+def _extrair_conteudo(analisador, conteudo, formato, pasta):
+    caminho = os.path.join(pasta, 'lista.' + formato)
+    with open(caminho, 'wb') as arquivo:
+        arquivo.write(conteudo)
+    try:
+        return analisador.extrair_dados_word(caminho)
+    except _erros_leitura() as e:
+        # A mensagem original traz o caminho temporário do worker: só o tipo segue adiante.
+        raise ListaIlegivel(type(e).__name__) from None
+
+
+def _tarefa_extrair(conteudo, formato):
+    analisador = _worker['analisador']
+    with tempfile.TemporaryDirectory() as pasta:
+        dados = _extrair_conteudo(analisador, conteudo, formato, pasta) or []
+    itens = [{'perfil': item.perfil, 'aco': item.aco, 'l_total_m': item.l_total_m, 'peso': item.peso,
+              'codigo': item.codigo, 'classe': item.classe, 'a': item.a, 'b': item.b, 'c': item.c,
+              'esp': item.esp} for item in dados]
+    return {'motor': analisador.motor_extracao, 'itens': itens}
+
+
+def _tarefa_converter(conteudo, formato, opcoes):
+    """Devolve (bytes do .xlsx, nº de itens) ou (None, 0) se a lista não tem dados."""
+    analisador = _worker['analisador']
+    analisador.otimizar_cortes = opcoes.get('cortes', False)
+    analisador.modo_secoes = opcoes.get('secoes')
+    try:
+        with tempfile.TemporaryDirectory() as pasta:
+            dados = _extrair_conteudo(analisador, conteudo, formato, pasta)
+            if not dados:
+                return None, 0
+            saida = os.path.join(pasta, 'saida.xlsx')
+            analisador.preencher_planilha_excel(_worker['modelo'], dados, saida,
+                                                modo_escrita=opcoes.get('escrita') or _worker['modo_escrita'])
+            with open(saida, 'rb') as arquivo:
+                return arquivo.read(), len(dados)
+    finally:
+        analisador.otimizar_cortes, analisador.modo_secoes = False, None
+        medicao.emitir_contadores(pedido='convert')
+
+
+# ------------------------------------------------------------------------------
+# HTTP
+# ------------------------------------------------------------------------------
+class ErroPedido(Exception):
+    """Pedido inválido (vira uma resposta 4xx com a mensagem)."""
+
+    def __init__(self, mensagem, status=400):
+        super().__init__(mensagem)
+        self.status = status
+
+
+class _Manipulador(BaseHTTPRequestHandler):
+    server_version = 'AnalisadorListaMaterial/1'
+
+    def log_message(self, formato, *argumentos):
+        if not self.server.silencioso:
+            super().log_message(formato, *argumentos)
+
+    def _responder(self, status, corpo, tipo, cabecalhos=None):
+        self.send_response(status)
+        self.send_header('Content-Type', tipo)
+        self.send_header('Content-Length', str(len(corpo)))
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _responder_json(self, status, dados, cabecalhos=None):
+        self._responder(status, json.dumps(dados, ensure_ascii=False).encode('utf-8'),
+                        'application/json; charset=utf-8', cabecalhos)
+
+    def _ler_corpo(self):
+        try:
+            tamanho = int(self.headers.get('Content-Length', ''))
+        except ValueError:
+            raise ErroPedido("Content-Length ausente ou inválido.", 411) from None
+        if tamanho > TAMANHO_MAXIMO_CORPO:
+            raise ErroPedido(f"Arquivo maior que {TAMANHO_MAXIMO_CORPO // 2**20} MiB.", 413)
+        if tamanho <= 0:
+            raise ErroPedido("Corpo vazio: envie o .docx/.rtf no corpo do pedido.")
+        return self.rfile.read(tamanho)
+
+    @staticmethod
+    def _opcoes(consulta):
+        parametros = {nome: valores[-1] for nome, valores in parse_qs(consulta).items()}
+        formato = parametros.get('formato', 'docx').lower()
+        if formato not in FORMATOS:
+            raise ErroPedido(f"formato deve ser {' ou '.join(FORMATOS)}.")
+        escrita = parametros.get('escrita')
+        if escrita is not None and escrita not in MODOS_ESCRITA:
+            raise ErroPedido(f"escrita deve ser {' ou '.join(MODOS_ESCRITA)}.")
+        secoes = parametros.get('secoes')
+        if secoes is not None and secoes not in MODOS_SECOES:
+            raise ErroPedido(f"secoes deve ser {' ou '.join(MODOS_SECOES)}.")
+        return formato, {'escrita': escrita, 'secoes': secoes,
+                         'cortes': parametros.get('cortes', '0').lower() in ('1', 'sim', 'true')}
+
+    def do_GET(self):
+        if urlsplit(self.path).path != '/status':
+            self._responder_json(404, {'erro': 'rota desconhecida'})
+            return
+        self._responder_json(200, self.server.estado())
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        inicio = time.perf_counter()
+        self.server.contar('em_andamento', +1)
+        try:
+            if url.path not in ('/convert', '/extract'):
+                raise ErroPedido('rota desconhecida', 404)
+            formato, opcoes = self._opcoes(url.query)
+            conteudo = self._ler_corpo()
+            if url.path == '/extract':
+                resposta = self.server.pool.apply(_tarefa_extrair, (conteudo, formato))
+                self._responder_json(200, resposta)
+            else:
+                planilha, num_itens = self.server.pool.apply(_tarefa_converter, (conteudo, formato, opcoes))
+                if planilha is None:
+                    raise ErroPedido("A lista não tem a tabela de perfis (nenhum item extraído).", 422)
+                self._responder(200, planilha, TIPO_XLSX, {
+                    'Content-Disposition': 'attachment; filename="lista.xlsx"', 'X-Itens': str(num_itens),
+                    'X-Tempo-Ms': str(round((time.perf_counter() - inicio) * 1000))})
+            self.server.contar('atendidos', +1)
+        except ErroPedido as e:
+            self.server.contar('recusados', +1)
+            self._responder_json(e.status, {'erro': str(e)})
+        except ListaIlegivel as e:
+            self.server.contar('recusados', +1)
+            self.log_error("lista ilegível em %s (%s)", url.path, e)
+            self._responder_json(422, {'erro': "O arquivo não é uma lista .docx/.rtf legível."})
+        except Exception as e:  # falha do serviço: o detalhe fica só no log, nunca na resposta
+            self.server.contar('falhas', +1)
+            self.log_error("falha em %s: %s: %s", url.path, type(e).__name__, e)
+            self._responder_json(500, {'erro': "Falha interna ao processar a lista."})
+        finally:
+            self.server.contar('em_andamento', -1)
+
+
+class ServicoConversao(ThreadingHTTPServer):
+    """Servidor HTTP (uma thread por conexão) na frente de um pool de processos já aquecidos."""
+
+    daemon_threads = True
+
+    def __init__(self, caminho_modelo, host=HOST_PADRAO, porta=PORTA_PADRAO, workers=None,
+                 modo_escrita='openpyxl', silencioso=False):
+        self.caminho_modelo = os.path.abspath(caminho_modelo)
+        self.workers = workers or os.cpu_count() or 1
+        self.silencioso = silencioso
+        self._trava = threading.Lock()
+        self.contadores = {'atendidos': 0, 'recusados': 0, 'falhas': 0, 'em_andamento': 0}
+        self.inicio = time.time()
+        super().__init__((host, porta), _Manipulador)  # a porta primeiro: ocupada, nenhum processo é criado
+        try:
+            self.pool = multiprocessing.Pool(self.workers, _iniciar_worker, (self.caminho_modelo, modo_escrita))
+        except BaseException:
+            super().server_close()
+            raise
+
+    def contar(self, nome, passo):
+        with self._trava:
+            self.contadores[nome] += passo
+
+    def estado(self):
+        with self._trava:
+            return {'modelo': self.caminho_modelo, 'workers': self.workers,
+                    'ativo_ha_s': round(time.time() - self.inicio, 1), **self.contadores}
+
+    def server_close(self):
+        super().server_close()
+        self.pool.close()
+        self.pool.join()
+
+
+def servir(caminho_modelo, host=HOST_PADRAO, porta=PORTA_PADRAO, workers=None, modo_escrita='openpyxl'):
+    """Sobe o serviço e atende até Ctrl+C."""
+    servidor = ServicoConversao(caminho_modelo, host, porta, workers, modo_escrita)
+    print(f"Servindo em http://{host}:{servidor.server_address[1]} com {servidor.workers} processo(s) "
+          f"(modelo: {servidor.caminho_modelo})", flush=True)
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("\nEncerrando.", file=sys.stderr)
+    finally:
+        servidor.server_close()
@@ -0,0 +1,114 @@
+import os
+import sys
+import time
+
+# ==============================================================================
+# RELATÓRIO DE TEMPO DE INICIALIZAÇÃO (tempo até a janela aparecer)
+# ==============================================================================
+# Uso: python main.py --tempo-inicio            (relatório no stderr)
+#      MeuAplicativo.exe --tempo-inicio saida.txt
+# Precisa ser importado antes dos demais módulos do programa: o medidor se põe
+# na frente do sys.meta_path e cronometra a execução de cada módulo importado,
+# no mesmo espírito do `python -X importtime` (que não existe no executável).
+
+INICIO = time.perf_counter()
+NUM_MODULOS_RELATORIO = 20
+
+_marcas = []          # [(nome, segundos desde INICIO)]
+_importacoes = []     # [(nome, profundidade, acumulado_s, proprio_s)] na ordem em que terminam
+_medidor = None
+
+
+class _LoaderCronometrado:
+    """Embrulha o loader original e mede o exec_module (o trabalho real da importação)."""
+
+    def __init__(self, loader, medidor):
+        self._loader = loader
+        self._medidor = medidor
+
+    def __getattr__(self, nome):
+        return getattr(self._loader, nome)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, modulo):
+        pilha = self._medidor.pilha
+        pilha.append(0.0)  # tempo gasto em importações filhas
+        inicio = time.perf_counter()
+        try:
+            self._loader.exec_module(modulo)
+        finally:
+            acumulado = time.perf_counter() - inicio
+            filhos = pilha.pop()
+            if pilha:
+                pilha[-1] += acumulado
+            _importacoes.append((modulo.__name__, len(pilha), acumulado, acumulado - filhos))
+
+
+class _MedidorImportacoes:
+    """Finder que só consulta os demais finders e troca o loader por um cronometrado."""
+
+    def __init__(self):
+        self.pilha = []
+
+    def find_spec(self, nome, caminho=None, alvo=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(nome, caminho, alvo)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                    spec.loader = _LoaderCronometrado(spec.loader, self)
+                return spec
+        return None
+
+
+def iniciar(ativo=True):
+    """Liga a medição das importações. Sem `ativo`, não faz nada (custo zero no uso normal)."""
+    global _medidor
+    if ativo and _medidor is None:
+        _medidor = _MedidorImportacoes()
+        sys.meta_path.insert(0, _medidor)
+
+
+def marcar(nome):
+    """Registra um marco (ex: 'janela visível') com o tempo desde o início do programa."""
+    if _medidor is not None:
+        _marcas.append((nome, time.perf_counter() - INICIO))
+
+
+def parar():
+    global _medidor
+    if _medidor is not None:
+        sys.meta_path.remove(_medidor)
+        _medidor = None
+
+
+def montar_relatorio(num_modulos=NUM_MODULOS_RELATORIO):
+    linhas = ["Tempo de inicialização (s desde o início do main.py):"]
+    for nome, segundos in _marcas:
+        linhas.append(f"  {segundos:8.3f}  {nome}")
+    if _importacoes:
+        total = sum(acumulado for _, profundidade, acumulado, _ in _importacoes if profundidade == 0)
+        linhas.append(f"\nImportações: {len(_importacoes)} módulos, {total:.3f}s no total. "
+                      f"Os {num_modulos} mais caros (acumulado | próprio):")
+        for nome, profundidade, acumulado, proprio in sorted(_importacoes, key=lambda i: -i[2])[:num_modulos]:
+            linhas.append(f"  {acumulado * 1000:8.1f} ms | {proprio * 1000:8.1f} ms | {'  ' * profundidade}{nome}")
+    return '\n'.join(linhas)
+
+
+def relatorio(destino='-'):
+    """
+    Para a medição e grava o relatório. '-' é o stderr; no executável sem console
+    (stderr None) o relatório vai para tempo_inicio.txt ao lado do executável.
+    """
+    texto = montar_relatorio()
+    parar()
+    if destino == '-' and sys.stderr is None:
+        destino = os.path.join(os.path.dirname(os.path.abspath(sys.argv[0])), 'tempo_inicio.txt')
+    if destino == '-':
+        print(texto, file=sys.stderr)
+    else:
+        with open(destino, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(texto + '\n')
@@ -0,0 +1,29 @@
+import os
+import sys
+import shutil
+
+import pytest
+
+# Os módulos ficam soltos na raiz do repositório (sem pacote).
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+MODELO = os.path.join(RAIZ, 'TABELA-DE-AÇO R8.xlsx')
+LISTA_DOCX = os.path.join(RAIZ, 'lista-material.docx')
+
+
+@pytest.fixture(autouse=True)
+def pasta_cache(tmp_path, monkeypatch):
+    """Cache das listas e índice do catálogo numa pasta do teste (não mexe no cache do usuário)."""
+    pasta = tmp_path / 'cache'
+    monkeypatch.setenv('ANALISADOR_CACHE_DIR', str(pasta))
+    return pasta
+
+
+@pytest.fixture
+def modelo(tmp_path):
+    """Cópia do modelo da tabela de aço, para ser preenchida no lugar."""
+    destino = tmp_path / 'modelo.xlsx'
+    shutil.copyfile(MODELO, destino)
+    return str(destino)
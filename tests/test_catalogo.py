@@ -0,0 +1,16 @@
+from catalogo import CatalogoPerfis, chave_perfil
+from conftest import MODELO
+
+
+def test_chave_do_l_so_em_polegadas():
+    assert chave_perfil('L 1.1/2" x 3/16"') == ('L', (38.1, 38.1, 4.8))
+    assert chave_perfil('L 1 1/2"X3/16"') == ('L', (38.1, 38.1, 4.8))
+    assert chave_perfil('L 38.1 x 4.8') is None
+    assert chave_perfil('W200X26,6') == ('W', (200.0, 26.6))
+
+
+def test_l_em_mm_nao_casa_com_o_laminado_do_modelo():
+    catalogo = CatalogoPerfis.colher(MODELO)
+    assert catalogo.resolver('L 1.1/2" x 3/16"').rotulo == 'L 1.1/2"x3/16"'
+    assert catalogo.resolver('L 38.1 x 4.8') is None
+    assert catalogo.resolver('L 38.1 x 4.8', tolerancia_mm=0.5) is None
@@ -0,0 +1,61 @@
+import pytest
+
+from classificador import ClassificadorPerfis, classificador_padrao
+
+
+@pytest.mark.parametrize('descricao, esperado', [
+    # Guarda-corpo e vergalhão vêm antes de TUBO e de 'CA ' (terça).
+    ('GUARDA CORPO TUBO 2"', ('GUARDA CORPO', 'OUTROS')),
+    ('guarda-corpo escada', ('GUARDA CORPO', 'OUTROS')),
+    ('VERGALHÃO CA 50 Ø 10', ('VERGALHAO', 'OUTROS')),
+    # Acessórios de telha antes de TELHA.
+    ('TELHA CUMEEIRA', ('TELHA ACESSORIO', 'OUTROS')),
+    ('RUFO TELHA 0,5', ('TELHA ACESSORIO', 'OUTROS')),
+    ('TELHA TRAPEZOIDAL 40', ('TELHA', 'OUTROS')),
+    # 'palavra': CALHA só como palavra inteira, em qualquer posição.
+    ('CALHA', ('TELHA ACESSORIO', 'OUTROS')),
+    ('CALHA 300 x 150', ('TELHA ACESSORIO', 'OUTROS')),
+    ('TELHA CALHA', ('TELHA ACESSORIO', 'OUTROS')),
+    ('TUBO CALHAR', ('TUBO', 'TUBO')),
+    # Perfis.
+    ('[ 127 x 50 x 2', ('U.s', 'PERFIL_U')),
+    ('CA 220 x 79 x 25 x 3.75', ('U.e', 'TERCA')),
+    ('UENR 150', ('U.e', 'TERCA')),
+    ('L DOBRADO 50 x 3', ('L DOBRADO', 'CANTONEIRA')),
+    ('L 50 x 50 x 3', ('L DOBRADO', 'CANTONEIRA')),
+    ('PERFIL L 50', ('N/D', 'OUTROS')),            # 'comeca_com' só no início
+    ('TUBO RED 50 x 2', ('FERRO MECANICO RED.', 'TUBO')),
+    ('tubo 50 x 2', ('TUBO', 'TUBO')),
+    ('CHAPA 3/8"', ('N/D', 'OUTROS')),
+])
+def test_regras_padrao_em_ordem_de_precedencia(descricao, esperado):
+    assert classificador_padrao().classificar(descricao) == esperado
+
+
+def test_primeira_regra_que_casa_vence():
+    regras = [{'contem': ['X'], 'codigo': 'A', 'classe': 'CA'},
+              {'contem': ['XY'], 'codigo': 'B', 'classe': 'CB'}]
+    assert ClassificadorPerfis(regras).classificar('XY') == ('A', 'CA')
+    assert ClassificadorPerfis(regras[::-1]).classificar('XY') == ('B', 'CB')
+
+
+def test_condicoes_da_mesma_regra_valem_como_ou():
+    classificador = ClassificadorPerfis([
+        {'contem': ['DOBRADO'], 'palavra': ['ZZ'], 'comeca_com': ['L '], 'codigo': 'A', 'classe': 'C'}])
+    assert classificador.classificar('PERFIL DOBRADO') == ('A', 'C')
+    assert classificador.classificar('PERFIL ZZ 10') == ('A', 'C')
+    assert classificador.classificar('L 50') == ('A', 'C')
+    assert classificador.classificar('PERFIL ZZZ 50') == ('N/D', 'OUTROS')
+
+
+def test_padrao_e_regra_sem_condicao():
+    regras = [{'contem': ['TELHA'], 'codigo': 'TELHA', 'classe': 'OUTROS'}]
+    assert ClassificadorPerfis(regras, padrao=('?', 'NADA')).classificar('TUBO') == ('?', 'NADA')
+    with pytest.raises(ValueError):
+        ClassificadorPerfis([{'codigo': 'A', 'classe': 'C'}])
+
+
+def test_assinatura_muda_com_as_regras():
+    regras = [{'contem': ['X'], 'codigo': 'A', 'classe': 'C'}]
+    assert ClassificadorPerfis(regras).assinatura == ClassificadorPerfis(list(regras)).assinatura
+    assert ClassificadorPerfis(regras).assinatura != ClassificadorPerfis(regras, padrao=('?', 'NADA')).assinatura
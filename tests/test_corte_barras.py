@@ -0,0 +1,95 @@
+import random
+from itertools import product
+
+import pytest
+
+import corte_barras
+from analisador import COLUNA_BARRAS, COLUNA_SOBRAS, AnalisadorListaMaterial
+from corte_barras import limite_inferior, resolver_ffd, resolver_melhorado
+
+BARRA = 6000
+
+
+def _conferir(plano, pecas):
+    """Cada peça em exatamente uma barra e nenhuma barra passando do comprimento."""
+    assert sorted(i for barra in plano.barras for i in barra) == list(range(len(pecas)))
+    assert all(plano.sobra_mm(barra) >= 0 for barra in plano.barras)
+
+
+def _otimo_exaustivo(pecas, barra_mm, perda_corte_mm=0):
+    """Menor número de barras testando todas as atribuições (só para poucas peças)."""
+    melhor = len(pecas)
+    for atribuicao in product(range(len(pecas)), repeat=len(pecas)):
+        usadas = {}
+        for peca, barra in zip(pecas, atribuicao):
+            usadas[barra] = usadas.get(barra, 0) + peca + perda_corte_mm
+        if all(total <= barra_mm + perda_corte_mm for total in usadas.values()):
+            melhor = min(melhor, len(usadas))
+    return melhor
+
+
+def test_ffd_nao_e_otimo_e_o_melhorado_acha_o_otimo():
+    # Em barras de 10: FFD faz {5,5} {4,4} {3,3,3} {3} = 4; o ótimo é {5,5} {4,3,3} {4,3,3} = 3.
+    pecas = [3000, 3000, 2400, 2400, 1800, 1800, 1800, 1800]
+    ffd = resolver_ffd(pecas, BARRA)
+    _conferir(ffd, pecas)
+    assert ffd.num_barras == 4 and not ffd.otimo
+
+    plano = resolver_melhorado(pecas, BARRA, tempo_limite=5)
+    _conferir(plano, pecas)
+    assert plano.num_barras == 3 == limite_inferior(pecas, BARRA)
+    assert plano.otimo
+    assert plano.sobra_total_m == pytest.approx(0.0)
+
+
+def test_perda_de_corte_conta_entre_as_pecas():
+    # Duas peças de 3000 só cabem juntas sem perda de corte.
+    assert resolver_ffd([3000, 3000], BARRA).num_barras == 1
+    plano = resolver_ffd([3000, 3000], BARRA, perda_corte_mm=3)
+    assert plano.num_barras == 2
+    assert resolver_ffd([2997, 3000], BARRA, perda_corte_mm=3).num_barras == 1
+
+
+@pytest.mark.parametrize('semente', range(20))
+def test_melhorado_igual_ao_otimo_exaustivo(semente):
+    sorteio = random.Random(semente)
+    pecas = [sorteio.randrange(500, 4500, 50) for _ in range(sorteio.randint(3, 6))]
+    perda = sorteio.choice([0, 3])
+    plano = resolver_melhorado(pecas, BARRA, perda, tempo_limite=5)
+    _conferir(plano, pecas)
+    assert plano.num_barras == _otimo_exaustivo(pecas, BARRA, perda)
+
+
+def test_peca_maior_que_a_barra():
+    with pytest.raises(ValueError):
+        resolver_ffd([6001], BARRA)
+
+
+def test_pecas_da_linha_e_barra_da_secao():
+    assert corte_barras.pecas_da_linha(13.5, 6.0) == [6000, 6000, 1500]
+    assert corte_barras.pecas_da_linha(12.0, 6.0) == [6000, 6000]
+    assert corte_barras.comprimento_barra('W 200 x 15') == 12.0
+    assert corte_barras.comprimento_barra('U.e') == 6.0
+
+
+def test_otimizar_linhas_junta_os_restos_do_mesmo_perfil():
+    # Dois restos de 3 m do mesmo perfil dividem uma barra; o de outro perfil não.
+    resultado = corte_barras.otimizar_linhas([
+        (10, 'U 100x2', 9.0, 6.0),
+        (11, 'U 100x2', 3.0, 6.0),
+        (12, 'U 150x2', 3.0, 6.0),
+    ])
+    assert resultado[10][0] + resultado[11][0] == 2
+    assert sorted([resultado[10][0], resultado[11][0]]) == [0, 2]  # as barras ficam com a linha da maior peça
+    assert resultado[12] == (1, pytest.approx(3.0))
+
+
+def test_planejar_cortes_mantem_o_modelo_nas_linhas_sem_barras():
+    analisador = AnalisadorListaMaterial(usar_cache=False)
+    analisador.secoes_por_linha = {10: 'U.s', 11: 'U.s', 12: 'U.s'}
+    celulas = {}
+    for linha, l_total_m, esp in ((10, 9.0, 2), (11, 3.0, 2), (12, 3.0, 3)):
+        celulas.update({(linha, 2): 100, (linha, 4): 40, (linha, 6): None, (linha, 8): esp, (linha, 10): l_total_m})
+    corte = analisador.planejar_cortes(celulas)
+    assert corte[(10, COLUNA_BARRAS)] == 2 and corte[(12, COLUNA_BARRAS)] == 1
+    assert (11, COLUNA_BARRAS) not in corte and (11, COLUNA_SOBRAS) not in corte
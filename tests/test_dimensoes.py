@@ -0,0 +1,130 @@
+import re
+
+import pytest
+
+import dimensoes
+from classificador import classificador_padrao
+
+
+# Parser por linha da versão anterior (main.py: convert_to_mm / parse_dimensoes_inteligente),
+# copiado como estava: o parser novo tem de dar exatamente os mesmos floats.
+def _convert_to_mm_antigo(dim_str):
+    dim_str = dim_str.strip().replace(',', '.')
+    total_mm = 0.0
+    try:
+        if '"' in dim_str:
+            dim_str = dim_str.replace('"', '')
+            parts = dim_str.split('.')
+            if parts[0] and '/' in parts[0]:
+                num, den = map(float, parts[0].split('/'))
+                total_mm += (num / den) * 25.4
+            elif parts[0]:
+                total_mm += float(parts[0]) * 25.4
+            if len(parts) > 1 and '/' in parts[1]:
+                num, den = map(float, parts[1].split('/'))
+                total_mm += (num / den) * 25.4
+        else:
+            total_mm = float(dim_str)
+    except (ValueError, ZeroDivisionError): return 0.0
+    return total_mm
+
+
+def _parse_antigo(desc, tipo_perfil):
+    a, b, c, esp = 0.0, 0.0, 0.0, 0.0
+    numeros = re.findall(r'[\d\./"]+', desc)
+    if tipo_perfil == 'PERFIL_U':
+        if len(numeros) >= 3:
+            a, b, esp = (_convert_to_mm_antigo(n) for n in numeros[:3])
+    elif tipo_perfil == 'TERCA':
+        if len(numeros) >= 4:
+            a, b, c, esp = (_convert_to_mm_antigo(n) for n in numeros[:4])
+    elif tipo_perfil == 'CANTONEIRA':
+        if len(numeros) == 2:
+            aba = _convert_to_mm_antigo(numeros[0])
+            a, b = aba, aba
+            esp = _convert_to_mm_antigo(numeros[1])
+        elif len(numeros) >= 3:
+            a, b, esp = (_convert_to_mm_antigo(n) for n in numeros[:3])
+    elif tipo_perfil == 'TUBO':
+        if len(numeros) >= 1:
+            esp = _convert_to_mm_antigo(numeros[0])
+    return a, b, c, esp
+
+
+def _bits(valores):
+    return [float(v).hex() for v in valores]
+
+
+MEDIDAS = ['1.1/2"', '3/16"', '1/4"', '2"', '5/8"', '3.3/4"', '1.5/64"', '7/3"', '127', '3,75', '2.65',
+           # entradas ruins: o parser antigo devolvia 0.0 ou o que o float() aceitasse
+           '1/0"', '1/2/3"', '"', '..', '.', '/', '1..2', '3/"', 'abc', '']
+
+
+@pytest.mark.parametrize('medida', MEDIDAS)
+def test_converter_para_mm_igual_ao_antigo(medida):
+    assert _bits([dimensoes.converter_para_mm(medida)]) == _bits([_convert_to_mm_antigo(medida)])
+
+
+DESCRICOES = [
+    ('[ 127 x 50 x 2', 'PERFIL_U'),
+    ('[ 127X50X2', 'PERFIL_U'),
+    ('[127X50X2,65', 'PERFIL_U'),
+    ('CA 220 x 79 x 25 x 3.75', 'TERCA'),
+    ('UENR 150X60X20X2,00', 'TERCA'),
+    ('L 1.1/2" x 3/16"', 'CANTONEIRA'),
+    ('L 2"x1.1/2"x1/4"', 'CANTONEIRA'),
+    ('L 38.1 x 4.8', 'CANTONEIRA'),
+    ('L DOBRADO 50X50X3', 'CANTONEIRA'),
+    ('TUBO 1.1/2" x 2,00', 'TUBO'),
+    ('FERRO MECANICO RED 12.7', 'TUBO'),
+    ('TUBO RED 3/16"', 'TUBO'),
+    # entradas ruins
+    ('L 1/0" x 3', 'CANTONEIRA'),
+    ('[ x x', 'PERFIL_U'),
+    ('CA 220 x 79', 'TERCA'),
+    ('TUBO', 'TUBO'),
+    ('[ 127 / 50 / .', 'PERFIL_U'),
+    ('CHAPA 3/8"', 'OUTROS'),
+    ('', 'OUTROS'),
+]
+
+
+@pytest.mark.parametrize('desc, tipo', DESCRICOES)
+def test_parse_dimensoes_igual_ao_antigo(desc, tipo):
+    assert _bits(dimensoes.parse_dimensoes(desc, tipo)) == _bits(_parse_antigo(desc, tipo))
+
+
+def test_lote_igual_ao_parser_por_linha():
+    descricoes = [desc for desc, _tipo in DESCRICOES] * 3
+    tipos = [tipo for _desc, tipo in DESCRICOES] * 3
+    resultado = dimensoes.parse_dimensoes_lote(descricoes, tipos)
+    assert len(resultado) == len(descricoes)
+    for (a, b, c, esp, classe), desc, tipo in zip(resultado, descricoes, tipos):
+        assert classe == tipo
+        assert _bits((a, b, c, esp)) == _bits(_parse_antigo(desc, tipo))
+    # Descrições repetidas dividem a mesma tupla.
+    assert resultado[0] is resultado[len(DESCRICOES)]
+
+
+def test_lote_classifica_quando_os_tipos_faltam():
+    descricoes = ['[ 127 x 50 x 2', 'TUBO 1.1/2" x 2,00', 'CHAPA 3/8"']
+    tipos = [classificador_padrao().classificar(desc)[1] for desc in descricoes]
+    assert dimensoes.parse_dimensoes_lote(descricoes) == dimensoes.parse_dimensoes_lote(descricoes, tipos)
+
+
+def test_lote_tamanhos_diferentes():
+    with pytest.raises(ValueError):
+        dimensoes.parse_dimensoes_lote(['[ 127 x 50 x 2'], ['PERFIL_U', 'TUBO'])
+
+
+def test_lote_como_array():
+    np = pytest.importorskip('numpy')
+    descricoes = [desc for desc, _tipo in DESCRICOES]
+    tipos = [tipo for _desc, tipo in DESCRICOES]
+    tabela = dimensoes.parse_dimensoes_lote(descricoes, tipos, como_array=True)
+    assert isinstance(tabela, np.ndarray) and tabela.shape == (len(descricoes),)
+    assert list(tabela.dtype.names) == ['a', 'b', 'c', 'esp', 'classe']
+    assert list(tabela['classe']) == tipos
+    for linha, (desc, tipo) in zip(tabela, DESCRICOES):
+        assert _bits((linha['a'], linha['b'], linha['c'], linha['esp'])) == _bits(_parse_antigo(desc, tipo))
+    assert len(dimensoes.parse_dimensoes_lote([], [], como_array=True)) == 0
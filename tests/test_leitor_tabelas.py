@@ -0,0 +1,74 @@
+from leitor_tabelas import blocos_lista, mapear_cabecalho
+
+CABECALHO = ['Perfil', 'Aço', 'L total (m)', 'Peso(kgf)']
+
+
+def test_mapear_cabecalho_em_outra_ordem():
+    assert mapear_cabecalho(['Peso (kgf)', 'PERFIL', 'Material', 'Comprimento']) == (1, 2, 3, 0)
+    assert mapear_cabecalho(['Perfil', 'Aço', 'Peso']) is None
+
+
+def test_tabela_de_continuacao_segue_o_bloco():
+    linhas = [
+        (0, CABECALHO),
+        (0, ['[ 127 x 50 x 2', 'ASTM A36', '85,58', '294,27']),
+        # Quebra de página: a tabela seguinte não repete o cabeçalho.
+        (1, ['CA 220 x 79 x 25 x 3.75', 'ASTM A36', '42,85', '1004,07']),
+        (1, ['TUBO 50 x 2', 'ASTM A36', '12,00', '30,10']),
+    ]
+    assert [campos[0] for campos in blocos_lista(linhas)] == [
+        '[ 127 x 50 x 2', 'CA 220 x 79 x 25 x 3.75', 'TUBO 50 x 2']
+
+
+def test_linhas_de_total_e_vazias_sao_ignoradas():
+    linhas = [
+        (0, CABECALHO),
+        (0, ['[ 127 x 50 x 2', 'ASTM A36', '85,58', '294,27']),
+        (0, ['', '', '', '']),
+        (0, ['Subtotal', '', '', '294,27']),
+        (1, ['TUBO 50 x 2', 'ASTM A36', '12,00', '30,10']),
+        (1, ['TOTAL', '', '', '324,37']),
+    ]
+    assert [campos[0] for campos in blocos_lista(linhas)] == ['[ 127 x 50 x 2', 'TUBO 50 x 2']
+
+
+def test_tabela_nao_consecutiva_encerra_o_bloco():
+    linhas = [
+        (0, CABECALHO),
+        (0, ['[ 127 x 50 x 2', 'ASTM A36', '85,58', '294,27']),
+        (2, ['Observação', 'qualquer', 'texto', 'solto']),
+        (3, ['TUBO 50 x 2', 'ASTM A36', '12,00', '30,10']),
+    ]
+    assert [campos[0] for campos in blocos_lista(linhas)] == ['[ 127 x 50 x 2']
+
+
+def test_tabela_estreita_depois_do_bloco_nao_e_continuacao():
+    linhas = [
+        (0, CABECALHO),
+        (0, ['[ 127 x 50 x 2', 'ASTM A36', '85,58', '294,27']),
+        (1, ['Assinatura', 'Data']),
+        (2, ['TUBO 50 x 2', 'ASTM A36', '12,00', '30,10']),
+    ]
+    assert [campos[0] for campos in blocos_lista(linhas)] == ['[ 127 x 50 x 2']
+
+
+def test_varios_blocos_com_colunas_em_ordens_diferentes():
+    linhas = [
+        (0, CABECALHO),
+        (0, ['[ 127 x 50 x 2', 'ASTM A36', '85,58', '294,27']),
+        (1, ['Estrutura 2']),
+        (2, ['Peso', 'Perfil', 'L total', 'Aço']),
+        (2, ['30,10', 'TUBO 50 x 2', '12,00', 'ASTM A36']),
+    ]
+    assert list(blocos_lista(linhas)) == [
+        ('[ 127 x 50 x 2', 'ASTM A36', '85,58', '294,27'),
+        ('TUBO 50 x 2', 'ASTM A36', '12,00', '30,10'),
+    ]
+
+
+def test_sem_cabecalho_vale_a_linha_1_da_primeira_tabela():
+    linhas = [
+        (0, ['titulo', 'x', 'y', 'z']),
+        (0, ['[ 127\n[ 120', 'A36\nA36', '85,58\n118,85', '294,27\n320,95']),
+    ]
+    assert list(blocos_lista(linhas)) == [('[ 127\n[ 120', 'A36\nA36', '85,58\n118,85', '294,27\n320,95')]
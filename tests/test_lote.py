@@ -0,0 +1,22 @@
+import os
+
+import lote
+from vigia import VigiaPasta
+
+
+def test_escolher_listas_prefere_o_docx():
+    nomes = ['a.rtf', 'a.docx', 'B.RTF', 'c.DOCX', 'c.rtf', '~$a.docx', 'notas.txt']
+    assert sorted(lote.escolher_listas(nomes)) == ['B.RTF', 'a.docx', 'c.DOCX']
+
+
+def test_vigia_segue_a_mesma_regra_do_lote(tmp_path):
+    pasta = tmp_path / 'entrada'
+    pasta.mkdir()
+    for nome in ('lista.docx', 'lista.rtf', 'outra.rtf'):
+        (pasta / nome).write_bytes(b'x')
+    vigia = VigiaPasta(str(pasta), 'modelo.xlsx', str(tmp_path / 'saida'), espera=0)
+    vigia._varrer(0.0)
+    vigia._liberar_estaveis(1.0)
+    assert sorted(vigia.aguardando) == lote.listar_documentos(str(pasta)) == [
+        os.path.join(str(pasta), 'lista.docx'), os.path.join(str(pasta), 'outra.rtf')]
+    assert vigia.contadores['ignorados'] == 1
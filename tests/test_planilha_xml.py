@@ -0,0 +1,200 @@
+import io
+import os
+import re
+import stat
+import zipfile
+
+import openpyxl
+import pytest
+
+import planilha_xml
+
+PARTE = 'xl/worksheets/sheet1.xml'
+
+# Pacote mínimo no formato do Excel: B1:B3 numa fórmula compartilhada (mestre em B1),
+# estilo na célula B1 e o calcChain.xml que o Excel grava.
+ARQUIVOS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/calcChain.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.calcChain+xml"/>'
+        '</Types>'),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/></Relationships>'),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="dobrados" sheetId="1" r:id="rId1"/></sheets>'
+        '<calcPr calcId="191029"/></workbook>'),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/calcChain" '
+        'Target="calcChain.xml"/></Relationships>'),
+    PARTE: (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+        '<row r="1" spans="1:3"><c r="A1"><v>1</v></c>'
+        '<c r="B1" s="3"><f t="shared" ref="B1:B3" si="0">A1*2+$C$1</f><v>12</v></c>'
+        '<c r="C1"><v>10</v></c></row>'
+        '<row r="2" spans="1:2"><c r="A2"><v>2</v></c><c r="B2"><f t="shared" si="0"/><v>14</v></c></row>'
+        '<row r="3" spans="1:2"><c r="A3"><v>3</v></c><c r="B3"><f t="shared" si="0"/><v>16</v></c></row>'
+        '</sheetData></worksheet>'),
+    'xl/calcChain.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<calcChain xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<c r="B1" i="1"/><c r="B2"/><c r="B3"/></calcChain>'),
+}
+
+
+@pytest.fixture
+def planilha(tmp_path):
+    caminho = tmp_path / 'compartilhadas.xlsx'
+    with zipfile.ZipFile(caminho, 'w', zipfile.ZIP_DEFLATED) as pacote:
+        for nome, conteudo in ARQUIVOS.items():
+            pacote.writestr(nome, conteudo)
+    return str(caminho)
+
+
+def _ler(caminho, formulas=False):
+    return dict(planilha_xml.ler_colunas(caminho, PARTE, max_col=3, formulas=formulas))
+
+
+def test_deslocar_formula():
+    assert planilha_xml.deslocar_formula('J4*$L$4', 2, 0) == 'J6*$L$4'
+    assert planilha_xml.deslocar_formula('SUM(A1:B2)+$A1+A$1', 1, 1) == 'SUM(B2:C3)+$A2+B$1'
+    assert planilha_xml.deslocar_formula('IF(A1="B2",A1,0)', 1, 0) == 'IF(A2="B2",A2,0)'
+
+
+def test_leitura_expande_as_formulas_compartilhadas(planilha):
+    assert _ler(planilha, formulas=True) == {
+        1: (1, '=A1*2+$C$1', 10), 2: (2, '=A2*2+$C$1', None), 3: (3, '=A3*2+$C$1', None)}
+    assert _ler(planilha) == {1: (1, 12, 10), 2: (2, 14, None), 3: (3, 16, None)}
+
+
+def test_sobrescrever_a_mestre_mantem_a_formula_das_demais(planilha, tmp_path):
+    saida = str(tmp_path / 'saida.xlsx')
+    planilha_xml.gravar_celulas(planilha, saida, {PARTE: {(1, 2): 5}})
+    assert _ler(saida, formulas=True) == {
+        1: (1, 5, 10), 2: (2, '=A2*2+$C$1', None), 3: (3, '=A3*2+$C$1', None)}
+    with zipfile.ZipFile(saida) as pacote:
+        xml = pacote.read(PARTE)
+    assert b'si="0"' not in xml
+    assert b'<c r="B1" s="3"><v>5</v></c>' in xml  # o estilo da célula substituída fica
+
+
+def test_formula_sobrescrita_remove_o_calc_chain(planilha, tmp_path):
+    saida = str(tmp_path / 'saida.xlsx')
+    planilha_xml.gravar_celulas(planilha, saida, {PARTE: {(2, 2): 7}})
+    with zipfile.ZipFile(saida) as pacote:
+        nomes = pacote.namelist()
+        tipos = pacote.read('[Content_Types].xml')
+        rels = pacote.read('xl/_rels/workbook.xml.rels')
+        workbook = pacote.read('xl/workbook.xml')
+    assert 'xl/calcChain.xml' not in nomes
+    assert b'calcChain' not in tipos and b'calcChain' not in rels
+    assert b'fullCalcOnLoad="1"' in workbook
+    assert _ler(saida, formulas=True)[2] == (2, 7, None)
+
+
+def test_sem_formula_sobrescrita_o_calc_chain_fica(planilha, tmp_path):
+    saida = str(tmp_path / 'saida.xlsx')
+    planilha_xml.gravar_celulas(planilha, saida, {PARTE: {(5, 1): 'novo'}})
+    with zipfile.ZipFile(saida) as pacote:
+        assert 'xl/calcChain.xml' in pacote.namelist()
+    assert _ler(saida)[5] == ('novo', None, None)
+
+
+def test_celulas_e_linhas_novas_entram_em_ordem(planilha, tmp_path):
+    saida = str(tmp_path / 'saida.xlsx')
+    planilha_xml.gravar_celulas(planilha, saida, {PARTE: {(2, 3): 'x', (4, 1): 1.5, (9, 2): True}})
+    linhas = _ler(saida)
+    assert linhas[2] == (2, 14, 'x') and linhas[4] == (1.5, None, None) and linhas[9] == (None, True, None)
+    with zipfile.ZipFile(saida) as pacote:
+        xml = pacote.read(PARTE).decode()
+    assert [int(n) for n in re.findall(r'<row r="(\d+)"', xml)] == [1, 2, 3, 4, 9]
+    assert 'spans=' not in xml.split('<row r="2"')[1].split('>')[0]
+
+
+@pytest.mark.parametrize('valor', [0.1 + 0.2, 1 / 3, 1e-7, 123456789.123, 10.8 + 2 + 1.5, 7, 1e20])
+def test_numeros_gravados_como_no_openpyxl(valor):
+    livro = openpyxl.Workbook()
+    livro.active['A1'] = valor
+    buffer = io.BytesIO()
+    livro.save(buffer)
+    with zipfile.ZipFile(buffer) as pacote:
+        esperado = re.search(rb'<v>([^<]*)</v>', pacote.read(PARTE)).group(1)
+    assert planilha_xml._xml_celula('A1', valor, None) == b'<c r="A1"><v>' + esperado + b'</v></c>'
+
+
+def test_texto_formula_e_vazio():
+    assert planilha_xml._xml_celula('A1', None, b'2') == b'<c r="A1" s="2"/>'
+    assert planilha_xml._xml_celula('A1', '=B1<C1', None) == b'<c r="A1"><f>B1&lt;C1</f></c>'
+    assert planilha_xml._xml_celula('A1', 'a & b', None) == (
+        b'<c r="A1" t="inlineStr"><is><t xml:space="preserve">a &amp; b</t></is></c>')
+
+
+def _entradas_brutas(caminho):
+    """{nome: (CRC, bytes comprimidos)} de cada entrada, como estão no arquivo."""
+    brutas = {}
+    with zipfile.ZipFile(caminho) as pacote, open(caminho, 'rb') as arquivo:
+        for info in pacote.infolist():
+            arquivo.seek(info.header_offset)
+            cabecalho = planilha_xml.CABECALHO_LOCAL.unpack(arquivo.read(planilha_xml.CABECALHO_LOCAL.size))
+            arquivo.seek(cabecalho[-2] + cabecalho[-1], 1)
+            brutas[info.filename] = (info.CRC, arquivo.read(info.compress_size))
+    return brutas
+
+
+def test_partes_nao_alteradas_sao_copiadas_comprimidas(planilha, tmp_path):
+    saida = str(tmp_path / 'saida.xlsx')
+    planilha_xml.gravar_celulas(planilha, saida, {PARTE: {(5, 1): 'novo'}})
+    antes, depois = _entradas_brutas(planilha), _entradas_brutas(saida)
+    for nome in ('[Content_Types].xml', '_rels/.rels', 'xl/_rels/workbook.xml.rels', 'xl/calcChain.xml'):
+        assert depois[nome] == antes[nome]
+    with zipfile.ZipFile(saida) as pacote:
+        assert pacote.testzip() is None
+        assert list(pacote.namelist()) == list(ARQUIVOS)
+
+
+def test_modelo_real_continua_legivel(modelo, tmp_path):
+    saida = str(tmp_path / 'saida.xlsx')
+    parte = planilha_xml.localizar_planilha_ativa(modelo)
+    planilha_xml.gravar_celulas(modelo, saida, {parte: {(4, 1): 'TESTE'}})
+    with zipfile.ZipFile(saida) as pacote:
+        assert pacote.testzip() is None
+    assert openpyxl.load_workbook(saida).active['A4'].value == 'TESTE'
+
+
+@pytest.mark.skipif(os.name != 'posix', reason="modo de arquivo POSIX")
+def test_permissoes_do_arquivo_gravado(planilha, tmp_path):
+    # No lugar: o modo do modelo fica.
+    os.chmod(planilha, 0o640)
+    planilha_xml.gravar_celulas(planilha, planilha, {PARTE: {(5, 1): 'novo'}})
+    assert stat.S_IMODE(os.stat(planilha).st_mode) == 0o640
+    # Arquivo novo: 0666 menos a umask, como qualquer arquivo criado.
+    umask = os.umask(0o022)
+    try:
+        saida = str(tmp_path / 'nova.xlsx')
+        planilha_xml._umask.cache_clear()
+        planilha_xml.gravar_celulas(planilha, saida, {PARTE: {(5, 1): 'novo'}})
+    finally:
+        os.umask(umask)
+        planilha_xml._umask.cache_clear()
+    assert stat.S_IMODE(os.stat(saida).st_mode) == 0o644
@@ -0,0 +1,145 @@
+import os
+import stat
+
+import openpyxl
+import pytest
+
+import cache_listas
+import registro_preenchimento
+from analisador import AnalisadorListaMaterial
+from conftest import LISTA_DOCX, MODELO
+from registro_preenchimento import RegistroPreenchimento, caminho_registro, diferencas
+
+MODOS = ('openpyxl', 'xml')
+
+
+def _extrair():
+    analisador = AnalisadorListaMaterial(usar_cache=False)
+    return analisador, analisador.extrair_dados_word(LISTA_DOCX)
+
+
+def _valores(caminho, aba, celulas):
+    """Valores das células como o openpyxl lê (fórmulas como '=...')."""
+    planilha = openpyxl.load_workbook(caminho)[aba]
+    return {(linha, coluna): planilha.cell(linha, coluna).value for linha, coluna in celulas}
+
+
+def _conteudo(caminho):
+    with open(caminho, 'rb') as arquivo:
+        return arquivo.read()
+
+
+def test_diferencas_grava_so_o_que_mudou_e_devolve_os_originais():
+    anteriores = {'dobrados': {(5, 1): 'U.s', (5, 2): 127.0, (6, 1): 'U.e'}}
+    desejadas = {'dobrados': {(5, 1): 'U.s', (5, 2): 127.0 + 1e-12, (7, 1): 'TUBO'}}
+    originais = {'dobrados': {(6, 1): '=A5'}}
+    assert diferencas(anteriores, desejadas, originais) == {'dobrados': {(7, 1): 'TUBO', (6, 1): '=A5'}}
+
+
+def test_registro_ida_e_volta(tmp_path):
+    planilha = str(tmp_path / 'p.xlsx')
+    registro = RegistroPreenchimento(modelo='abc')
+    registro.registrar('/obra/lista.docx', 'h', {'U.s\x1f[ 127\x1f1': ('U.s', 5, 'x')},
+                       {'dobrados': {(5, 1): 'U.s'}}, {'dobrados': {(5, 1): None}})
+    registro.gravar(planilha)
+    lido = RegistroPreenchimento.carregar(planilha)
+    assert lido.modelo == 'abc'
+    entrada = lido.entrada('/obra/lista.docx')
+    assert entrada.itens == {'U.s\x1f[ 127\x1f1': ('U.s', 5, 'x')}
+    assert entrada.celulas == {'dobrados': {(5, 1): 'U.s'}}
+    assert entrada.originais == {'dobrados': {(5, 1): None}}
+
+    lido.descartar('/obra/lista.docx')
+    lido.gravar(planilha)
+    assert not os.path.exists(caminho_registro(planilha))
+
+
+def test_gravar_mantem_as_permissoes(tmp_path):
+    planilha = str(tmp_path / 'p.xlsx')
+    registro = RegistroPreenchimento(modelo='abc')
+    registro.registrar('/obra/lista.docx', 'h', {}, {}, {})
+    umask = os.umask(0o022)
+    try:
+        registro.gravar(planilha)
+    finally:
+        os.umask(umask)
+    assert stat.S_IMODE(os.stat(caminho_registro(planilha)).st_mode) == 0o644
+
+    os.chmod(caminho_registro(planilha), 0o640)
+    registro.gravar(planilha)
+    assert stat.S_IMODE(os.stat(caminho_registro(planilha)).st_mode) == 0o640
+
+
+def test_hash_da_lista_no_registro_e_o_da_extracao(modelo):
+    analisador, dados = _extrair()
+    analisador.preencher_planilha_excel(modelo, dados)
+    entrada = RegistroPreenchimento.carregar(modelo).entrada(registro_preenchimento.chave_fonte(LISTA_DOCX))
+    assert entrada.hash_lista == analisador.hash_extraido == cache_listas.hash_arquivo(LISTA_DOCX)
+
+
+def test_chave_fonte_distingue_pastas():
+    assert registro_preenchimento.chave_fonte('obraA/lista.docx') != registro_preenchimento.chave_fonte('obraB/lista.docx')
+
+
+@pytest.mark.parametrize('modo_escrita', MODOS)
+def test_repetir_a_mesma_lista_nao_regrava_a_planilha(modelo, modo_escrita):
+    analisador, dados = _extrair()
+    celulas = analisador.preencher_planilha_excel(modelo, dados, modo_escrita=modo_escrita)
+    assert celulas and os.path.exists(caminho_registro(modelo))
+    conteudo, mtime = _conteudo(modelo), os.stat(modelo).st_mtime_ns
+
+    analisador, dados = _extrair()
+    assert analisador.preencher_planilha_excel(modelo, dados, modo_escrita=modo_escrita) == celulas
+    assert analisador.ultimo_incremental['celulas'] == 0
+    assert analisador.ultimo_incremental['iguais'] == len(dados)
+    assert _conteudo(modelo) == conteudo and os.stat(modelo).st_mtime_ns == mtime
+
+
+@pytest.mark.parametrize('modo_escrita', MODOS)
+def test_linha_removida_volta_ao_valor_do_modelo(modelo, modo_escrita):
+    analisador, dados = _extrair()
+    analisador.preencher_planilha_excel(modelo, dados, modo_escrita=modo_escrita)
+    linhas = {item[0]: analisador.linhas_dos_itens[id(item)] for item in dados if id(item) in analisador.linhas_dos_itens}
+    aba = openpyxl.load_workbook(modelo, read_only=True).active.title
+    removido = next(iter(linhas))
+    linha = linhas.pop(removido)
+    registradas = RegistroPreenchimento.carregar(modelo).entrada(registro_preenchimento.chave_fonte(LISTA_DOCX))
+    celulas_removido = [celula for celula in registradas.celulas[aba] if celula[0] == linha]
+    assert celulas_removido
+    assert _valores(modelo, aba, celulas_removido) != _valores(MODELO, aba, celulas_removido)
+
+    analisador, dados = _extrair()
+    dados = [item for item in dados if item[0] != removido]
+    analisador.preencher_planilha_excel(modelo, dados, modo_escrita=modo_escrita)
+
+    assert analisador.ultimo_incremental['removidas'] == 1
+    assert analisador.ultimo_incremental['iguais'] == len(dados)
+    assert _valores(modelo, aba, celulas_removido) == _valores(MODELO, aba, celulas_removido)
+    # Os demais itens continuam nas linhas que já ocupavam.
+    assert {item[0]: analisador.linhas_dos_itens[id(item)] for item in dados
+            if id(item) in analisador.linhas_dos_itens} == linhas
+
+
+def test_acumular_nao_soma_duas_vezes_ao_repetir_a_lista(modelo):
+    guarda_corpo = ['GUARDA CORPO', 'ASTM A36', 2.0, 5.0]
+    for _ in range(2):
+        analisador, dados = _extrair()
+        analisador.preencher_planilha_excel(modelo, dados + [guarda_corpo])
+    assert _valores(modelo, 'Guarda corpo', [(1, 3)])[(1, 3)] == pytest.approx(2.0)
+
+    analisador, dados = _extrair()
+    analisador.preencher_planilha_excel(modelo, dados)  # o guarda-corpo saiu da lista
+    assert _valores(modelo, 'Guarda corpo', [(1, 3)])[(1, 3)] == pytest.approx(10.8)
+
+
+def test_copia_do_mesmo_modelo_e_incremental(tmp_path):
+    saida = str(tmp_path / 'saida.xlsx')
+    analisador, dados = _extrair()
+    analisador.preencher_planilha_excel(MODELO, dados, caminho_saida=saida)
+    conteudo = _conteudo(saida)
+
+    analisador, dados = _extrair()
+    analisador.preencher_planilha_excel(MODELO, dados, caminho_saida=saida)
+    assert analisador.ultimo_incremental['celulas'] == 0
+    assert _conteudo(saida) == conteudo
+    assert not os.path.exists(caminho_registro(MODELO))
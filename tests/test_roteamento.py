@@ -0,0 +1,92 @@
+import pytest
+
+from itens import ItemMaterial
+from roteamento import Destino, planejar_destinos
+
+GUARDA_CORPO = Destino('GUARDA CORPO', 'Guarda corpo', {'C': 'comprimento_m'}, casamento='descricao', modo='acumular')
+GUARDA_CORPO_MODELO = Destino('GUARDA CORPO', 'Guarda corpo', {'C': 'comprimento_m'}, casamento='descricao',
+                              modo='acumular', somar_ao_modelo=True)
+VERGALHAO = Destino('VERGALHAO', 'vergalhão', {'A': 'peso', 'B': 0}, coluna_secao='C', casamento='numero',
+                    modo='acumular', linha_inicio=3)
+DESTINOS = {'GUARDA CORPO': GUARDA_CORPO, 'VERGALHAO': VERGALHAO}
+
+ABAS = {
+    'Guarda corpo': [
+        (1, ('Guarda corpo ', None, 10.8)),
+        (2, ('Guarda corpo escada', None, 17.4)),
+        (3, ('tubo superior Ø2"x2,00', None, '=C2+C1')),
+    ],
+    'vergalhão': [
+        (2, ('QUANT.(KG)', 'QUANT.(M)', 'BITOLA (mm)')),
+        (3, (0, 1, 4.2)),
+        (4, (3.5, 1, 10)),
+    ],
+}
+
+
+def _item(perfil, l_total_m, peso=0.0):
+    return ItemMaterial(perfil, 'ASTM A36', l_total_m, peso)
+
+
+def _planejar(dados_agrupados, lidas=None, destinos=DESTINOS):
+    def ler_linhas(nome, max_coluna):
+        if lidas is not None:
+            lidas.append((nome, max_coluna))
+        linhas = ABAS.get(nome)
+        return None if linhas is None else [(linha, valores[:max_coluna]) for linha, valores in linhas]
+    return planejar_destinos(dados_agrupados, destinos, ler_linhas)
+
+
+def _guarda_corpos():
+    return {'GUARDA CORPO': [(_item('GUARDA CORPO 1,10', 2.0), None),
+                             (_item('GUARDA-CORPO', 1.5), None),
+                             (_item('GUARDA CORPO ESCADA', 1.5), None)]}
+
+
+def test_acumular_parte_de_zero():
+    celulas = _planejar(_guarda_corpos())
+    assert celulas['Guarda corpo'] == {(1, 3): pytest.approx(3.5), (2, 3): pytest.approx(1.5)}
+
+
+def test_acumular_parte_do_valor_do_modelo_se_configurado():
+    celulas = _planejar(_guarda_corpos(), destinos={'GUARDA CORPO': GUARDA_CORPO_MODELO})
+    assert celulas['Guarda corpo'] == {(1, 3): pytest.approx(14.3), (2, 3): pytest.approx(18.9)}
+
+
+def test_acumular_soma_pela_bitola_e_valor_fixo_nao_soma():
+    celulas = _planejar({'VERGALHAO': [(_item('VERGALHÃO CA50 Ø 10', 30.0, 12.5), None),
+                                       (_item('VERGALHAO CA-60 Ø 10.0', 20.0, 7.5), None),
+                                       (_item('VERGALHÃO CA50 Ø 4.2', 5.0, 1.0), None)]})
+    assert celulas['vergalhão'] == {(4, 1): pytest.approx(20.0), (4, 2): 0, (3, 1): pytest.approx(1.0), (3, 2): 0}
+
+
+def test_somar_ao_modelo_le_tambem_as_colunas_somadas():
+    assert GUARDA_CORPO.max_coluna == 1
+    assert GUARDA_CORPO_MODELO.max_coluna == 3
+    assert VERGALHAO.max_coluna == 3
+    lidas = []
+    _planejar({'GUARDA CORPO': [(_item('GUARDA CORPO', 1.0), None)]}, lidas)
+    assert lidas == [('Guarda corpo', 1)]
+
+
+def test_item_sem_linha_correspondente_fica_de_fora(capsys):
+    celulas = _planejar({'VERGALHAO': [(_item('VERGALHÃO CA50 Ø 25', 10.0, 38.5), None)]})
+    assert celulas['vergalhão'] == {}
+    assert "Item 'VERGALHÃO CA50 Ø 25' não inserido" in capsys.readouterr().out
+
+
+def test_aba_ausente(capsys):
+    destinos = {'X': Destino('X', 'Nao existe', {'A': 'peso'}, casamento='descricao', modo='acumular')}
+    assert planejar_destinos({'X': [(_item('X', 1.0), None)]}, destinos, lambda nome, max_coluna: None) == {}
+    assert "A aba 'Nao existe' não existe" in capsys.readouterr().out
+
+
+def test_configuracao_invalida():
+    with pytest.raises(ValueError):
+        Destino('X', 'aba', {'A': 'peso'}, modo='somar')
+    with pytest.raises(ValueError):
+        Destino('X', 'aba', {'A': 'peso'})  # 'vagas' sem coluna_livre
+    with pytest.raises(ValueError):
+        Destino('X', 'aba', {'A': 'largura'}, modo='acumular')
+    with pytest.raises(ValueError):
+        Destino('X', 'aba', {'A': 'peso'}, coluna_livre='A', somar_ao_modelo=True)
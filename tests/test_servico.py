@@ -0,0 +1,36 @@
+import io
+import zipfile
+
+import pytest
+
+import servico
+from analisador import AnalisadorListaMaterial
+
+
+def _zip(partes):
+    conteudo = io.BytesIO()
+    with zipfile.ZipFile(conteudo, 'w') as pacote:
+        for nome, texto in partes.items():
+            pacote.writestr(nome, texto)
+    return conteudo.getvalue()
+
+
+@pytest.mark.parametrize('conteudo', [
+    b'isto nao e um docx',
+    _zip({'leiame.txt': 'x'}),  # zip sem o word/document.xml
+    _zip({'word/document.xml': '<w:document'}),  # xml quebrado
+])
+def test_arquivo_ilegivel_vira_lista_ilegivel(conteudo, tmp_path):
+    analisador = AnalisadorListaMaterial(usar_cache=False)
+    with pytest.raises(servico.ListaIlegivel):
+        servico._extrair_conteudo(analisador, conteudo, 'docx', str(tmp_path))
+
+
+def test_erro_interno_nao_vira_lista_ilegivel(tmp_path, monkeypatch):
+    analisador = AnalisadorListaMaterial(usar_cache=False)
+
+    def falhar(*_argumentos):
+        raise KeyError('coluna')
+    monkeypatch.setattr(analisador, 'extrair_dados_word', falhar)
+    with pytest.raises(KeyError):
+        servico._extrair_conteudo(analisador, b'qualquer', 'docx', str(tmp_path))
@@ -0,0 +1,297 @@
+import os
+import sys
+import json
+import time
+import struct
+import select
+import signal
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import lote
+from cache_listas import hash_arquivo
+
+# ==============================================================================
+# VIGIA DE PASTA (processa automaticamente as listas que chegam)
+# ==============================================================================
+# Uso: python main.py watch <pasta> --template "TABELA-DE-AÇO R8.xlsx" --out <saida>
+#
+# - Detecção: inotify no Linux (via ctypes, sem dependências); nos demais
+#   sistemas, ou com --polling (pastas de rede não avisam o inotify), a pasta é
+#   varrida a cada `intervalo` segundos comparando tamanho e data.
+# - Arquivo só entra na fila depois de `espera` segundos sem mudar (o Word e o
+#   mCalc gravam em etapas).
+# - Se a mesma lista está na pasta como .docx e .rtf, só o .docx é processado
+#   (a mesma regra do lote: as saídas teriam o mesmo nome).
+# - No máximo `tamanho_fila` listas ficam submetidas ao pool de processos; o
+#   resto espera a vez, sem crescer a memória do pool.
+# - Diário (diario.jsonl na pasta de saída): uma linha por lista processada, com
+#   o SHA-256 do conteúdo que o processo de trabalho de fato leu. Ao reiniciar,
+#   o que já está no diário como 'ok' com o mesmo conteúdo não é reprocessado;
+#   um arquivo alterado, ou que falhou, é processado de novo.
+# - Monitoramento: estado.json na pasta de saída (e uma linha no terminal) a
+#   cada `intervalo_estado` segundos, com fila, em processamento e vazão.
+
+ESPERA_PADRAO = 2.0
+INTERVALO_PADRAO = 1.0
+INTERVALO_ESTADO_PADRAO = 10.0
+JANELA_VAZAO = 60.0   # segundos considerados no cálculo de listas por minuto
+NOME_DIARIO = 'diario.jsonl'
+NOME_ESTADO = 'estado.json'
+
+
+class _Inotify:
+    """Eventos de escrita/criação/renomeação numa pasta (Linux), lidos com select."""
+
+    IN_MODIFY, IN_CLOSE_WRITE, IN_MOVED_TO, IN_CREATE = 0x2, 0x8, 0x80, 0x100
+    EVENTO = struct.Struct('iIII')
+
+    def __init__(self, pasta):
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 falhou')
+        mascara = self.IN_MODIFY | self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE
+        if libc.inotify_add_watch(self.fd, os.fsencode(pasta), mascara) < 0:
+            erro = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(erro, f'inotify_add_watch falhou para {pasta}')
+
+    def ler(self, tempo_maximo):
+        """Nomes dos arquivos que mudaram (espera até tempo_maximo segundos pelo primeiro evento)."""
+        prontos, _, _ = select.select([self.fd], [], [], tempo_maximo)
+        if not prontos:
+            return set()
+        try:
+            dados = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        nomes, posicao = set(), 0
+        while posicao + self.EVENTO.size <= len(dados):
+            _, _, _, tamanho = self.EVENTO.unpack_from(dados, posicao)
+            posicao += self.EVENTO.size
+            nome = dados[posicao:posicao + tamanho].rstrip(b'\0')
+            posicao += tamanho
+            if nome:
+                nomes.add(os.fsdecode(nome))
+        return nomes
+
+    def fechar(self):
+        os.close(self.fd)
+
+
+class Diario:
+    """Registro das listas já processadas (JSON Lines, só acrescenta)."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.processados = {}  # {caminho da lista: sha256 do conteúdo processado com sucesso}
+        try:
+            with open(caminho, encoding='utf-8') as arquivo:
+                for linha in arquivo:
+                    try:
+                        registro = json.loads(linha)
+                        if registro['status'] == 'ok':
+                            self.processados[registro['arquivo']] = registro['sha256']
+                    except (ValueError, KeyError, TypeError):
+                        continue  # linha cortada por uma queda no meio da gravação
+        except FileNotFoundError:
+            pass
+
+    def ja_processado(self, caminho, sha256):
+        return self.processados.get(caminho) == sha256
+
+    def registrar(self, resultado):
+        """Acrescenta o resultado ao diário; só os 'ok' contam como processados (falhas voltam a ser tentadas)."""
+        sha256 = resultado.get('sha256')
+        registro = {'quando': time.strftime('%Y-%m-%dT%H:%M:%S'), 'arquivo': resultado['arquivo'],
+                    'sha256': sha256, 'status': resultado['status'], 'saida': resultado['saida'],
+                    'itens': resultado['itens'], 'erro': resultado['erro'],
+                    'tempo_s': round(resultado['tempos'].get('total', 0.0), 3)}
+        with open(self.caminho, 'a', encoding='utf-8') as arquivo:
+            arquivo.write(json.dumps(registro, ensure_ascii=False) + '\n')
+        if resultado['status'] == 'ok':
+            self.processados[resultado['arquivo']] = sha256
+
+
+class VigiaPasta:
+    """Observa a pasta e manda as listas novas ou alteradas para lote.processar_documento."""
+
+    def __init__(self, pasta, caminho_modelo, pasta_saida, max_workers=None, tamanho_fila=None,
+                 espera=None, intervalo=None, intervalo_estado=INTERVALO_ESTADO_PADRAO,
+                 usar_polling=False, opcoes=None):
+        self.pasta = os.path.abspath(pasta)
+        self.caminho_modelo = caminho_modelo
+        self.pasta_saida = pasta_saida
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.tamanho_fila = tamanho_fila or 2 * self.max_workers
+        self.espera = ESPERA_PADRAO if espera is None else espera
+        self.intervalo = INTERVALO_PADRAO if intervalo is None else intervalo
+        self.intervalo_estado = intervalo_estado
+        self.usar_polling = usar_polling
+        self.opcoes = opcoes or {}  # argumentos nomeados extras de lote.processar_documento
+        os.makedirs(pasta_saida, exist_ok=True)
+        self.diario = Diario(os.path.join(pasta_saida, NOME_DIARIO))
+
+        self.vistos = {}        # {caminho: (tamanho, mtime_ns)} da última vez que o arquivo foi olhado
+        self.pendentes = {}     # {caminho: instante da última mudança}, aguardando a espera acabar
+        self.aguardando = deque()   # prontos, esperando vaga no pool
+        self.em_andamento = {}  # {futuro: caminho}
+        self.concluidos = deque()   # instantes de conclusão, para a vazão
+        self.contadores = {'processados': 0, 'falhas': 0, 'ignorados': 0}
+        self.inicio = time.time()
+        self.detector = 'polling'
+
+    # ------------------------------------------------------------------
+    # Detecção
+    # ------------------------------------------------------------------
+    def _olhar(self, caminho, agora):
+        """Registra o arquivo como pendente se ele é novo ou mudou desde a última olhada."""
+        try:
+            info = os.stat(caminho)
+        except FileNotFoundError:
+            self.vistos.pop(caminho, None)
+            self.pendentes.pop(caminho, None)
+            return
+        assinatura = (info.st_size, info.st_mtime_ns)
+        if self.vistos.get(caminho) != assinatura:
+            self.vistos[caminho] = assinatura
+            self.pendentes[caminho] = agora
+
+    def _varrer(self, agora):
+        for nome in os.listdir(self.pasta):
+            if lote.e_lista(nome):
+                self._olhar(os.path.join(self.pasta, nome), agora)
+
+    def _liberar_estaveis(self, agora):
+        """Arquivos parados há `espera` segundos: confere o diário e põe na fila."""
+        escolhidas = None  # lote.escolher_listas da pasta, lida só se algum arquivo ficou estável
+        for caminho, ultima_mudanca in list(self.pendentes.items()):
+            if agora - ultima_mudanca < self.espera:
+                continue
+            self._olhar(caminho, agora)  # mudou de novo desde o evento? recomeça a espera
+            if self.pendentes.get(caminho) != ultima_mudanca:
+                continue
+            del self.pendentes[caminho]
+            if escolhidas is None:
+                escolhidas = set(lote.escolher_listas(os.listdir(self.pasta)))
+            if os.path.basename(caminho) not in escolhidas:  # .rtf com o .docx da mesma lista ao lado
+                self.contadores['ignorados'] += 1
+                continue
+            try:
+                sha256 = hash_arquivo(caminho)
+            except OSError:
+                continue
+            if self.diario.ja_processado(caminho, sha256):
+                self.contadores['ignorados'] += 1
+            elif caminho not in self.aguardando:
+                self.aguardando.append(caminho)
+
+    # ------------------------------------------------------------------
+    # Processamento
+    # ------------------------------------------------------------------
+    def _submeter(self, executor):
+        while self.aguardando and len(self.em_andamento) < self.tamanho_fila:
+            caminho = self.aguardando.popleft()
+            # O hash do diário vem do processo de trabalho, do conteúdo que ele leu.
+            futuro = executor.submit(lote.processar_documento, caminho, self.caminho_modelo, self.pasta_saida,
+                                     **self.opcoes)
+            self.em_andamento[futuro] = caminho
+
+    def _recolher(self, prontos):
+        for futuro in prontos:
+            caminho = self.em_andamento.pop(futuro)
+            try:
+                resultado = futuro.result()
+            except Exception as e:  # o processo do pool morreu: registra como falha
+                resultado = {'arquivo': caminho, 'saida': None, 'status': 'erro', 'itens': 0,
+                             'tempos': {}, 'erro': f"{type(e).__name__}: {e}"}
+            self.diario.registrar(resultado)
+            self.contadores['processados' if resultado['status'] == 'ok' else 'falhas'] += 1
+            self.concluidos.append(time.time())
+            detalhe = f"  {resultado['erro']}" if resultado['erro'] else ''
+            print(f"[{resultado['status'].upper():5}] {os.path.basename(caminho)}: {resultado['itens']} itens{detalhe}",
+                  flush=True)
+
+    # ------------------------------------------------------------------
+    # Monitoramento
+    # ------------------------------------------------------------------
+    def estado(self):
+        agora = time.time()
+        while self.concluidos and agora - self.concluidos[0] > JANELA_VAZAO:
+            self.concluidos.popleft()
+        return {
+            'pasta': self.pasta, 'detector': self.detector,
+            'em_espera': len(self.pendentes), 'na_fila': len(self.aguardando),
+            'em_processamento': len(self.em_andamento), **self.contadores,
+            'listas_por_minuto': round(len(self.concluidos) * 60.0 / min(JANELA_VAZAO, max(agora - self.inicio, 1.0)), 2),
+            'ativo_desde': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.inicio)),
+            'atualizado': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(agora)),
+        }
+
+    def _publicar_estado(self):
+        estado = self.estado()
+        caminho = os.path.join(self.pasta_saida, NOME_ESTADO)
+        try:
+            descritor, temporario = tempfile.mkstemp(dir=self.pasta_saida, suffix='.tmp')
+            with os.fdopen(descritor, 'w', encoding='utf-8') as arquivo:
+                json.dump(estado, arquivo, ensure_ascii=False, indent=1)
+            os.replace(temporario, caminho)
+        except OSError as e:
+            print(f"  AVISO: não foi possível gravar {caminho} ({e}).", file=sys.stderr)
+        print(f"[vigia] fila {estado['na_fila']} | processando {estado['em_processamento']} | "
+              f"ok {estado['processados']} | falhas {estado['falhas']} | {estado['listas_por_minuto']}/min",
+              flush=True)
+
+    # ------------------------------------------------------------------
+    def executar(self, parar=None):
+        """Laço principal, até Ctrl+C, SIGTERM ou até o threading.Event `parar` ser ativado."""
+        if parar is None:
+            parar = threading.Event()
+            if threading.current_thread() is threading.main_thread():
+                signal.signal(signal.SIGTERM, lambda *_: parar.set())  # parada limpa como serviço
+        inotify = None
+        if not self.usar_polling and sys.platform.startswith('linux'):
+            try:
+                inotify = _Inotify(self.pasta)
+                self.detector = 'inotify'
+            except OSError as e:
+                print(f"  AVISO: inotify indisponível ({e}). Varrendo a pasta a cada {self.intervalo}s.")
+        print(f"[vigia] observando {self.pasta} ({self.detector}), saída em {self.pasta_saida}", flush=True)
+
+        proximo_estado = 0.0
+        try:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                self._varrer(time.time())  # o que chegou com o vigia parado
+                while not parar.is_set():
+                    if inotify is not None:
+                        agora = time.time()
+                        for nome in inotify.ler(self.intervalo):
+                            if lote.e_lista(nome):
+                                self._olhar(os.path.join(self.pasta, nome), agora)
+                    else:
+                        self._varrer(time.time())
+                    agora = time.time()
+                    self._liberar_estaveis(agora)
+                    self._submeter(executor)
+                    if self.em_andamento:
+                        prontos, _ = wait(list(self.em_andamento), timeout=0 if inotify else self.intervalo,
+                                          return_when=FIRST_COMPLETED)
+                        self._recolher(prontos)
+                    elif inotify is None:
+                        time.sleep(self.intervalo)
+                    if agora >= proximo_estado:
+                        self._publicar_estado()
+                        proximo_estado = agora + self.intervalo_estado
+                # Parada pedida: termina o que já foi submetido (o diário fica completo).
+                self._recolher(wait(list(self.em_andamento)).done)
+        except KeyboardInterrupt:
+            print("\n[vigia] interrompido.")
+        finally:
+            if inotify is not None:
+                inotify.fechar()
+            self._publicar_estado()